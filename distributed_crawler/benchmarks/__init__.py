@@ -0,0 +1,22 @@
+# distributed_crawler/benchmarks/__init__.py
+from .site import SyntheticSite
+from .counting_redis import CountingRedis
+from .runner import (
+    run_crawl_benchmark,
+    run_micro_benchmarks,
+    bench_parse,
+    bench_add_urls,
+    bench_get_proxy,
+    compare_results
+)
+
+__all__ = [
+    'SyntheticSite',
+    'CountingRedis',
+    'run_crawl_benchmark',
+    'run_micro_benchmarks',
+    'bench_parse',
+    'bench_add_urls',
+    'bench_get_proxy',
+    'compare_results'
+]
@@ -0,0 +1,6 @@
+# python -m distributed_crawler.benchmarks
+import sys
+
+from .runner import main
+
+sys.exit(main())
@@ -0,0 +1,77 @@
+# distributed_crawler/benchmarks/counting_redis.py
+import threading
+from collections import Counter
+from typing import Dict
+
+import fakeredis  # type: ignore
+from redis.client import Pipeline
+
+
+class _Counts:
+    """
+    命令数与往返次数，客户端与其创建的流水线共用
+    """
+    def __init__(self):
+        self.commands: Counter = Counter()
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def record(self, names, round_trips: int = 1):
+        with self._lock:
+            self.round_trips += round_trips
+            for name in names:
+                self.commands[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.commands.clear()
+            self.round_trips = 0
+
+
+def _command_name(args) -> str:
+    name = args[0]
+    if isinstance(name, bytes):
+        name = name.decode()
+    return str(name).upper()
+
+
+class _CountingPipeline(Pipeline):
+    counts: _Counts
+
+    def execute(self, raise_on_error: bool = True):
+        if self.command_stack:
+            self.counts.record(_command_name(args) for args, _ in self.command_stack)
+        return super().execute(raise_on_error)
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """
+    进程内的 Redis 替身，统计命令数与网络往返次数
+
+    单条命令（包括 Lua 脚本的 EVALSHA）计一次往返；流水线在 execute 时计一次往返，
+    其中每条命令分别计数。用于估算每个页面的 Redis 开销。
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.counts = _Counts()
+
+    def execute_command(self, *args, **options):
+        self.counts.record((_command_name(args),))
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        pipe = _CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.counts = self.counts
+        return pipe
+
+    def op_stats(self) -> Dict:
+        """
+        :return: {'commands': 总命令数, 'round_trips': 往返次数, 'by_command': {命令: 次数}}
+        """
+        with self.counts._lock:
+            by_command = dict(self.counts.commands)
+            round_trips = self.counts.round_trips
+        return {'commands': sum(by_command.values()), 'round_trips': round_trips, 'by_command': by_command}
+
+    def reset_op_stats(self):
+        self.counts.reset()
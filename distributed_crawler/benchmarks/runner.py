@@ -0,0 +1,359 @@
+# distributed_crawler/benchmarks/runner.py
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from distributed_crawler.crawler.core.data_crawler import DataCrawler   # type: ignore
+from distributed_crawler.crawler.core.data_parser import DataParser   # type: ignore
+from distributed_crawler.crawler.core.data_storage import DataStorage   # type: ignore
+from distributed_crawler.crawler.core.sqlite_frontier import SQLiteFrontier   # type: ignore
+from distributed_crawler.crawler.core.url_manager import URLManager   # type: ignore
+from distributed_crawler.utils.metrics import Metrics   # type: ignore
+from distributed_crawler.utils.proxy_pool import ProxyPool   # type: ignore
+from distributed_crawler.utils.robots_checker import RobotsChecker   # type: ignore
+from .counting_redis import CountingRedis
+from .site import SyntheticSite
+
+logger = logging.getLogger(__name__)
+
+# 用于回归比较的指标及其方向：'higher' 越大越好，'lower' 越小越好
+TRACKED_METRICS = {
+    'crawl.pages_per_sec': 'higher',
+    'crawl.redis.commands_per_page': 'lower',
+    'crawl.redis.round_trips_per_page': 'lower',
+    'crawl.peak_rss_mb': 'lower',
+    'micro.parse.ops_per_sec': 'higher',
+    'micro.add_urls.new_urls_per_sec': 'higher',
+    'micro.add_urls.duplicate_urls_per_sec': 'higher',
+    'micro.get_proxy.ops_per_sec': 'higher',
+    'micro.sqlite_frontier.insert_urls_per_sec': 'higher',
+    'micro.sqlite_frontier.pop_urls_per_sec': 'higher',
+}
+
+
+class _CountingStorage(DataStorage):
+    """
+    只计数不保存的存储
+    """
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def save(self, data: Dict):
+        with self._lock:
+            self.count += 1
+
+
+class _DirectProxyPool(ProxyPool):
+    """
+    不从公网代理源获取代理的代理池；没有代理时直连
+    """
+    def fetch_free_proxies(self):
+        pass
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    进程的峰值常驻内存（MB），不支持的平台（Windows）返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_crawl_benchmark(
+    hosts: int = 8,
+    pages_per_host: int = 200,
+    fanout: int = 10,
+    page_bytes: int = 20000,
+    latency: float = 0.01,
+    error_rate: float = 0.0,
+    mode: str = 'async',
+    concurrency: int = 16,
+    max_depth: int = 20,
+    seed: int = 0
+) -> Dict:
+    """
+    用合成站点与进程内 Redis 运行一次完整爬取
+
+    :param mode: 'serial'（crawl）、'async'（crawl_async）或 'pipelined'（crawl_pipelined）
+    :param concurrency: async 的并发数，pipelined 的抓取线程数
+    :return: 吞吐、各阶段耗时分位数、每页 Redis 命令数与峰值内存
+    """
+    site = SyntheticSite(
+        hosts=hosts, pages_per_host=pages_per_host, fanout=fanout, page_bytes=page_bytes,
+        latency=latency, error_rate=error_rate, seed=seed
+    )
+    with site:
+        redis_client = CountingRedis()
+        url_manager = URLManager(redis_client=redis_client, max_depth=max_depth)
+        storage = _CountingStorage()
+        metrics = Metrics()
+        crawler = DataCrawler(
+            url_manager=url_manager,
+            proxy_pool=_DirectProxyPool(),
+            # 合成站点的 robots.txt 不指定 Crawl-delay，测量的是爬虫本身的开销
+            robots_checker=RobotsChecker(default_crawl_delay=0),
+            storage=storage,
+            max_depth=max_depth,
+            crawl_interval=0,
+            metrics=metrics
+        )
+        url_manager.add_seed_urls(site.seed_urls())
+        redis_client.reset_op_stats()
+
+        start = time.perf_counter()
+        if mode == 'serial':
+            crawler.crawl()
+        elif mode == 'async':
+            crawler.crawl_async(concurrency=concurrency)
+        elif mode == 'pipelined':
+            crawler.crawl_pipelined(fetch_workers=concurrency)
+        else:
+            raise ValueError(f"未知的爬取模式: {mode}")
+        elapsed = time.perf_counter() - start
+
+        snapshot = metrics.snapshot()
+        ops = redis_client.op_stats()
+        pages = storage.count
+        per_page = max(pages, 1)
+        return {
+            'mode': mode,
+            'pages': pages,
+            'requests': site.request_count,
+            'server_errors': site.error_count,
+            'failed_urls': sum(1 for _ in url_manager.get_failed_urls()),
+            'elapsed_sec': round(elapsed, 3),
+            'pages_per_sec': round(pages / elapsed, 2) if elapsed > 0 else 0,
+            'downloaded_bytes': snapshot['counters'].get('crawler_downloaded_bytes_total', 0),
+            'stages': snapshot['stages'],
+            'redis': {
+                'commands': ops['commands'],
+                'round_trips': ops['round_trips'],
+                'commands_per_page': round(ops['commands'] / per_page, 2),
+                'round_trips_per_page': round(ops['round_trips'] / per_page, 2),
+                'by_command': ops['by_command'],
+            },
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def _timeit(func: Callable[[], object], iterations: int, repeat: int = 3) -> Dict:
+    """
+    先预热一次，再取 repeat 轮中最快的一轮
+    """
+    func()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return {
+        'iterations': iterations,
+        'best_sec': round(best, 6),
+        'ops_per_sec': round(iterations / best, 1) if best > 0 else 0,
+        'us_per_op': round(best / iterations * 1e6, 2),
+    }
+
+
+def bench_parse(page_bytes: int = 20000, fanout: int = 10, iterations: int = 200) -> Dict:
+    """
+    DataParser.parse 的单页解析速度
+    """
+    site = SyntheticSite(hosts=2, pages_per_host=100, fanout=fanout, page_bytes=page_bytes)
+    html = site.render_page(0, 1)
+    parser = DataParser()
+    result = _timeit(lambda: parser.parse(html, 'http://127.0.0.1/p/1'), iterations)
+    result['page_bytes'] = len(html.encode('utf-8'))
+    result['features'] = parser.features
+    return result
+
+
+def bench_add_urls(total: int = 20000, batch: int = 100) -> Dict:
+    """
+    URLManager.add_urls 的入队速度：先全部是新 URL，再全部是重复 URL
+    """
+    redis_client = CountingRedis()
+    url_manager = URLManager(redis_client=redis_client)
+    urls = [f'http://host{i % 50}.example/section/{i % 7}/page-{i}?ref=bench' for i in range(total)]
+    batches = [urls[i:i + batch] for i in range(0, total, batch)]
+
+    result: Dict = {'total': total, 'batch': batch}
+    for label in ('new', 'duplicate'):
+        redis_client.reset_op_stats()
+        start = time.perf_counter()
+        for chunk in batches:
+            url_manager.add_urls(chunk, depth=1)
+        elapsed = time.perf_counter() - start
+        ops = redis_client.op_stats()
+        result[f'{label}_urls_per_sec'] = round(total / elapsed, 1) if elapsed > 0 else 0
+        result[f'{label}_round_trips_per_batch'] = round(ops['round_trips'] / len(batches), 2)
+    return result
+
+
+def bench_sqlite_frontier(total: int = 100000, batch: int = 500, head_size: int = 5000) -> Dict:
+    """
+    SQLiteFrontier 的批量入队与出队加确认速度；待爬数量远大于 head_size，出队会多次从磁盘补充队首
+    """
+    urls = [f'http://host{i % 50}.example/section/{i % 7}/page-{i}' for i in range(total)]
+    result: Dict = {'total': total, 'batch': batch, 'head_size': head_size}
+    with tempfile.TemporaryDirectory() as tmp:
+        frontier = SQLiteFrontier(path=os.path.join(tmp, 'frontier.db'), head_size=head_size)
+        try:
+            start = time.perf_counter()
+            for i in range(0, total, batch):
+                frontier.add_urls(urls[i:i + batch], depth=1)
+            elapsed = time.perf_counter() - start
+            result['insert_urls_per_sec'] = round(total / elapsed, 1) if elapsed > 0 else 0
+
+            popped = 0
+            start = time.perf_counter()
+            while True:
+                leased = frontier.get_urls(batch)
+                if not leased:
+                    break
+                frontier.mark_urls_visited([url for url, _ in leased])
+                popped += len(leased)
+            elapsed = time.perf_counter() - start
+            result['pop_urls_per_sec'] = round(popped / elapsed, 1) if elapsed > 0 else 0
+        finally:
+            frontier.close()
+    return result
+
+
+def bench_get_proxy(proxies: int = 100, iterations: int = 20000) -> Dict:
+    """
+    ProxyPool.get_proxy 加 release_proxy 的速度
+    """
+    pool = _DirectProxyPool(max_proxies=proxies)
+    pool.add_proxies([f'10.0.{i // 250}.{i % 250}:8080' for i in range(proxies)])
+
+    def get_and_release():
+        proxy = pool.get_proxy()
+        if proxy:
+            pool.release_proxy(proxy)
+
+    result = _timeit(get_and_release, iterations)
+    result['proxies'] = proxies
+    return result
+
+
+def run_micro_benchmarks(page_bytes: int = 20000, fanout: int = 10) -> Dict:
+    return {
+        'parse': bench_parse(page_bytes=page_bytes, fanout=fanout),
+        'add_urls': bench_add_urls(),
+        'get_proxy': bench_get_proxy(),
+        'sqlite_frontier': bench_sqlite_frontier(),
+    }
+
+
+def _lookup(results: Dict, path: str):
+    value = results
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare_results(baseline: Dict, current: Dict, tolerance: float = 0.15) -> List[str]:
+    """
+    与基线结果比较，列出变差超过 tolerance（比例）的指标；两边都有的阶段按平均耗时比较
+
+    :return: 回归描述列表，为空表示没有回归
+    """
+    tracked = dict(TRACKED_METRICS)
+    for stage in (_lookup(current, 'crawl.stages') or {}):
+        tracked[f'crawl.stages.{stage}.avg_ms'] = 'lower'
+
+    regressions = []
+    for path, direction in tracked.items():
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+            continue
+        change = (new - old) / old
+        worse = -change if direction == 'higher' else change
+        if worse > tolerance:
+            regressions.append(f"{path}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='离线基准测试：合成站点 + 进程内 Redis')
+    parser.add_argument('--hosts', type=int, default=8)
+    parser.add_argument('--pages-per-host', type=int, default=200)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--page-bytes', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.01, help='每个请求的响应延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='页面请求返回 500 的概率')
+    parser.add_argument('--mode', choices=['serial', 'async', 'pipelined'], default='async')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-crawl', action='store_true', help='只运行微基准')
+    parser.add_argument('--skip-micro', action='store_true', help='只运行完整爬取')
+    parser.add_argument('--output', help='结果 JSON 路径，默认 benchmark-<时间>.json')
+    parser.add_argument('--compare', help='基线结果 JSON，指标变差超过 --tolerance 时以状态码 1 退出')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出爬虫的 INFO 日志')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    results: Dict = {
+        'version': _git_revision(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'verbose')},
+    }
+    if not args.skip_micro:
+        results['micro'] = run_micro_benchmarks(page_bytes=args.page_bytes, fanout=args.fanout)
+    if not args.skip_crawl:
+        results['crawl'] = run_crawl_benchmark(
+            hosts=args.hosts, pages_per_host=args.pages_per_host, fanout=args.fanout,
+            page_bytes=args.page_bytes, latency=args.latency, error_rate=args.error_rate,
+            mode=args.mode, concurrency=args.concurrency, seed=args.seed
+        )
+
+    output = args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.tolerance)
+        if regressions:
+            print(f"相对 {args.compare}（{baseline.get('version')}）的回归:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"相对 {args.compare} 没有超过 {args.tolerance:.0%} 的回归")
+    return 0
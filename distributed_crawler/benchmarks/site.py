@@ -0,0 +1,191 @@
+# distributed_crawler/benchmarks/site.py
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+_WORDS = (
+    'crawler frontier lease shard proxy robots fetch parse store enqueue politeness latency '
+    'throughput redis archive canonical histogram partition worker pipeline'
+).split()
+
+_ROBOTS_TXT = b'User-agent: *\nDisallow: /private/\n'
+
+
+class SyntheticSite:
+    """
+    本地合成站点，用于离线基准测试
+
+    每个“主机”是 127.0.0.1 上的一个独立端口，调度器因此把它们当作不同主机分别控制抓取间隔。
+    页面 /p/<n> 的链接由 (seed, 主机, 页号) 确定：前两个链接指向同主机的 2n+1、2n+2 号页面，
+    保证从各主机的 0 号页面出发可以到达全部页面；其余链接随机指向本主机或其他主机的页面。
+    每个请求先等待 latency 秒，再按 error_rate 的概率返回 500。
+    """
+    def __init__(
+        self,
+        hosts: int = 8,
+        pages_per_host: int = 200,
+        fanout: int = 10,
+        page_bytes: int = 20000,
+        latency: float = 0.01,
+        error_rate: float = 0.0,
+        cross_host_ratio: float = 0.3,
+        seed: int = 0
+    ):
+        """
+        :param hosts: 主机数
+        :param pages_per_host: 每个主机的页面数
+        :param fanout: 每个页面的链接数
+        :param page_bytes: 页面大小（字节，近似）
+        :param latency: 每个请求的响应延迟（秒）
+        :param error_rate: 页面请求返回 500 的概率
+        :param cross_host_ratio: 随机链接指向其他主机的比例
+        :param seed: 随机种子，相同参数生成相同的站点
+        """
+        self.hosts = hosts
+        self.pages_per_host = pages_per_host
+        self.fanout = fanout
+        self.page_bytes = page_bytes
+        self.latency = latency
+        self.error_rate = error_rate
+        self.cross_host_ratio = cross_host_ratio
+        self.seed = seed
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._servers: List[ThreadingHTTPServer] = []
+        self._filler = self._make_filler(page_bytes)
+
+    def _make_filler(self, size: int) -> str:
+        rng = random.Random(self.seed)
+        paragraphs = []
+        length = 0
+        while length < size:
+            paragraph = '<p>' + ' '.join(rng.choice(_WORDS) for _ in range(60)) + '</p>\n'
+            paragraphs.append(paragraph)
+            length += len(paragraph)
+        return ''.join(paragraphs)[:max(size, 0)]
+
+    @property
+    def base_urls(self) -> List[str]:
+        return [f'http://127.0.0.1:{server.server_address[1]}' for server in self._servers]
+
+    def seed_urls(self) -> List[str]:
+        """
+        各主机 0 号页面的 URL
+        """
+        return [f'{base}/p/0' for base in self.base_urls]
+
+    @property
+    def total_pages(self) -> int:
+        return self.hosts * self.pages_per_host
+
+    def links(self, host: int, page: int) -> List[Tuple[int, int]]:
+        """
+        页面的链接，(主机, 页号) 列表
+        """
+        rng = random.Random(f'{self.seed}:{host}:{page}')
+        links = [(host, child) for child in (2 * page + 1, 2 * page + 2) if child < self.pages_per_host]
+        while len(links) < self.fanout:
+            target_host = rng.randrange(self.hosts) if rng.random() < self.cross_host_ratio else host
+            links.append((target_host, rng.randrange(self.pages_per_host)))
+        return links[:self.fanout]
+
+    def render_page(self, host: int, page: int) -> str:
+        """
+        生成页面 HTML，链接使用相对路径或其他主机的绝对 URL
+        """
+        base_urls = self.base_urls
+        anchors = []
+        for target_host, target_page in self.links(host, page):
+            if target_host == host:
+                href = f'/p/{target_page}'
+            else:
+                href = f'{base_urls[target_host]}/p/{target_page}' if base_urls else f'/p/{target_page}'
+            anchors.append(f'<li><a href="{href}">page {target_host}-{target_page}</a></li>')
+        return (
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            f'<title>Host {host} page {page}</title></head>\n<body>\n'
+            f'<h1>Host {host} page {page}</h1>\n<ul>\n' + '\n'.join(anchors) + '\n</ul>\n'
+            + self._filler + '\n</body></html>\n'
+        )
+
+    def _should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _handler(self, host: int):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 支持 keep-alive，和真实站点一样复用连接
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with site._lock:
+                    site.request_count += 1
+                if site.latency > 0:
+                    time.sleep(site.latency)
+                path = self.path.split('?', 1)[0]
+                if path == '/robots.txt':
+                    self._send(200, _ROBOTS_TXT, 'text/plain')
+                    return
+                page = self._page_number(path)
+                if page is None:
+                    self._send(404, b'not found', 'text/plain')
+                    return
+                if site._should_fail():
+                    with site._lock:
+                        site.error_count += 1
+                    self._send(500, b'synthetic error', 'text/plain')
+                    return
+                self._send(200, site.render_page(host, page).encode('utf-8'), 'text/html; charset=utf-8')
+
+            @staticmethod
+            def _page_number(path: str) -> Optional[int]:
+                if not path.startswith('/p/'):
+                    return None
+                try:
+                    page = int(path[3:])
+                except ValueError:
+                    return None
+                return page if 0 <= page < site.pages_per_host else None
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'SyntheticSite':
+        """
+        为每个主机启动一个只监听本机的 HTTP 服务
+        """
+        for host in range(self.hosts):
+            server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler(host))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name=f'site-{host}', daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -1,8 +1,12 @@
-from .settings import REDIS_CONFIG, CRAWLER_CONFIG  
+from .settings import REDIS_CONFIG, CRAWLER_CONFIG, HTTP_CONFIG, SHARDING_CONFIG, PROXY_CONFIG, METRICS_CONFIG  
 from .logging_config import setup_logging  
 
 __all__ = [  
     'REDIS_CONFIG',   
     'CRAWLER_CONFIG',   
+    'HTTP_CONFIG',   
+    'SHARDING_CONFIG',   
+    'PROXY_CONFIG',   
+    'METRICS_CONFIG',   
     'setup_logging'  
 ]
\ No newline at end of file
@@ -11,6 +11,14 @@ REDIS_CONFIG = {
     'db': 0  
 }  
 
+# 分片配置：shards 为空时只使用 REDIS_CONFIG 一个实例  
+SHARDING_CONFIG = {  
+    'shards': [],  # 多个 Redis 实例的连接参数，格式同 REDIS_CONFIG  
+    'partitions': 64,  # 主机分区数，部署后不要修改  
+    'vnodes': 128,  # 一致性哈希环上每个实例的虚拟节点数  
+    'claim_ttl': 60  # 分区认领的有效期（秒），worker 需在到期前续期  
+}  
+
 # 爬虫基本配置  
 CRAWLER_CONFIG = {  
     'user_agent': 'DistributedCrawler/1.0',  
@@ -18,5 +26,44 @@ CRAWLER_CONFIG = {
     'workers': 10,  
     'robots_enabled': True,  
     'proxy_enabled': True,  
-    'max_retry': 3  
-}
\ No newline at end of file
+    'max_retry': 3,  
+    'lease_timeout': 300,  # URL 租约时长（秒），超时未确认的 URL 会被重新入队  
+    # 已见 URL 集合：'set'（完整 URL）、'fingerprint'（64 位指纹）或 'bloom'（可扩展布隆过滤器）  
+    'seen_store': 'set',  
+    'seen_store_options': {},  
+    # BeautifulSoup 树构建器：'html.parser'（内置）或 'lxml'（更快，需安装 lxml）  
+    'parser_features': 'html.parser',  
+    # 流式下载：只读取以下类型、且解压后不超过 max_content_bytes 的响应体  
+    'allowed_content_types': ['text/html', 'application/xhtml+xml'],  
+    'max_content_bytes': 5 * 1024 * 1024,  
+    # URL 规范化时去掉的跟踪参数，以 * 结尾表示前缀匹配  
+    'tracking_params': ['utm_*', 'gclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', 'spm'],  
+    # 待爬队列：'redis'（配置了 SHARDING_CONFIG['shards'] 时按主机分片）或 'sqlite'（单机、磁盘存储，无需 Redis）  
+    'frontier': 'redis',  
+    'frontier_options': {}  # 传给待爬队列的参数，如 sqlite 的 {'path': 'frontier.db', 'head_size': 10000}  
+}
+
+# HTTP 连接池配置（爬虫、robots 检查与代理验证共用）  
+HTTP_CONFIG = {  
+    'pool_connections': 100,  # 每个会话缓存的主机连接池数量  
+    'pool_maxsize': 10,  # 每个主机保留的最大连接数  
+    'max_sessions': 32,  # 同时保留的代理会话数量  
+    'idle_timeout': 90  # 会话空闲超时（秒）  
+}
+
+# 代理池健康管理配置  
+PROXY_CONFIG = {  
+    # 健康检查地址，请求经代理发出，必须能从代理所在网络访问（不能是 127.0.0.1 等爬虫本机地址），  
+    # 返回 200 即视为代理可用；为 None 时不做后台健康检查，只依据实际抓取结果熔断  
+    'health_check_url': None,  
+    'ewma_alpha': 0.3,  # 响应时间 EWMA 的平滑系数  
+    'failure_threshold': 5,  # 连续失败多少次后熔断  
+    'cooldown': 60  # 熔断后多少秒进入半开状态探测  
+}
+
+# 运行指标配置  
+METRICS_CONFIG = {  
+    'host': '127.0.0.1',  # /metrics 接口只监听本机，由本机的 Prometheus 或转发代理抓取  
+    'port': 9108,  # 0 表示不启动指标接口  
+    'snapshot_interval': 60  # 定期把指标摘要写入日志的间隔（秒），0 表示不输出  
+}
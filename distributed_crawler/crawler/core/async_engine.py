@@ -0,0 +1,133 @@
+# crawler/core/async_engine.py
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from ..config.settings import CRAWLER_CONFIG
+
+
+class AsyncCrawlEngine:
+    """
+    基于 asyncio 的并发抓取引擎
+
+    事件循环负责调度：从 DataCrawler 的礼貌调度器取出已就绪主机的 URL，
+    同时保持最多 concurrency 个抓取任务在进行。每个任务在线程池中执行 handle_crawl，
+    因此仍然经过 robots 检查、代理池、解析器与存储模块；主机级并发由调度器的 max_per_host 控制。
+    """
+    def __init__(self, crawler, concurrency: Optional[int] = None):
+        """
+        :param crawler: DataCrawler 实例
+        :param concurrency: 同时进行的抓取数，默认取 CRAWLER_CONFIG['workers']
+        """
+        self.crawler = crawler
+        self.concurrency = concurrency or CRAWLER_CONFIG.get('workers', 10)
+        self.logger = logging.getLogger(__name__)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def stop(self):
+        """
+        请求停止抓取，可以从其他线程或信号处理器调用
+        """
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def run(self):
+        """
+        运行抓取直到没有待爬 URL 或收到停止请求
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='fetch')
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight: Set[asyncio.Task] = set()
+        stop_waiter = asyncio.ensure_future(self._stop_event.wait())
+        scheduler = self.crawler.scheduler
+
+        try:
+            while not self._stop_event.is_set():
+                if slots.locked():
+                    # 并发已满：等任意任务结束或收到停止请求
+                    await asyncio.wait(in_flight | {stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                await slots.acquire()
+                if len(scheduler) < self.crawler.prefetch or self.crawler._leases_due():
+                    await self._loop.run_in_executor(self._executor, self.crawler._fill_scheduler)
+
+                url, wait = scheduler.pop_ready()
+                if url:
+                    task = asyncio.ensure_future(self._crawl_one(url, slots))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    continue
+
+                slots.release()
+                if wait < 0 and not in_flight:
+                    finished = await self._loop.run_in_executor(self._executor, self.crawler._crawl_finished)
+                    if finished:
+                        self.logger.info("没有更多待爬取的 URL。")
+                        break
+                    # 本 worker 暂时没有 URL，但其他 worker 仍有工作：稍后重新领取
+                    wait = self.crawler.idle_interval
+
+                # 没有就绪主机：等到最近主机就绪、有任务完成或收到停止请求
+                with self.crawler.metrics.time_stage('politeness'):
+                    await asyncio.wait(
+                        in_flight | {stop_waiter},
+                        timeout=wait if wait > 0 else None,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+        finally:
+            stop_waiter.cancel()
+            await self._shutdown(in_flight)
+
+    async def _crawl_one(self, url: str, slots: asyncio.Semaphore):
+        """
+        在线程池中抓取单个 URL，结束后释放主机与并发名额
+        """
+        delay = None
+        try:
+            depth = self.crawler._pop_depth(url)
+            await self._loop.run_in_executor(self._executor, self.crawler.handle_crawl, url, depth)
+            delay = await self._loop.run_in_executor(self._executor, self.crawler._host_delay, url)
+        except asyncio.CancelledError:
+            self.logger.info(f"抓取 {url} 已取消")
+            raise
+        except Exception as e:
+            self.logger.error(f"爬取 {url} 时发生错误: {e}")
+        finally:
+            self.crawler.scheduler.release(url, delay)
+            slots.release()
+
+    async def _shutdown(self, in_flight: Set[asyncio.Task]):
+        """
+        取消进行中的任务并关闭线程池
+
+        已在线程中执行的请求无法中断，会在各自的超时内结束；排队中的任务直接丢弃。
+        """
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def run_forever(self):
+        """
+        同步入口：运行事件循环，并在 SIGINT/SIGTERM 时优雅停止
+        """
+        async def main():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, self.stop)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    # Windows 或非主线程不支持，退回默认信号处理
+                    pass
+            await self.run()
+
+        asyncio.run(main())
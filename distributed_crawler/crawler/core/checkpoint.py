@@ -0,0 +1,95 @@
+# crawler/core/checkpoint.py
+import gzip
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+# 快照文件格式版本，格式不兼容时递增
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointError(Exception):
+    """
+    快照文件损坏、不完整或版本不兼容
+    """
+
+
+class CheckpointWriter:
+    """
+    爬取快照写入器
+
+    快照是 gzip 压缩的 JSON Lines：第一行为 header，之后每行是一批同类记录
+    （{'type': 'frontier', 'items': [...]} 等），最后一行为 end，记录各类型的条目数。
+    先写入临时文件，close 时才改名为目标文件，中途失败不会留下看似完整的快照。
+    """
+    def __init__(self, path: str, meta: Optional[Dict] = None, compresslevel: int = 6):
+        """
+        :param path: 快照文件路径
+        :param meta: 写入 header 的附加信息（如键名前缀、已见集合类型）
+        :param compresslevel: gzip 压缩级别
+        """
+        self.path = path
+        self.tmp_path = f'{path}.tmp'
+        self.counts: Dict[str, int] = {}
+        self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8', compresslevel=compresslevel)
+        self._write_line(dict(meta or {}, type='header', version=CHECKPOINT_VERSION, created_at=time.time()))
+
+    def _write_line(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+
+    def write(self, record: Dict):
+        """
+        写入一批记录，record['items'] 的长度计入该类型的条目数
+        """
+        kind = record['type']
+        self.counts[kind] = self.counts.get(kind, 0) + len(record.get('items', ()))
+        self._write_line(record)
+
+    def close(self) -> Dict[str, int]:
+        """
+        写入 end 记录并改名为目标文件
+
+        :return: 各类型的条目数
+        """
+        self._write_line({'type': 'end', 'counts': self.counts})
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        return dict(self.counts)
+
+    def abort(self):
+        """
+        放弃写入并删除临时文件
+        """
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def read_checkpoint(path: str) -> Iterator[Dict]:
+    """
+    流式读取快照，依次产出 header 与各批记录；文件截断或缺少 end 记录时抛出 CheckpointError
+
+    :param path: 快照文件路径
+    """
+    counts: Dict[str, int] = {}
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline() or 'null')
+            if not header or header.get('type') != 'header':
+                raise CheckpointError(f"{path} 不是爬取快照")
+            if header.get('version') != CHECKPOINT_VERSION:
+                raise CheckpointError(f"{path} 的版本 {header.get('version')} 不受支持")
+            yield header
+            for line in f:
+                record = json.loads(line)
+                if record['type'] == 'end':
+                    if record['counts'] != counts:
+                        raise CheckpointError(f"{path} 的条目数与 end 记录不符")
+                    return
+                counts[record['type']] = counts.get(record['type'], 0) + len(record.get('items', ()))
+                yield record
+    except (OSError, EOFError, ValueError) as e:
+        raise CheckpointError(f"读取快照 {path} 失败: {e}") from e
+    raise CheckpointError(f"{path} 不完整，缺少 end 记录")
@@ -0,0 +1,268 @@
+# crawler/core/content_dedup.py
+import hashlib
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def page_text(html: str) -> str:
+    """
+    不构建 DOM，用正则粗略去掉脚本、样式和标签，得到用于指纹的文本
+    """
+    text = _SCRIPT_STYLE_RE.sub(' ', html)
+    text = _TAG_RE.sub(' ', text)
+    return ' '.join(text.lower().split())
+
+
+def exact_hash(text: str) -> str:
+    """
+    文本的精确哈希
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """
+    计算 SimHash 指纹，以词频为权重
+
+    :param text: page_text 得到的文本
+    :param bits: 指纹位数
+    """
+    weights = [0] * bits
+    for token, count in Counter(_TOKEN_RE.findall(text)).items():
+        h = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for i in range(bits):
+            if h >> i & 1:
+                weights[i] += count
+            else:
+                weights[i] -= count
+    fingerprint = 0
+    for i, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << i
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class FingerprintIndex(ABC):
+    """
+    内容指纹索引
+
+    SimHash 按抽屉原理分块：距离不超过 max_distance 的两个指纹，
+    在 max_distance + 1 个块中至少有一块完全相同，因此只需比较同块的候选指纹。
+    """
+    def __init__(self, bits: int = 64, max_distance: int = 3):
+        if bits % (max_distance + 1):
+            raise ValueError("指纹位数必须能被 max_distance + 1 整除")
+        self.bits = bits
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = bits // self.bands
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, fingerprint >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    @abstractmethod
+    def find_or_add(self, url: str, digest: str, fingerprint: int) -> Optional[str]:
+        """
+        查找重复页面，不存在时登记当前页面
+
+        :return: 已登记的重复页面 URL，没有则返回 None
+        """
+        pass
+
+    @abstractmethod
+    def record_alias(self, url: str, original: str):
+        """
+        记录 url 是 original 的别名
+        """
+        pass
+
+
+class LocalFingerprintIndex(FingerprintIndex):
+    """
+    进程内索引，按 LRU 保留最多 capacity 个页面
+    """
+    def __init__(self, capacity: int = 1000000, bits: int = 64, max_distance: int = 3, alias_capacity: int = 100000):
+        super().__init__(bits, max_distance)
+        self.capacity = capacity
+        self.alias_capacity = alias_capacity
+        self._pages: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()  # digest -> (url, fingerprint)
+        self._bands: Dict[Tuple[int, int], Dict[int, str]] = {}  # 块 -> {fingerprint: digest}
+        self.aliases: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find_or_add(self, url: str, digest: str, fingerprint: int) -> Optional[str]:
+        with self._lock:
+            page = self._pages.get(digest)
+            if page:
+                self._pages.move_to_end(digest)
+                return page[0]
+
+            for key in self._band_keys(fingerprint):
+                for candidate, candidate_digest in self._bands.get(key, {}).items():
+                    if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                        self._pages.move_to_end(candidate_digest)
+                        return self._pages[candidate_digest][0]
+
+            self._pages[digest] = (url, fingerprint)
+            for key in self._band_keys(fingerprint):
+                self._bands.setdefault(key, {})[fingerprint] = digest
+            while len(self._pages) > self.capacity:
+                self._evict_oldest()
+            return None
+
+    def _evict_oldest(self):
+        digest, (_, fingerprint) = self._pages.popitem(last=False)
+        for key in self._band_keys(fingerprint):
+            bucket = self._bands.get(key)
+            if bucket and bucket.get(fingerprint) == digest:
+                del bucket[fingerprint]
+                if not bucket:
+                    del self._bands[key]
+
+    def record_alias(self, url: str, original: str):
+        with self._lock:
+            self.aliases[url] = original
+            while len(self.aliases) > self.alias_capacity:
+                self.aliases.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+class RedisFingerprintIndex(FingerprintIndex):
+    """
+    通过 Redis 在多个 worker 间共享的索引
+
+    精确哈希用 SET NX 原子登记；SimHash 每个块对应一个有序集合，成员为 8 字节指纹加页面 URL、
+    分数为登记时间。每次写入块时删除超过 ttl 的成员，并只保留最新的 bucket_capacity 个，
+    持续有新成员的块中的旧指纹也会过期；页面记录与别名各自设置过期时间，
+    内存占用随 ttl 内的页面数有界。
+    """
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        prefix: str = 'content',
+        ttl: int = 7 * 24 * 3600,
+        bits: int = 64,
+        max_distance: int = 3,
+        bucket_capacity: int = 1000
+    ):
+        """
+        :param redis_client: Redis 客户端
+        :param prefix: 键名前缀
+        :param ttl: 指纹、页面记录与别名的保留时间（秒）
+        :param bits: 指纹位数
+        :param max_distance: 视为近似重复的最大汉明距离
+        :param bucket_capacity: 每个块最多保留的指纹数，超过时淘汰最早登记的
+        """
+        super().__init__(bits, max_distance)
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.bucket_capacity = bucket_capacity
+
+    def _page_key(self, digest: str) -> str:
+        return f'{self.prefix}:page:{digest}'
+
+    def _bucket_key(self, band: int, value: int) -> str:
+        return f'{self.prefix}:band:{band}:{value:x}'
+
+    def _alias_key(self, url: str) -> str:
+        return f'{self.prefix}:alias:{url}'
+
+    def _fp_bytes(self, fingerprint: int) -> bytes:
+        return fingerprint.to_bytes(self.bits // 8, 'big')
+
+    def find_or_add(self, url: str, digest: str, fingerprint: int) -> Optional[str]:
+        page_key = self._page_key(digest)
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.set(page_key, url, nx=True, ex=self.ttl)
+        pipe.get(page_key)
+        for band, value in self._band_keys(fingerprint):
+            # 只读取 ttl 内登记的成员，过期成员在下一次写入该块时删除
+            pipe.zrangebyscore(self._bucket_key(band, value), now - self.ttl, '+inf')
+        results = pipe.execute()
+        created, owner, buckets = results[0], results[1], results[2:]
+        if not created:
+            return owner.decode('utf-8') if owner else None
+
+        fp_size = self.bits // 8
+        for bucket in buckets:
+            for member in bucket:
+                candidate, candidate_url = member[:fp_size], member[fp_size:]
+                if hamming_distance(int.from_bytes(candidate, 'big'), fingerprint) <= self.max_distance:
+                    # 相同内容的后续页面直接指向原始页面
+                    self.redis_client.set(page_key, candidate_url, ex=self.ttl)
+                    return candidate_url.decode('utf-8')
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        member = self._fp_bytes(fingerprint) + url.encode('utf-8')
+        for band, value in self._band_keys(fingerprint):
+            key = self._bucket_key(band, value)
+            pipe.zadd(key, {member: now})
+            pipe.zremrangebyscore(key, '-inf', now - self.ttl)
+            pipe.zremrangebyrank(key, 0, -self.bucket_capacity - 1)
+            # 不再有新成员的块整体过期
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+        return None
+
+    def record_alias(self, url: str, original: str):
+        self.redis_client.set(self._alias_key(url), original, ex=self.ttl)
+
+    def get_alias(self, url: str) -> Optional[str]:
+        """
+        ttl 内记录的 url 的原始页面
+        """
+        original = self.redis_client.get(self._alias_key(url))
+        return original.decode('utf-8') if original else None
+
+
+class ContentDeduplicator:
+    """
+    抓取后、解析前的内容去重
+
+    先比较页面文本的精确哈希，再用 SimHash 查找近似重复；
+    重复页面只记录别名，不再解析和存储。
+    """
+    def __init__(self, index: Optional[FingerprintIndex] = None, min_length: int = 100):
+        """
+        :param index: 指纹索引，默认使用进程内索引
+        :param min_length: 文本短于该长度的页面不做去重（错误页、跳转页等容易误判）
+        """
+        self.index = index if index is not None else LocalFingerprintIndex()
+        self.min_length = min_length
+        self.logger = logging.getLogger(__name__)
+
+    def check(self, url: str, html: str) -> Optional[str]:
+        """
+        检查页面是否与已登记页面重复，不重复时登记
+
+        :return: 重复时返回原始页面 URL，否则返回 None
+        """
+        text = page_text(html)
+        if len(text) < self.min_length:
+            return None
+        original = self.index.find_or_add(url, exact_hash(text), simhash(text, self.index.bits))
+        if original and original != url:
+            self.index.record_alias(url, original)
+            self.logger.info(f"{url} 与 {original} 内容重复，跳过解析与存储")
+            return original
+        return None
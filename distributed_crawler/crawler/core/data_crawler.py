@@ -2,16 +2,24 @@
 import requests  
 import logging  
 import time  
-import random  
-from typing import Optional, Dict, List  
-from urllib.parse import urlparse, urljoin  
+from typing import Optional, Dict, List, Tuple  
+from urllib.parse import urlparse  
+from urllib3.util import make_headers  
 
 from .data_storage import DataStorage
-from distributed_crawler.utils.proxy_pool import ProxyPool   # type: ignore
+from distributed_crawler.utils.proxy_pool import ProxyPool, Proxy   # type: ignore
 from distributed_crawler.utils.robots_checker import RobotsChecker   # type: ignore
-from .url_manager import URLManager  # 同一目录下的模块
-from ..config.settings import CONFIG  # 上级目录的配置 # type: ignore
+from distributed_crawler.utils.http_client import HttpClient, ContentRejected, get_http_client   # type: ignore
+from distributed_crawler.utils.metrics import Metrics, get_metrics   # type: ignore
+from .frontier import Frontier  # 同一目录下的模块
+from ..config.settings import CONFIG, CRAWLER_CONFIG  # 上级目录的配置 # type: ignore
 from .data_parser import DataParser   # type: ignore
+from .scheduler import PolitenessScheduler
+from .async_engine import AsyncCrawlEngine
+from .pipeline import CrawlPipeline
+from .content_dedup import ContentDeduplicator
+from .validator_store import ValidatorStore, content_hash
+from .page_archive import PageArchive
 # 确保有 Crawler 类的定义  
 class Crawler:  
     def download(self, url):  
@@ -22,13 +30,21 @@ class Crawler:
 class DataCrawler:  
     def __init__(  
         self,   
-        url_manager: URLManager,   
+        url_manager: Frontier,   
         proxy_pool: ProxyPool,   
         robots_checker: RobotsChecker,  
         storage: DataStorage,  # 新增存储模块参数  
         data_parser: Optional[DataParser] = None,  
         max_depth: int = 3,  
-        crawl_interval: float = 1.0  
+        crawl_interval: float = 1.0,  
+        prefetch: int = 100,  
+        max_per_host: int = 1,  
+        http_client: Optional[HttpClient] = None,  
+        deduplicator: Optional[ContentDeduplicator] = None,  
+        validator_store: Optional[ValidatorStore] = None,  
+        page_archive: Optional[PageArchive] = None,  
+        metrics: Optional[Metrics] = None,  
+        idle_interval: float = 1.0  
     ):  
         self.url_manager = url_manager  
         self.proxy_pool = proxy_pool  
@@ -38,32 +54,137 @@ class DataCrawler:
         self.logger = logging.getLogger(__name__)  
         self.max_depth = max_depth  
         self.crawl_interval = crawl_interval
+        # 按主机控制抓取间隔，不同主机之间不再互相等待
+        self.scheduler = PolitenessScheduler(default_delay=crawl_interval, max_per_host=max_per_host)
+        self.prefetch = prefetch
+        # 本 worker 暂时领取不到 URL、但其他 worker 仍有待爬 URL 或租约时，重新领取的间隔（秒）
+        self.idle_interval = idle_interval
+        # 已从 URL 管理器取出、尚未抓取的 URL 的深度
+        self._url_depths: Dict[str, int] = {}
+        # 上次为这些 URL 续租的时间，主机抓取间隔较长时 URL 可能在调度器中等待超过租约时长
+        self._leases_renewed_at = time.monotonic()
+        # 共享连接池，同一主机的请求复用 keep-alive 连接
+        self.http_client = http_client or get_http_client()
+        # 内容去重（可选），重复页面跳过解析与存储
+        self.deduplicator = deduplicator
+        # 条件重抓（可选），未变化的页面跳过下载正文、解析与存储
+        self.validator_store = validator_store
+        # 已抓取、尚未保存的页面的 (响应, 内容哈希)，处理成功后才写入校验信息
+        self._pending_validators: Dict[str, Tuple[requests.Response, str]] = {}
+        # 流式下载的内容类型与大小限制
+        self.allowed_content_types = CRAWLER_CONFIG.get('allowed_content_types')
+        self.max_content_bytes = CRAWLER_CONFIG.get('max_content_bytes')
+        # 原始页面归档（可选），修改解析逻辑后可以离线重新解析
+        self.page_archive = page_archive
+        # 各阶段耗时与下载统计，待爬队列长度在导出时读取
+        self.metrics = metrics or get_metrics()
+        self.metrics.set_gauge_function('crawler_frontier_size', self.url_manager.frontier_size)
+        self.metrics.set_gauge_function('crawler_scheduler_pending', lambda: len(self.scheduler))
         # 配置请求头  
         self.headers = {  
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',  
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',  
             'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',  
+            # urllib3 能解码的压缩格式：gzip、deflate，安装 brotli / zstandard 后加上 br、zstd；边读边解压  
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],  
         }  
 
     def crawl(self):  
         """  
         主爬取方法  
+
+        从 URL 管理器预取一批 URL 交给调度器，调度器交出任意已就绪主机的 URL；
+        只有所有主机都在等待间隔时才会休眠。  
         """  
         while True:  
-            url = self.url_manager.get_waiting_url()  
+            self._fill_scheduler()  
+            # 所有主机都在等待抓取间隔时 next_url 会阻塞，计为礼貌等待  
+            with self.metrics.time_stage('politeness'):  
+                url = self.scheduler.next_url(timeout=self.url_manager.lease_renew_interval())  
             
             if not url:  
-                self.logger.info("没有更多待爬取的 URL。")  
-                break  
+                # 等待超时：回到循环开头续租  
+                if len(self.scheduler):  
+                    continue  
+                if self._crawl_finished():  
+                    self.logger.info("没有更多待爬取的 URL。")  
+                    break  
+                # 认领的分区暂时为空，或其他 worker 的租约可能失败后重新入队  
+                time.sleep(self.idle_interval)  
+                continue  
 
             try:  
-                self.handle_crawl(url)  
-                
-                # 控制爬取频率  
-                time.sleep(self.crawl_interval + random.uniform(0, 1))  
-                
+                self.handle_crawl(url, self._pop_depth(url))  
             except Exception as e:
                 self.logger.error(f"爬取 {url} 时发生错误: {e}")
+            finally:  
+                self.scheduler.release(url, self._host_delay(url))  
+
+    def crawl_async(self, concurrency: Optional[int] = None):  
+        """  
+        异步并发爬取，同时保持最多 concurrency 个请求在进行  
+
+        :param concurrency: 并发数，默认取 CRAWLER_CONFIG['workers']  
+        """  
+        AsyncCrawlEngine(self, concurrency=concurrency).run_forever()  
+
+    def crawl_pipelined(self, fetch_workers: Optional[int] = None, parse_workers: Optional[int] = None):  
+        """  
+        流水线爬取：抓取线程、解析进程池与存储阶段并行运行  
+
+        :param fetch_workers: 抓取线程数，默认取 CRAWLER_CONFIG['workers']  
+        :param parse_workers: 解析进程数，默认为 CPU 核数  
+        """  
+        pipeline = CrawlPipeline(self, fetch_workers=fetch_workers, parse_workers=parse_workers)  
+        pipeline.run()  
+        return pipeline.stats()  
+
+    def _fill_scheduler(self):  
+        """  
+        从 URL 管理器批量补充待调度的 URL，并记录其深度；三种爬取模式都会定期调用，顺带续租  
+        """  
+        self._renew_leases()  
+        need = self.prefetch - len(self.scheduler)  
+        if need <= 0:  
+            return  
+        for url, depth in self.url_manager.get_urls(need):  
+            self._url_depths[url] = depth  
+            self.scheduler.add(url)  
+
+    def _renew_leases(self):  
+        """  
+        按间隔为调度器中尚未交出的 URL 续租，避免租约过期后被其他 worker 重复抓取；  
+        分片时同时续期分区认领  
+        """  
+        if not self._leases_due():  
+            return  
+        self._leases_renewed_at = time.monotonic()  
+        self.url_manager.extend_leases(list(self._url_depths))  
+
+    def _leases_due(self) -> bool:  
+        """  
+        是否到了续租时间；调度器已满时调用方据此决定是否仍需调用 _fill_scheduler  
+        """  
+        return time.monotonic() - self._leases_renewed_at >= self.url_manager.lease_renew_interval()  
+
+    def _crawl_finished(self) -> bool:  
+        """  
+        本 worker 已空闲时判断整个爬取是否结束，而不只是本 worker 领取不到 URL  
+        """  
+        return self.url_manager.is_exhausted()  
+
+    def _pop_depth(self, url: str) -> int:  
+        """  
+        取出调度器交出的 URL 的深度  
+        """  
+        return self._url_depths.pop(url, 0)  
+
+    def _host_delay(self, url: str) -> float:  
+        """  
+        主机的抓取间隔：取 crawl_interval 与 robots.txt 建议延迟的较大值  
+        """  
+        return max(self.crawl_interval, self.robots_checker.get_crawl_delay(url))  
+
     def handle_crawl(self, url: str, depth: int = 0):
         """
         处理单个 URL 的爬取
@@ -71,104 +192,250 @@ class DataCrawler:
         :param url: 待爬取的 URL
         :param depth: 当前爬取深度
         """
+        response = self.fetch_page(url, depth)
+        if not response:
+            return
+
+        try:  
+            # 解析页面  
+            with self.metrics.time_stage('parse'):  
+                parsed_data = self.data_parser.parse(response.text, url)  
+            self.process_parsed(url, parsed_data, depth)  
+        except Exception as e:  
+            self.logger.error(f"爬取 {url} 时发生错误: {e}")  
+            self.discard_validators(url)  
+            self.url_manager.mark_url_failed(url)
+
+    def fetch_page(self, url: str, depth: int = 0) -> Optional[requests.Response]:
+        """
+        抓取阶段：深度与 Robots 检查、获取代理并下载页面
+        
+        :param url: 待爬取的 URL
+        :param depth: 当前爬取深度
+        :return: 响应对象，不需要或无法抓取时返回 None
+        """
         # 检查深度
         if depth > self.max_depth:
             self.logger.info(f"已达到最大爬取深度 {self.max_depth}")
-            return
+            self.url_manager.mark_url_visited(url)
+            return None
 
         # 检查 Robots 协议  
-        if not self.robots_checker.can_fetch(url):  
+        with self.metrics.time_stage('robots'):  
+            allowed = self.robots_checker.can_fetch(url)  
+        if not allowed:  
             self.logger.warning(f"不允许爬取 {url}，根据 robots.txt 配置。")  
-            self.url_manager.mark_url_failed(url)  
-            return  
+            self.url_manager.mark_url_failed(url, retry=False)  
+            return None  
 
         # 获取代理  
-        proxy = self._get_proxy()  
+        with self.metrics.time_stage('proxy'):  
+            proxy = self._get_proxy()  
         
         try:  
-            response = self._fetch_url(url, proxy)  
-            
-            # 处理响应  
-            if response:  
-                # 解析页面  
-                parsed_data = self.data_parser.parse(response.text, url)  
-                parsed_data['url'] = url  # 添加 URL 到解析数据中  
-                
-                # 保存数据到存储模块  
-                self.storage.save(parsed_data)  
-                
-                # 提取新的链接  
-                new_links = self._extract_links(response.text, url)  
-                
-                # 添加新链接到 URL 管理器  
-                self.url_manager.add_urls(new_links)  
-                
-                # 标记 URL 为已访问  
+            validators = self.validator_store.get(url) if self.validator_store else None  
+            conditional_headers = self.validator_store.conditional_headers(validators) if self.validator_store else None  
+            try:  
+                with self.metrics.time_stage('fetch'):  
+                    response = self._fetch_url(url, proxy, conditional_headers)  
+            finally:  
+                if proxy:  
+                    self.proxy_pool.release_proxy(proxy)  
+            if response is None:  
+                # 下载失败，租约释放后按重试次数重新入队  
+                self.url_manager.mark_url_failed(url)  
+                return None  
+            digest = content_hash(response.content) if self.validator_store else None  
+            if self._is_unchanged(url, response, validators, digest):  
+                if validators:  
+                    # 未变化时只更新校验时间，304 响应可能带有新的 ETag  
+                    self.validator_store.touch(url, validators, response)  
+                self.url_manager.mark_url_visited(url)  
+                return None  
+            if self._is_duplicate(url, response):  
+                # 重复页面到此已处理完毕，可以直接保存校验信息  
+                if self.validator_store:  
+                    self.validator_store.record(url, response, digest)  
                 self.url_manager.mark_url_visited(url)  
-                
+                return None  
+            if self.page_archive:  
+                self.page_archive.save_page(url, response)  
+            # 需要原始响应的存储（如 WARC）在这里写入，其余实现忽略  
+            self.storage.save_page(url, response)  
+            if self.validator_store:  
+                # 解析与存储成功后才保存校验信息，否则失败重试时页面会被误判为未变化  
+                self._pending_validators[url] = (response, digest)  
+            return response  
+        except requests.HTTPError as e:  
+            # 404、410 等客户端错误重试也不会成功，与 robots 禁止一样直接进入失败集合  
+            self.logger.info(f"{url} 返回不可重试的状态: {e}")  
+            self.url_manager.mark_url_failed(url, retry=False)  
+            return None  
+        except ContentRejected as e:  
+            # 非 HTML 或过大的内容不会变化成可解析页面，不再重试  
+            self.logger.info(f"跳过 {url}: {e}")  
+            self.url_manager.mark_url_visited(url)  
+            return None  
         except Exception as e:  
             self.logger.error(f"爬取 {url} 时发生错误: {e}")  
             self.url_manager.mark_url_failed(url)
+            return None
+
+    def _is_unchanged(
+        self,
+        url: str,
+        response: requests.Response,
+        validators: Optional[Dict],
+        digest: Optional[str]
+    ) -> bool:
+        """
+        页面自上次抓取后是否未变化：服务器返回 304，或内容哈希与上次相同。只做判断，不写入校验信息
+        """
+        if not self.validator_store:
+            return False
+        if response.status_code == 304:
+            self.logger.info(f"{url} 未修改 (304)，跳过解析与存储")
+            return True
+        if validators and validators.get('content_hash') == digest:
+            self.logger.info(f"{url} 内容未变化，跳过解析与存储")
+            return True
+        return False
+
+    def _record_validators(self, url: str):
+        """
+        页面处理成功后保存 fetch_page 暂存的校验信息
+        """
+        pending = self._pending_validators.pop(url, None)
+        if pending and self.validator_store:
+            self.validator_store.record(url, *pending)
 
-    def _get_proxy(self) -> Optional[Dict[str, str]]:  
+    def discard_validators(self, url: str):
+        """
+        页面解析或保存失败时丢弃暂存的校验信息，重试时按新页面处理
+        """
+        self._pending_validators.pop(url, None)
+
+    def _is_duplicate(self, url: str, response: requests.Response) -> bool:
+        """
+        页面内容是否与已抓取页面重复（精确或近似），重复时已记录别名
+        """
+        if not self.deduplicator:
+            return False
+        return self.deduplicator.check(url, response.text) is not None
+
+    def process_parsed(self, url: str, parsed_data: Dict, depth: int = 0):
+        """
+        解析之后的阶段：保存数据、加入新链接并标记 URL 已访问
+        
+        :param url: 页面 URL
+        :param parsed_data: 解析结果
+        :param depth: 页面深度，新链接的深度为 depth + 1
+        """
+        parsed_data['url'] = url  # 添加 URL 到解析数据中  
+        
+        # 保存数据到存储模块  
+        with self.metrics.time_stage('store'):  
+            self.storage.save(parsed_data)  
+        
+        # 复用解析结果中的绝对链接，不再重复解析页面  
+        new_links = self._filter_links(parsed_data.get('links', []))  
+        
+        # 添加新链接到 URL 管理器，超过最大深度的链接不再入队  
+        if depth + 1 <= self.max_depth:  
+            with self.metrics.time_stage('enqueue'):  
+                self.url_manager.add_urls(new_links, depth=depth + 1)  
+
+        # 数据与新链接都已保存，此时才记录校验信息  
+        self._record_validators(url)  
+        
+        # 标记 URL 为已访问  
+        self.url_manager.mark_url_visited(url)  
+
+    def _get_proxy(self) -> Optional[Proxy]:  
         """  
-        获取代理  
+        获取代理，占用的并发名额在请求结束后归还  
         
-        :return: 代理配置字典  
+        :return: 代理，没有可用代理时直连  
+        """  
+        return self.proxy_pool.get_proxy()  
+
+    @staticmethod  
+    def _proxy_config(proxy: Optional[Proxy]) -> Optional[Dict[str, str]]:  
+        """  
+        代理配置字典  
         """  
-        proxy = self.proxy_pool.get_proxy()  
-        return {'http': proxy, 'https': proxy} if proxy else None  
+        return {'http': proxy.url, 'https': proxy.url} if proxy else None  
 
-    def _fetch_url(self, url: str, proxy: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:  
+    def _fetch_url(  
+        self,  
+        url: str,  
+        proxy: Optional[Proxy] = None,  
+        extra_headers: Optional[Dict[str, str]] = None  
+    ) -> Optional[requests.Response]:  
         """  
-        获取 URL 内容  
+        获取 URL 内容，并把代理是否正常工作及耗时反馈给代理池  
         
         :param url: 待获取的 URL  
-        :param proxy: 代理配置  
-        :return: 响应对象  
+        :param proxy: 代理，None 表示直连  
+        :param extra_headers: 附加请求头，如条件请求头  
+        :return: 响应对象（条件请求命中时为 304 响应）；网络错误、5xx 与 429 返回 None（可重试），
+            其他 4xx 抛出 requests.HTTPError（不可重试），内容类型或大小超限时抛出 ContentRejected  
         """  
+        start = time.monotonic()  
+        headers = dict(self.headers, **extra_headers) if extra_headers else self.headers  
         try:  
-            # 获取 Robots 建议的延迟  
-            crawl_delay = self.robots_checker.get_crawl_delay(url)  
-            time.sleep(crawl_delay)  
-
-            response = requests.get(  
+            # 抓取间隔由调度器按主机控制，这里不再休眠；响应体流式读取，受类型与大小限制  
+            response = self.http_client.fetch(  
                 url,   
-                headers=self.headers,  
-                proxies=proxy,  
+                max_bytes=self.max_content_bytes,  
+                allowed_types=self.allowed_content_types,  
+                headers=headers,  
+                proxies=self._proxy_config(proxy),  
                 timeout=10  
             )  
-            
-            response.raise_for_status()  
-            return response  
-        
+        except ContentRejected:  
+            self.metrics.inc('crawler_fetch_errors_total', reason='rejected')  
+            # 已收到响应头，代理工作正常  
+            if proxy:  
+                self.proxy_pool.report(proxy, True, time.monotonic() - start)  
+            raise  
         except requests.RequestException as e:  
+            self.metrics.inc('crawler_fetch_errors_total', reason='network')  
+            if proxy:  
+                self.proxy_pool.report(proxy, False)  
             self.logger.warning(f"获取 {url} 失败: {e}")  
             return None  
 
-    def _extract_links(self, html: str, base_url: str) -> List[str]:  
+        # 收到响应即说明代理可用，目标站点的错误状态不计入代理失败  
+        if proxy:  
+            self.proxy_pool.report(proxy, True, time.monotonic() - start)  
+        self.metrics.inc('crawler_http_responses_total', status=response.status_code)  
+        self.metrics.inc('crawler_downloaded_bytes_total', len(response.content))  
+        try:  
+            response.raise_for_status()  
+        except requests.HTTPError as e:  
+            self.metrics.inc('crawler_fetch_errors_total', reason='http_status')  
+            if not self._is_retryable_status(response.status_code):  
+                raise  
+            self.logger.warning(f"获取 {url} 失败: {e}")  
+            return None  
+        return response  
+
+    @staticmethod  
+    def _is_retryable_status(status_code: int) -> bool:  
+        """  
+        服务器错误与限流（429）可能稍后恢复，值得重试；其他 4xx 不会  
         """  
-        提取页面中的链接  
+        return status_code >= 500 or status_code == 429  
+
+    def _filter_links(self, links: List[str]) -> List[str]:  
+        """  
+        过滤解析器提取的链接  
         
-        :param html: HTML 内容  
-        :param base_url: 基础 URL  
-        :return: 链接列表  
+        :param links: 绝对 URL 列表  
+        :return: 有效链接列表  
         """  
-        try:  
-            # 使用解析器提取链接  
-            links = self.data_parser.extract_links(html)  
-            
-            # 转换为绝对 URL  
-            absolute_links = [  
-                urljoin(base_url, link)   
-                for link in links   
-                if self._is_valid_url(urljoin(base_url, link))  
-            ]  
-            
-            return absolute_links  
-        except Exception as e:  
-            self.logger.error(f"提取链接时发生错误: {e}")  
-            return []  
+        return [link for link in links if self._is_valid_url(link)]  
 
     def _is_valid_url(self, url: str) -> bool:  
         """  
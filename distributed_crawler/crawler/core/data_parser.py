@@ -1,7 +1,10 @@
 from typing import Dict, List, Optional  
 import logging  
 from bs4 import BeautifulSoup  
+from bs4.builder import builder_registry  
 from urllib.parse import urljoin  
+from ..config.settings import CRAWLER_CONFIG  
+from distributed_crawler.utils.url_canonicalizer import URLCanonicalizer, get_url_canonicalizer   # type: ignore
 
 class Parser:  
     def __init__(self):  
@@ -36,19 +39,31 @@ class Parser:
         return title_tag.text.strip() if title_tag else None  
 
 class DataParser:  
-    def __init__(self):  
+    def __init__(self, features: Optional[str] = None, canonicalizer: Optional[URLCanonicalizer] = None):  
+        """  
+        :param features: BeautifulSoup 树构建器，如 'html.parser'、'lxml'，默认取 CRAWLER_CONFIG['parser_features']  
+        :param canonicalizer: 链接规范化器，默认使用进程内共享实例  
+        """  
         self.logger = logging.getLogger(__name__)  
+        features = features or CRAWLER_CONFIG.get('parser_features', 'html.parser')  
+        if builder_registry.lookup(features) is None:  
+            self.logger.warning(f"解析器 {features} 不可用，改用 html.parser")  
+            features = 'html.parser'  
+        self.features = features  
+        self.canonicalizer = canonicalizer or get_url_canonicalizer()  
 
     def parse(self, html: str, base_url: str) -> Dict:  
         """  
         详细的 HTML 解析方法  
+
+        整个页面只构建一次文档树，标题、正文、元数据、图片与绝对链接都从同一棵树提取  
         
         :param html: HTML 内容  
         :param base_url: 基础 URL  
         :return: 解析后的数据字典  
         """  
         try:  
-            soup = BeautifulSoup(html, 'html.parser')  
+            soup = BeautifulSoup(html, self.features)  
 
             # 提取标题  
             title = self._extract_title(soup)  
@@ -67,7 +82,7 @@ class DataParser:
                 'body': body,  
                 'meta': meta,  
                 'images': images,  
-                'links': self.extract_links(html, base_url)  
+                'links': self._extract_links(soup, base_url)  
             }  
 
         except Exception as e:  
@@ -112,17 +127,20 @@ class DataParser:
                 images.append(urljoin(base_url, src))  
         return images  
 
+    def _extract_links(self, soup, base_url: str) -> List[str]:  
+        """  
+        提取页面链接：转换为规范化的绝对 URL，去掉非 http(s) 链接与重复链接  
+        """  
+        return self.canonicalizer.canonicalize_many((a['href'] for a in soup.find_all('a', href=True)), base_url)  
+
     def extract_links(self, html: str, base_url: str) -> List[str]:  
         """  
         提取页面链接  
+
+        只需要链接时使用；已调用 parse 的场景应直接使用其结果中的 'links'  
         """  
         try:  
-            soup = BeautifulSoup(html, 'html.parser')  
-            links = []  
-            for a in soup.find_all('a', href=True):  
-                href = a['href']  
-                links.append(urljoin(base_url, href))  
-            return links  
+            return self._extract_links(BeautifulSoup(html, self.features), base_url)  
         except Exception as e:  
             self.logger.error(f"提取链接时发生错误: {e}")  
             return []
\ No newline at end of file
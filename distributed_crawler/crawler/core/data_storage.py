@@ -1,9 +1,23 @@
 # distributed_crawler/core/data_storage.py  
+import atexit  
+import base64  
+import gzip  
+import hashlib  
 import logging  
 import json  
-from typing import Dict, List, Optional  
+import mmap  
+import os  
+import queue  
+import struct  
+import threading  
+import time  
+import uuid  
+from datetime import datetime, timezone  
+from typing import Dict, List, Optional, Tuple  
+from urllib.parse import urlsplit  
 from abc import ABC, abstractmethod  
 import pymongo   # type: ignore
+import pymongo.errors   # type: ignore
 import mysql.connector   # type: ignore
 
 class DataStorage(ABC):  
@@ -18,46 +32,337 @@ class DataStorage(ABC):
         """  
         pass  
 
+    def save_page(self, url: str, response):  
+        """  
+        保存原始响应，只有需要原始页面的实现（如 WarcStorage）才覆盖  
+        :param url: 页面 URL  
+        :param response: requests 响应对象  
+        """  
+        pass  
+
+    def flush(self):  
+        """  
+        写出缓冲中的数据，不缓冲的实现无需覆盖  
+        """  
+        pass  
+
+    def close(self):  
+        """  
+        写出缓冲并释放资源  
+        """  
+        self.flush()  
+
+class BatchStorage(DataStorage):  
+    """  
+    批量写入的存储基类  
+
+    save 把记录放入缓冲，达到 batch_size 或距上次写出超过 flush_interval 秒时整批写入；
+    整批失败时逐条重试，单条坏数据不会导致整批丢失。子类实现 _write_batch 与 _write_one。  
+    """  
+    def __init__(self, batch_size: int = 500, flush_interval: float = 5.0):  
+        """  
+        :param batch_size: 每批写入的记录数  
+        :param flush_interval: 缓冲中的记录最多停留的秒数  
+        """  
+        self.batch_size = batch_size  
+        self.flush_interval = flush_interval  
+        self.logger = logging.getLogger(__name__)  
+        self._buffer: List[Dict] = []  
+        self._last_flush = time.monotonic()  
+        # 数据库连接通常不是线程安全的，写入统一在锁内进行  
+        self._lock = threading.RLock()  
+        self._closed = threading.Event()  
+        self._timer = threading.Thread(target=self._timer_loop, name=f'{type(self).__name__}-flush', daemon=True)  
+        self._timer.start()  
+
+    def save(self, data: Dict):  
+        with self._lock:  
+            self._buffer.append(data)  
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:  
+                self._flush_locked()  
+
+    def flush(self):  
+        with self._lock:  
+            self._flush_locked()  
+
+    def close(self):  
+        self._closed.set()  
+        self.flush()  
+
+    def _timer_loop(self):  
+        """  
+        后台定时写出，保证低流量时记录也不会在缓冲中停留过久  
+        """  
+        while not self._closed.wait(self.flush_interval / 2):  
+            with self._lock:  
+                if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:  
+                    self._flush_locked()  
+
+    def _flush_locked(self):  
+        batch, self._buffer = self._buffer, []  
+        self._last_flush = time.monotonic()  
+        if not batch:  
+            return  
+        try:  
+            written = self._write_batch(batch)  
+        except Exception as e:  
+            self.logger.warning(f"批量写入 {len(batch)} 条记录失败，改为逐条重试: {e}")  
+            written = 0  
+        for record in batch[written:]:  
+            try:  
+                self._write_one(record)  
+            except Exception as e:  
+                self.logger.error(f"保存数据 {record.get('url')} 时出错: {e}")  
+
+    @abstractmethod  
+    def _write_batch(self, records: List[Dict]) -> int:  
+        """  
+        整批写入  
+
+        :return: 已成功写入的记录数；小于 len(records) 时其余记录逐条重试  
+        """  
+        pass  
+
+    @abstractmethod  
+    def _write_one(self, record: Dict):  
+        """  
+        写入单条记录，失败时抛出异常  
+        """  
+        pass  
+
 class FileStorage(DataStorage):  
     """  
     文件存储实现  
+
+    以 JSONL 格式写入：save 只把记录放入内存缓冲，按记录数、字节数或时间间隔把整批交给后台线程，
+    由后台线程负责写入、压缩（gzip / zstd）与按大小或时间轮转文件。close 时会写出全部缓冲。  
     """  
-    def __init__(self, file_path: str = 'data.json'):  
+    def __init__(  
+        self,  
+        file_path: str = 'data.json',  
+        flush_records: int = 1000,  
+        flush_bytes: int = 1 << 20,  
+        flush_interval: float = 5.0,  
+        rotate_bytes: Optional[int] = None,  
+        rotate_interval: Optional[float] = None,  
+        compression: Optional[str] = None,  
+        max_pending_batches: int = 16  
+    ):  
+        """  
+        :param file_path: 输出文件路径；启用轮转时作为文件名模板  
+        :param flush_records: 缓冲达到多少条记录时写出  
+        :param flush_bytes: 缓冲达到多少字节时写出  
+        :param flush_interval: 距上次写出超过多少秒时写出  
+        :param rotate_bytes: 单个文件（压缩后）超过多少字节时轮转，None 表示不按大小轮转  
+        :param rotate_interval: 单个文件写入超过多少秒时轮转，None 表示不按时间轮转  
+        :param compression: None、'gzip' 或 'zstd'（需安装 zstandard）  
+        :param max_pending_batches: 等待后台线程写入的批次上限，超过时 save 阻塞  
+        """  
+        if compression not in (None, 'gzip', 'zstd'):  
+            raise ValueError(f"不支持的压缩格式: {compression}")  
+        if compression == 'zstd':  
+            import zstandard  # type: ignore  # noqa: F401  
         self.file_path = file_path  
+        self.flush_records = flush_records  
+        self.flush_bytes = flush_bytes  
+        self.flush_interval = flush_interval  
+        self.rotate_bytes = rotate_bytes  
+        self.rotate_interval = rotate_interval  
+        self.compression = compression  
         self.logger = logging.getLogger(__name__)  
 
+        self._buffer: List[bytes] = []  
+        self._buffer_bytes = 0  
+        self._buffer_lock = threading.Lock()  
+        self._last_flush = time.monotonic()  
+        self._batches: queue.Queue = queue.Queue(maxsize=max_pending_batches)  
+        self._raw = None  
+        self._stream = None  
+        self._opened_at = 0.0  
+        self._sequence = 0  
+        self._closed = False  
+        self._writer = threading.Thread(target=self._write_loop, name='file-storage-writer', daemon=True)  
+        self._writer.start()  
+        atexit.register(self.close)  
+
     def save(self, data: Dict):  
         try:  
-            with open(self.file_path, 'a', encoding='utf-8') as f:  
-                json.dump(data, f, ensure_ascii=False)  
-                f.write('\n')  
+            line = (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8')  
         except Exception as e:  
             self.logger.error(f"保存数据到文件时出错: {e}")  
+            return  
+
+        with self._buffer_lock:  
+            self._buffer.append(line)  
+            self._buffer_bytes += len(line)  
+            if (len(self._buffer) >= self.flush_records  
+                    or self._buffer_bytes >= self.flush_bytes  
+                    or time.monotonic() - self._last_flush >= self.flush_interval):  
+                batch = self._take_buffer_locked()  
+            else:  
+                batch = None  
+        if batch:  
+            self._batches.put(batch)  
+
+    def _take_buffer_locked(self) -> List[bytes]:  
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0  
+        self._last_flush = time.monotonic()  
+        return batch  
+
+    def flush(self):  
+        """  
+        写出缓冲中的记录，并等待后台线程落盘  
+        """  
+        if self._closed:  
+            return  
+        with self._buffer_lock:  
+            batch = self._take_buffer_locked()  
+        if batch:  
+            self._batches.put(batch)  
+        done = threading.Event()  
+        self._batches.put(done)  
+        done.wait()  
+
+    def close(self):  
+        """  
+        写出全部缓冲并关闭文件  
+        """  
+        if self._closed:  
+            return  
+        self.flush()  
+        self._closed = True  
+        self._batches.put(None)  
+        self._writer.join()  
+        atexit.unregister(self.close)  
+
+    def _write_loop(self):  
+        """  
+        后台写入线程：写批次、按时间写出缓冲、检查轮转  
+        """  
+        while True:  
+            try:  
+                item = self._batches.get(timeout=self.flush_interval)  
+            except queue.Empty:  
+                # 长时间没有新批次时，把缓冲中的零散记录写出  
+                with self._buffer_lock:  
+                    item = self._take_buffer_locked() if self._buffer else None  
+                if item is None:  
+                    self._maybe_rotate()  
+                    continue  
+
+            if item is None:  
+                self._close_file()  
+                return  
+            if isinstance(item, threading.Event):  
+                self._flush_file()  
+                item.set()  
+                continue  
+            try:  
+                self._maybe_rotate()  
+                if self._stream is None:  
+                    self._open_file()  
+                self._stream.write(b''.join(item))  
+                self._flush_file()  
+            except Exception as e:  
+                self.logger.error(f"保存数据到文件时出错: {e}")  
+
+    def _current_path(self) -> str:  
+        """  
+        当前文件路径：启用轮转时在文件名中加入时间戳与序号  
+        """  
+        path = self.file_path  
+        if self.rotate_bytes or self.rotate_interval:  
+            stem, ext = os.path.splitext(path)  
+            path = f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}-{self._sequence:04d}{ext}"  
+        suffix = {'gzip': '.gz', 'zstd': '.zst'}.get(self.compression, '')  
+        if suffix and not path.endswith(suffix):  
+            path += suffix  
+        return path  
+
+    def _open_file(self):  
+        self._sequence += 1  
+        self._raw = open(self._current_path(), 'ab')  
+        if self.compression == 'gzip':  
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='ab')  
+        elif self.compression == 'zstd':  
+            import zstandard  # type: ignore  
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)  
+        else:  
+            self._stream = self._raw  
+        self._opened_at = time.monotonic()  
+
+    def _flush_file(self):  
+        try:  
+            if self._stream is not None:  
+                self._stream.flush()  
+                if self._stream is not self._raw:  
+                    self._raw.flush()  
+        except Exception as e:  
+            self.logger.error(f"写出文件缓冲时出错: {e}")  
+
+    def _close_file(self):  
+        try:  
+            if self._stream is not None and self._stream is not self._raw:  
+                self._stream.close()  
+            if self._raw is not None:  
+                self._raw.close()  
+        except Exception as e:  
+            self.logger.error(f"关闭文件时出错: {e}")  
+        finally:  
+            self._stream = None  
+            self._raw = None  
 
-class MongoDBStorage(DataStorage):  
+    def _maybe_rotate(self):  
+        if self._stream is None:  
+            return  
+        too_big = self.rotate_bytes and self._raw.tell() >= self.rotate_bytes  
+        too_old = self.rotate_interval and time.monotonic() - self._opened_at >= self.rotate_interval  
+        if too_big or too_old:  
+            self._close_file()  
+
+class MongoDBStorage(BatchStorage):  
     """  
-    MongoDB 存储实现  
+    MongoDB 存储实现，使用 insert_many 批量写入  
     """  
-    def __init__(self, db_config: Dict):  
+    def __init__(self, db_config: Dict, batch_size: int = 500, flush_interval: float = 5.0):  
         self.db_config = db_config  
-        self.logger = logging.getLogger(__name__)  
         self.client = pymongo.MongoClient(**self.db_config)  
         self.db = self.client[self.db_config.get('db_name', 'crawler_db')]  
         self.collection = self.db['pages']  
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval)  
 
-    def save(self, data: Dict):  
+    def _write_batch(self, records: List[Dict]) -> int:  
         try:  
-            self.collection.insert_one(data)  
-        except Exception as e:  
-            self.logger.error(f"保存数据到 MongoDB 时出错: {e}")  
+            # 有序写入：出错时前 nInserted 条已经成功，其余逐条重试  
+            self.collection.insert_many(records, ordered=True)  
+            return len(records)  
+        except pymongo.errors.BulkWriteError as e:  
+            inserted = e.details.get('nInserted', 0)  
+            self.logger.warning(f"MongoDB 批量写入在第 {inserted + 1} 条记录处失败")  
+            return inserted  
+
+    def _write_one(self, record: Dict):  
+        # insert_many 已为记录生成 _id，重试时重复写入会因主键冲突被拒绝，不会产生重复数据  
+        self.collection.insert_one(record)  
+
+    def close(self):  
+        """  
+        写出缓冲并关闭连接  
+        """  
+        super().close()  
+        self.client.close()  
 
-class MySQLStorage(DataStorage):  
+class MySQLStorage(BatchStorage):  
     """  
-    MySQL 存储实现  
+    MySQL 存储实现，使用 executemany 批量写入，每批只提交一次事务  
     """  
-    def __init__(self, db_config: Dict):  
+    INSERT_QUERY = """  
+        INSERT INTO pages (url, title, body, meta, images, links)  
+        VALUES (%s, %s, %s, %s, %s, %s)  
+    """  
+
+    def __init__(self, db_config: Dict, batch_size: int = 500, flush_interval: float = 5.0):  
         self.db_config = db_config  
-        self.logger = logging.getLogger(__name__)  
         self.conn = mysql.connector.connect(**self.db_config)  
         self.cursor = self.conn.cursor()  
 
@@ -75,29 +380,293 @@ class MySQLStorage(DataStorage):
             )  
         """)  
         self.conn.commit()  
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval)  
 
-    def save(self, data: Dict):  
+    @staticmethod  
+    def _values(data: Dict):  
+        return (  
+            data.get('url'),  
+            data.get('title'),  
+            data.get('body'),  
+            json.dumps(data.get('meta', {})),  
+            json.dumps(data.get('images', [])),  
+            json.dumps(data.get('links', []))  
+        )  
+
+    def _write_batch(self, records: List[Dict]) -> int:  
         try:  
-            query = """  
-                INSERT INTO pages (url, title, body, meta, images, links)  
-                VALUES (%s, %s, %s, %s, %s, %s)  
-            """  
-            values = (  
-                data.get('url'),  
-                data.get('title'),  
-                data.get('body'),  
-                json.dumps(data.get('meta', {})),  
-                json.dumps(data.get('images', [])),  
-                json.dumps(data.get('links', []))  
-            )  
-            self.cursor.execute(query, values)  
+            self.cursor.executemany(self.INSERT_QUERY, [self._values(data) for data in records])  
             self.conn.commit()  
-        except Exception as e:  
-            self.logger.error(f"保存数据到 MySQL 时出错: {e}")  
+            return len(records)  
+        except Exception:  
+            self.conn.rollback()  
+            raise  
+
+    def _write_one(self, record: Dict):  
+        try:  
+            self.cursor.execute(self.INSERT_QUERY, self._values(record))  
+            self.conn.commit()  
+        except Exception:  
+            self.conn.rollback()  
+            raise  
 
     def close(self):  
         """  
-        关闭数据库连接  
+        写出缓冲并关闭数据库连接  
         """  
+        super().close()  
         self.cursor.close()  
-        self.conn.close()  
+        self.conn.close()
+
+
+def _url_hash(url: str) -> int:
+    """
+    URL 的 64 位哈希，0 保留给空槽位
+    """
+    value = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class _MmapIndex:
+    """
+    内存映射的开放寻址哈希表：URL 哈希 -> (分段号, 偏移, 长度)
+
+    文件头记录容量与条目数，槽位定长、线性探测；装载率超过 0.7 时重建为两倍容量。
+    查找只访问映射内存，不需要加载整个索引。
+    """
+    HEADER = struct.Struct('<4sIQQ')  # 魔数、版本、容量、条目数
+    SLOT = struct.Struct('<QIQI')  # URL 哈希、分段号、偏移、长度
+    MAGIC = b'WIDX'
+    MAX_LOAD = 0.7
+
+    def __init__(self, path: str, capacity: int = 1 << 16):
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, capacity)
+        self._open()
+
+    def _create(self, path: str, capacity: int):
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, 1, capacity, 0))
+            f.truncate(self.HEADER.size + capacity * self.SLOT.size)
+
+    def _open(self):
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, _, self.capacity, self.count = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path} 不是 WARC 索引文件")
+
+    def _slot(self, i: int) -> Tuple[int, int, int, int]:
+        return self.SLOT.unpack_from(self._map, self.HEADER.size + i * self.SLOT.size)
+
+    def _probe(self, key: int) -> int:
+        """
+        key 所在的槽位，不存在时返回应插入的空槽位
+        """
+        i = key % self.capacity
+        while True:
+            slot_key = self._slot(i)[0]
+            if slot_key == key or slot_key == 0:
+                return i
+            i = (i + 1) % self.capacity
+
+    def get(self, key: int) -> Optional[Tuple[int, int, int]]:
+        slot_key, segment, offset, length = self._slot(self._probe(key))
+        return (segment, offset, length) if slot_key else None
+
+    def put(self, key: int, segment: int, offset: int, length: int):
+        if (self.count + 1) > self.capacity * self.MAX_LOAD:
+            self._grow()
+        i = self._probe(key)
+        if self._slot(i)[0] == 0:
+            self.count += 1
+            self.HEADER.pack_into(self._map, 0, self.MAGIC, 1, self.capacity, self.count)
+        self.SLOT.pack_into(self._map, self.HEADER.size + i * self.SLOT.size, key, segment, offset, length)
+
+    def _grow(self):
+        entries = [slot for slot in (self._slot(i) for i in range(self.capacity)) if slot[0]]
+        tmp_path = self.path + '.tmp'
+        self._create(tmp_path, self.capacity * 2)
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+        for key, segment, offset, length in entries:
+            self.put(key, segment, offset, length)
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class WarcStorage(DataStorage):
+    """
+    WARC 存储实现
+
+    save_page 为每个页面写出 request 与 response 两条 WARC 记录（含请求头与响应头），
+    save 把解析结果写成引用同一 URL 的 metadata 记录。记录逐条 gzip 压缩后顺序追加到分段文件
+    （warc-NNNNN.warc.gz，符合 .warc.gz 惯例，可直接交给下游工具），分段文件保持打开，不再逐条打开文件。
+    旁路索引 index.idx 是内存映射的哈希表，URL 到最新 response 记录的 (分段, 偏移, 长度)，
+    get_page 只需一次 seek 与一次读取。
+
+    响应体保存的是解压后的内容，因此响应头中去掉了 Content-Encoding / Transfer-Encoding 并改写 Content-Length。
+    """
+    def __init__(self, directory: str = 'warc', segment_bytes: int = 1 << 30, index_capacity: int = 1 << 16):
+        """
+        :param directory: 输出目录
+        :param segment_bytes: 单个分段文件超过多少字节时换新文件
+        :param index_capacity: 新建索引的初始槽位数
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        self.index = _MmapIndex(os.path.join(directory, 'index.idx'), index_capacity)
+        self._lock = threading.Lock()
+        self._segment = max(len(self._segment_paths()) - 1, 0)
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+    def _segment_paths(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith('warc-') and name.endswith('.warc.gz')
+        )
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f'warc-{segment:05d}.warc.gz')
+
+    @staticmethod
+    def _record(warc_type: str, url: str, content_type: str, block: bytes, extra: Optional[Dict[str, str]] = None) -> Tuple[str, bytes]:
+        """
+        构造一条 gzip 压缩的 WARC/1.1 记录
+        """
+        record_id = f'<urn:uuid:{uuid.uuid4()}>'
+        digest = base64.b32encode(hashlib.sha1(block).digest()).decode('ascii')
+        headers = {
+            'WARC-Type': warc_type,
+            'WARC-Record-ID': record_id,
+            'WARC-Date': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'WARC-Target-URI': url,
+            'WARC-Block-Digest': f'sha1:{digest}',
+            'Content-Type': content_type,
+        }
+        headers.update(extra or {})
+        headers['Content-Length'] = str(len(block))
+        head = 'WARC/1.1\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers.items()) + '\r\n'
+        return record_id, gzip.compress(head.encode('utf-8') + block + b'\r\n\r\n')
+
+    @staticmethod
+    def _http_request_block(response) -> bytes:
+        request = response.request
+        parts = urlsplit(request.url)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        lines = [f'{request.method} {target} HTTP/1.1', f'Host: {parts.netloc}']
+        lines += [f'{k}: {v}' for k, v in request.headers.items() if k.lower() != 'host']
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace')
+
+    @staticmethod
+    def _http_response_block(response) -> bytes:
+        body = response.content or b''
+        lines = [f'HTTP/1.1 {response.status_code} {response.reason or ""}'.rstrip()]
+        for k, v in response.headers.items():
+            if k.lower() not in ('content-encoding', 'transfer-encoding', 'content-length'):
+                lines.append(f'{k}: {v}')
+        lines.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace') + body
+
+    def _append_locked(self, data: bytes) -> Tuple[int, int]:
+        """
+        追加压缩记录，返回 (分段号, 偏移)
+        """
+        offset = self._file.tell()
+        if offset >= self.segment_bytes:
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+            offset = 0
+        self._file.write(data)
+        return self._segment, offset
+
+    def save_page(self, url: str, response):
+        try:
+            response_id, response_record = self._record(
+                'response', url, 'application/http; msgtype=response', self._http_response_block(response)
+            )
+            records = [response_record]
+            if response.request is not None:
+                records.append(self._record(
+                    'request', url, 'application/http; msgtype=request', self._http_request_block(response),
+                    {'WARC-Concurrent-To': response_id}
+                )[1])
+        except Exception as e:
+            self.logger.error(f"生成 {url} 的 WARC 记录时出错: {e}")
+            return
+
+        with self._lock:
+            segment, offset = self._append_locked(records[0])
+            for record in records[1:]:
+                self._append_locked(record)
+            self.index.put(_url_hash(url), segment, offset, len(records[0]))
+
+    def save(self, data: Dict):
+        try:
+            url = data.get('url', '')
+            block = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            _, record = self._record('metadata', url, 'application/json', block)
+        except Exception as e:
+            self.logger.error(f"保存数据到 WARC 文件时出错: {e}")
+            return
+        with self._lock:
+            self._append_locked(record)
+
+    def get_page(self, url: str) -> Optional[Dict]:
+        """
+        按 URL 读取最近保存的响应
+
+        :return: {'url', 'status', 'headers', 'content'}，不存在时返回 None
+        """
+        with self._lock:
+            location = self.index.get(_url_hash(url))
+            if location is None:
+                return None
+            segment, offset, length = location
+            if segment == self._segment:
+                self._file.flush()
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            record = gzip.decompress(f.read(length))
+
+        head, _, block = record.partition(b'\r\n\r\n')
+        warc_headers = dict(
+            line.split(': ', 1) for line in head.decode('utf-8').split('\r\n')[1:] if ': ' in line
+        )
+        if warc_headers.get('WARC-Target-URI') != url:
+            return None
+        block = block[:int(warc_headers['Content-Length'])]
+        http_head, _, body = block.partition(b'\r\n\r\n')
+        status_line, *header_lines = http_head.decode('latin-1').split('\r\n')
+        return {
+            'url': url,
+            'status': int(status_line.split(' ')[1]),
+            'headers': dict(line.split(': ', 1) for line in header_lines if ': ' in line),
+            'content': body
+        }
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self.index.flush()
+
+    def close(self):
+        """
+        写出缓冲并关闭分段文件与索引
+        """
+        with self._lock:
+            self._file.close()
+            self.index.close()
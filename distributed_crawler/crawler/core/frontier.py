@@ -0,0 +1,149 @@
+# crawler/core/frontier.py
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..config.settings import CRAWLER_CONFIG, SHARDING_CONFIG
+
+
+class Frontier(ABC):
+    """
+    待爬队列（frontier）的抽象基类，DataCrawler 只依赖这里的接口
+
+    出队采用租约语义：get_urls 领取的 URL 必须通过 mark_url(s)_visited 或 mark_url(s)_failed 确认，
+    失败的 URL 未超过重试上限时重新入队。add_urls 负责规范化、按深度过滤与去重。
+    """
+    # 租约时长（秒），实现通常在构造时按参数覆盖
+    lease_timeout: float = CRAWLER_CONFIG.get('lease_timeout', 300)
+
+    @abstractmethod
+    def add_urls(self, urls: Iterable[str], depth: int = 0, priority: Optional[float] = None) -> Dict[str, int]:
+        """
+        批量添加 URL
+
+        :param urls: 待添加的 URL
+        :param depth: 这些 URL 的深度
+        :param priority: 优先级分数，越小越先爬取；默认等于深度
+        :return: {'new': 新入队数量, 'duplicate': 重复数量, 'too_deep': 超过最大深度的数量, 'invalid': 无效数量}
+        """
+        pass
+
+    def add_seed_urls(self, urls: List[str]) -> Dict[str, int]:
+        """
+        添加种子 URL（深度为 0）
+        """
+        return self.add_urls(urls, depth=0)
+
+    @abstractmethod
+    def get_urls(self, count: int) -> List[Tuple[str, int]]:
+        """
+        按优先级批量领取 URL
+
+        :param count: 最多获取的数量
+        :return: [(URL, 深度), ...]
+        """
+        pass
+
+    def get_url(self) -> Optional[str]:
+        """
+        获取一个待爬取的 URL
+        """
+        urls = self.get_urls(1)
+        return urls[0][0] if urls else None
+
+    @abstractmethod
+    def mark_urls_visited(self, urls: List[str]):
+        """
+        批量确认 URL 已成功处理
+        """
+        pass
+
+    def mark_url_visited(self, url: str):
+        self.mark_urls_visited([url])
+
+    @abstractmethod
+    def mark_urls_failed(self, urls: List[str], retry: bool = True) -> int:
+        """
+        批量确认 URL 处理失败
+
+        :param retry: 是否允许重试；False 时直接进入失败集合
+        :return: 重新入队的数量
+        """
+        pass
+
+    def mark_url_failed(self, url: str, retry: bool = True):
+        self.mark_urls_failed([url], retry=retry)
+
+    def extend_leases(self, urls: List[str], timeout: Optional[float] = None):
+        """
+        为仍在处理中的 URL 续租，没有租约超时的实现无需覆盖
+        """
+        pass
+
+    def lease_renew_interval(self) -> float:
+        """
+        持有已领取 URL 的一方调用 extend_leases 的间隔（秒），留出两次续租失败的余量
+        """
+        return self.lease_timeout / 3
+
+    def requeue_expired(self, limit: int = 1000) -> int:
+        """
+        回收已过期的租约
+
+        :return: 回收的数量
+        """
+        return 0
+
+    @abstractmethod
+    def frontier_size(self) -> int:
+        """
+        待爬 URL 数量
+        """
+        pass
+
+    @abstractmethod
+    def inflight_size(self) -> int:
+        """
+        已领取、尚未确认的 URL 数量
+        """
+        pass
+
+    def is_exhausted(self) -> bool:
+        """
+        整个待爬队列是否已无工作：没有待爬 URL，也没有任何 worker 持有租约（租约失败或过期后会重新入队）。
+        某个 worker 暂时领取不到 URL 时应等待，只有返回 True 才结束
+        """
+        return self.frontier_size() == 0 and self.inflight_size() == 0
+
+    @abstractmethod
+    def get_failed_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        """
+        流式导出超过重试上限的 URL
+        """
+        pass
+
+    def close(self):
+        """
+        释放资源，无需释放的实现不必覆盖
+        """
+        pass
+
+
+def create_frontier(kind: Optional[str] = None, **kwargs) -> Frontier:
+    """
+    按名称创建待爬队列
+
+    :param kind: 'redis'（配置了多个实例时按主机分片）或 'sqlite'（单机、磁盘存储），
+        默认取 CRAWLER_CONFIG['frontier']
+    :param kwargs: 传给具体实现的参数，默认取 CRAWLER_CONFIG['frontier_options']
+    """
+    kind = kind or CRAWLER_CONFIG.get('frontier', 'redis')
+    options = dict(CRAWLER_CONFIG.get('frontier_options', {}), **kwargs)
+    if kind == 'redis':
+        # 两个实现都依赖本模块，在这里按需导入
+        from .sharding import ShardedURLManager
+        from .url_manager import URLManager
+        return ShardedURLManager(**options) if SHARDING_CONFIG['shards'] else URLManager(**options)
+    if kind == 'sqlite':
+        from .sqlite_frontier import SQLiteFrontier
+        return SQLiteFrontier(**options)
+    raise ValueError(f"未知的待爬队列类型: {kind}")
@@ -0,0 +1,231 @@
+# crawler/core/page_archive.py
+import glob
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+# 记录头：URL 长度、元数据长度、压缩数据长度、标志位
+_RECORD_HEADER = struct.Struct('>IIIB')
+# 标志位：正文用训练好的字典压缩
+_FLAG_DICT = 1
+
+
+class PageArchive:
+    """
+    原始页面归档
+
+    每个页面的原始字节单独用 zstd 压缩后追加到分段文件（pages-NNNNN.zpa），记录中同时保存 URL、
+    状态码、内容类型、编码与抓取时间，离线重新解析时不需要重新抓取。
+    指定 train_samples 时，先缓存这么多页面训练本次爬取的 zstd 字典（保存为 pages.dict），
+    之后的页面都用该字典压缩；同一站点的页面结构相似，小页面的压缩率因此明显提高。
+    """
+    def __init__(
+        self,
+        directory: str,
+        level: int = 3,
+        segment_bytes: int = 256 << 20,
+        train_samples: int = 0,
+        dict_size: int = 112640
+    ):
+        """
+        :param directory: 归档目录
+        :param level: zstd 压缩级别
+        :param segment_bytes: 单个分段文件超过多少字节时换新文件
+        :param train_samples: 用于训练字典的页面数，0 表示不使用字典；目录中已有字典时直接复用
+        :param dict_size: 字典大小（字节）
+        """
+        import zstandard  # type: ignore
+
+        self._zstd = zstandard
+        self.directory = directory
+        self.level = level
+        self.segment_bytes = segment_bytes
+        self.train_samples = train_samples
+        self.dict_size = dict_size
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+
+        self.dict_path = os.path.join(directory, 'pages.dict')
+        self._dictionary = self._load_dictionary()
+        # 等待训练字典的页面
+        self._pending: Optional[List[Dict]] = [] if train_samples and self._dictionary is None else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment = len(self._segments())
+        self._closed = False
+
+    def _load_dictionary(self):
+        if not os.path.exists(self.dict_path):
+            return None
+        with open(self.dict_path, 'rb') as f:
+            return self._zstd.ZstdCompressionDict(f.read())
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, 'pages-*.zpa')))
+
+    def _compressor(self, dictionary):
+        """
+        压缩器不是线程安全的，每个线程各用一个
+        """
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None or self._local.dictionary is not dictionary:
+            compressor = self._zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+            self._local.compressor = compressor
+            self._local.dictionary = dictionary
+        return compressor
+
+    def save_page(self, url: str, response: requests.Response):
+        """
+        归档一个已下载的页面
+        """
+        page = {
+            'url': url,
+            'content': response.content,
+            'meta': {
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type'),
+                'encoding': response.encoding,
+                'fetched_at': time.time()
+            }
+        }
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(page)
+                if len(self._pending) < self.train_samples:
+                    return
+                self._train_locked()
+                return
+        self._write(page)
+
+    def _train_locked(self):
+        """
+        用缓存的页面训练字典，再写出这些页面
+        """
+        pending, self._pending = self._pending, None
+        try:
+            dictionary = self._zstd.train_dictionary(self.dict_size, [page['content'] for page in pending])
+            with open(self.dict_path, 'wb') as f:
+                f.write(dictionary.as_bytes())
+            self._dictionary = dictionary
+            self.logger.info(f"已用 {len(pending)} 个页面训练归档字典: {self.dict_path}")
+        except self._zstd.ZstdError as e:
+            self.logger.warning(f"训练归档字典失败，不使用字典: {e}")
+        for page in pending:
+            self._write_locked(self._encode(page))
+
+    def _encode(self, page: Dict) -> bytes:
+        url = page['url'].encode('utf-8')
+        meta = json.dumps(page['meta']).encode('utf-8')
+        dictionary = self._dictionary
+        data = self._compressor(dictionary).compress(page['content'])
+        flags = _FLAG_DICT if dictionary is not None else 0
+        return _RECORD_HEADER.pack(len(url), len(meta), len(data), flags) + url + meta + data
+
+    def _write(self, page: Dict):
+        # 压缩在锁外进行，锁内只追加
+        record = self._encode(page)
+        with self._lock:
+            self._write_locked(record)
+
+    def _write_locked(self, record: bytes):
+        if self._closed:
+            self.logger.error("页面归档已关闭，丢弃记录")
+            return
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            if self._file:
+                self._file.close()
+                self._segment += 1
+            path = os.path.join(self.directory, f'pages-{self._segment:05d}.zpa')
+            self._file = open(path, 'ab', buffering=1 << 20)
+        self._file.write(record)
+
+    def flush(self):
+        """
+        写出缓冲；字典尚未训练时用已缓存的页面训练
+        """
+        with self._lock:
+            if self._pending:
+                self._train_locked()
+            if self._file:
+                self._file.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closed = True
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def iter_pages(self) -> Iterator[Dict]:
+        """
+        按写入顺序读取全部页面
+
+        :return: {'url', 'html', 'content', 'status', 'content_type', 'encoding', 'fetched_at'}
+        """
+        self.flush()
+        dictionary = self._load_dictionary()
+        plain = self._zstd.ZstdDecompressor()
+        with_dict = self._zstd.ZstdDecompressor(dict_data=dictionary) if dictionary else None
+        for path in self._segments():
+            with open(path, 'rb') as f:
+                while True:
+                    header = f.read(_RECORD_HEADER.size)
+                    if len(header) < _RECORD_HEADER.size:
+                        break
+                    url_len, meta_len, data_len, flags = _RECORD_HEADER.unpack(header)
+                    url = f.read(url_len).decode('utf-8')
+                    meta = json.loads(f.read(meta_len))
+                    data = f.read(data_len)
+                    if len(data) < data_len:
+                        self.logger.warning(f"{path} 末尾的记录不完整，已跳过")
+                        break
+                    decompressor = with_dict if flags & _FLAG_DICT else plain
+                    if decompressor is None:
+                        self.logger.error(f"{path} 中的记录需要字典 {self.dict_path}，已跳过")
+                        continue
+                    content = decompressor.decompress(data)
+                    page = dict(meta, url=url, content=content)
+                    page['html'] = content.decode(meta.get('encoding') or 'utf-8', errors='replace')
+                    yield page
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """
+        分批读取页面，用于离线重新解析
+        """
+        batch: List[Dict] = []
+        for page in self.iter_pages():
+            batch.append(page)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def reparse_archive(archive: PageArchive, data_parser, storage, batch_size: int = 1000) -> int:
+    """
+    用当前的解析逻辑重新解析归档页面并写入存储
+
+    :return: 处理的页面数
+    """
+    logger = logging.getLogger(__name__)
+    count = 0
+    for batch in archive.iter_batches(batch_size):
+        for page in batch:
+            try:
+                parsed_data = data_parser.parse(page['html'], page['url'])
+                parsed_data['url'] = page['url']
+                storage.save(parsed_data)
+                count += 1
+            except Exception as e:
+                logger.error(f"重新解析 {page['url']} 时发生错误: {e}")
+    storage.flush()
+    return count
@@ -0,0 +1,265 @@
+# crawler/core/pipeline.py
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from ..config.settings import CRAWLER_CONFIG
+from .data_parser import DataParser
+
+# 解析进程内复用的解析器实例
+_worker_parser: Optional[DataParser] = None
+
+
+def _init_parse_worker(features: str):
+    global _worker_parser
+    _worker_parser = DataParser(features=features)
+
+
+def _parse_in_worker(html: str, url: str) -> Tuple[Dict, float]:
+    """
+    在解析进程中执行，必须是模块级函数才能被序列化
+
+    :return: (解析结果, 解析耗时)；指标只在主进程中汇总，耗时随结果带回
+    """
+    start = time.perf_counter()
+    parsed_data = _worker_parser.parse(html, url)
+    return parsed_data, time.perf_counter() - start
+
+
+_STOP = object()
+
+
+class CrawlPipeline:
+    """
+    抓取 / 解析 / 存储三段式流水线
+
+    抓取线程把原始页面放入有界的 fetch_queue，队列满时抓取线程阻塞（背压）；
+    分发线程把页面提交给 DataParser 进程池，同时在途的解析任务不超过 max_parse_in_flight；
+    解析结果进入有界的 result_queue，由存储线程写入存储并把新链接加入 URL 管理器。
+    """
+    def __init__(
+        self,
+        crawler,
+        fetch_workers: Optional[int] = None,
+        parse_workers: Optional[int] = None,
+        fetch_queue_size: int = 100,
+        max_parse_in_flight: Optional[int] = None
+    ):
+        """
+        :param crawler: DataCrawler 实例
+        :param fetch_workers: 抓取线程数，默认取 CRAWLER_CONFIG['workers']
+        :param parse_workers: 解析进程数，默认为 CPU 核数
+        :param fetch_queue_size: 待解析原始页面队列的容量
+        :param max_parse_in_flight: 已提交给进程池但未存储完的页面上限，默认为解析进程数的 2 倍，
+            同时也是 result_queue 的容量
+        """
+        self.crawler = crawler
+        self.fetch_workers = fetch_workers or CRAWLER_CONFIG.get('workers', 10)
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.max_parse_in_flight = max_parse_in_flight or self.parse_workers * 2
+        self.fetch_queue: queue.Queue = queue.Queue(maxsize=fetch_queue_size)
+        self.result_queue: queue.Queue = queue.Queue(maxsize=self.max_parse_in_flight + 1)
+        self.logger = logging.getLogger(__name__)
+
+        self._parse_slots = threading.BoundedSemaphore(self.max_parse_in_flight)
+        self._stop_event = threading.Event()
+        self._fill_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # 已从调度器取出、尚未完成存储阶段的 URL 数
+        self._outstanding = 0
+        self._counters = {'fetched': 0, 'fetch_failed': 0, 'parsed': 0, 'failed': 0, 'stored': 0, 'finished': 0}
+        self._parse_in_flight = 0
+        self._started_at = 0.0
+
+    def stop(self):
+        """
+        请求停止：抓取线程不再取新 URL，已抓取的页面会继续处理完
+        """
+        self._stop_event.set()
+
+    def stats(self) -> Dict:
+        """
+        各阶段的队列深度与吞吐计数
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['parse_in_flight'] = self._parse_in_flight
+            stats['outstanding'] = self._outstanding
+        stats['fetch_queue'] = self.fetch_queue.qsize()
+        stats['result_queue'] = self.result_queue.qsize()
+        stats['scheduler_pending'] = len(self.crawler.scheduler)
+        stats['elapsed'] = round(time.monotonic() - self._started_at, 3) if self._started_at else 0
+        return stats
+
+    def _incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def _finish_one(self):
+        with self._lock:
+            self._outstanding -= 1
+            self._counters['finished'] += 1
+
+    def run(self):
+        """
+        运行流水线直到没有待爬 URL 或收到停止请求
+        """
+        self._started_at = time.monotonic()
+        executor = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            initializer=_init_parse_worker,
+            initargs=(self.crawler.data_parser.features,)
+        )
+        fetchers = [
+            threading.Thread(target=self._fetch_loop, name=f'fetch-{i}', daemon=True)
+            for i in range(self.fetch_workers)
+        ]
+        dispatcher = threading.Thread(target=self._dispatch_loop, args=(executor,), name='parse-dispatch', daemon=True)
+        sink = threading.Thread(target=self._store_loop, name='store', daemon=True)
+
+        sink.start()
+        dispatcher.start()
+        for thread in fetchers:
+            thread.start()
+        try:
+            for thread in fetchers:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.logger.info("收到中断，等待流水线中的页面处理完成")
+            self.stop()
+            for thread in fetchers:
+                thread.join()
+        finally:
+            # 依次关闭各阶段，保证已抓取的页面都被解析和存储
+            self.fetch_queue.put(_STOP)
+            dispatcher.join()
+            executor.shutdown(wait=True)
+            sink.join()
+        self.logger.info(f"流水线结束: {self.stats()}")
+
+    def _next_url(self):
+        """
+        取下一个已就绪的 URL；取出与计数在同一把锁内完成，空闲判断才不会漏掉正在处理的 URL
+
+        :return: (URL, 等待秒数)，URL 为 None 且等待秒数为 -1 表示已无工作
+        """
+        scheduler = self.crawler.scheduler
+        with self._lock:
+            url, wait = scheduler.pop_ready()
+            if url:
+                self._outstanding += 1
+                return url, 0
+            if wait > 0 or self._outstanding:
+                return None, wait if wait > 0 else 0.05
+            generation = self._counters['finished']
+
+        # 各阶段都已空闲：补充一次 URL，期间没有任何 URL 完成且仍无新 URL 才算结束
+        with self._fill_lock:
+            self.crawler._fill_scheduler()
+        with self._lock:
+            idle = self._outstanding == 0 and self._counters['finished'] == generation and len(scheduler) == 0
+        if not idle:
+            return None, 0
+        # 本 worker 领取不到 URL 时，整个待爬队列也为空才结束
+        return (None, -1) if self.crawler._crawl_finished() else (None, self.crawler.idle_interval)
+
+    def _fetch_loop(self):
+        """
+        抓取阶段
+        """
+        scheduler = self.crawler.scheduler
+        while not self._stop_event.is_set():
+            with self._fill_lock:
+                if len(scheduler) < self.crawler.prefetch or self.crawler._leases_due():
+                    self.crawler._fill_scheduler()
+
+            url, wait = self._next_url()
+            if not url:
+                if wait < 0:
+                    self._stop_event.set()
+                    break
+                if wait > 0:
+                    # 没有已就绪的主机，计为礼貌等待
+                    with self.crawler.metrics.time_stage('politeness'):
+                        self._stop_event.wait(min(wait, 0.5))
+                else:
+                    self._stop_event.wait(0)
+                continue
+
+            depth = self.crawler._pop_depth(url)
+            response = None
+            try:
+                response = self.crawler.fetch_page(url, depth)
+            except Exception as e:
+                self.logger.error(f"爬取 {url} 时发生错误: {e}")
+            finally:
+                scheduler.release(url, self.crawler._host_delay(url))
+
+            if response is None:
+                self._incr('fetch_failed')
+                self._finish_one()
+                continue
+            self._incr('fetched')
+            # 队列满时阻塞，抓取速度自动受解析与存储速度限制
+            self.fetch_queue.put((url, depth, response.text))
+
+    def _dispatch_loop(self, executor: ProcessPoolExecutor):
+        """
+        解析分发阶段
+        """
+        while True:
+            item = self.fetch_queue.get()
+            if item is _STOP:
+                break
+            url, depth, html = item
+            self._parse_slots.acquire()
+            with self._lock:
+                self._parse_in_flight += 1
+            future = executor.submit(_parse_in_worker, html, url)
+            future.add_done_callback(lambda f, url=url, depth=depth: self._on_parsed(url, depth, f))
+
+        # 等所有在途解析结束后通知存储线程
+        for _ in range(self.max_parse_in_flight):
+            self._parse_slots.acquire()
+        self.result_queue.put(_STOP)
+
+    def _on_parsed(self, url: str, depth: int, future: Future):
+        """
+        解析完成回调，在进程池的结果线程中执行，只做入队
+        """
+        with self._lock:
+            self._parse_in_flight -= 1
+        self.result_queue.put((url, depth, future))
+
+    def _store_loop(self):
+        """
+        存储阶段
+        """
+        while True:
+            item = self.result_queue.get()
+            if item is _STOP:
+                break
+            url, depth, future = item
+            try:
+                parsed_data, parse_seconds = future.result()
+                self.crawler.metrics.observe('crawler_stage_seconds', parse_seconds, stage='parse')
+                self._incr('parsed')
+                self.crawler.process_parsed(url, parsed_data, depth)
+                self._incr('stored')
+            except Exception as e:
+                self._incr('failed')
+                self.logger.error(f"处理 {url} 时发生错误: {e}")
+                self.crawler.discard_validators(url)
+                try:
+                    self.crawler.url_manager.mark_url_failed(url)
+                except Exception as mark_error:
+                    self.logger.error(f"标记 {url} 失败时发生错误: {mark_error}")
+            finally:
+                # 解析名额在结果真正处理完后才归还，结果队列因此也是有界的
+                self._parse_slots.release()
+                self._finish_one()
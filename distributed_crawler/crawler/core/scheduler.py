@@ -0,0 +1,177 @@
+# crawler/core/scheduler.py
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def get_host(url: str) -> str:
+    """
+    取 URL 的主机部分（小写），作为礼貌爬取的粒度
+    """
+    return urlparse(url).netloc.lower()
+
+
+class PolitenessScheduler:
+    """
+    按主机控制抓取间隔的调度器
+
+    每个主机维护一个待爬队列和“下次允许抓取时间”，可调度的主机放在按该时间排序的堆里。
+    next_url 总是交出已就绪主机的 URL，只有所有主机都未就绪时才等待；
+    每个主机同时被交出的 URL 不超过 max_per_host，调用 release 后按抓取延迟重新排期。
+    """
+    def __init__(
+        self,
+        default_delay: float = 1.0,
+        max_per_host: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        :param default_delay: release 未指定延迟时使用的主机抓取间隔（秒）
+        :param max_per_host: 每个主机同时进行中的抓取数上限
+        :param clock: 单调时钟，便于测试替换
+        """
+        self.default_delay = default_delay
+        self.max_per_host = max_per_host
+        self.clock = clock
+        self._queues: Dict[str, Deque[str]] = {}
+        self._next_allowed: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+        self._ready_heap: List[Tuple[float, str]] = []
+        self._in_heap = set()
+        self._busy: Dict[str, int] = {}
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        """
+        尚未交出的 URL 数量
+        """
+        return self._pending
+
+    def busy_hosts(self) -> int:
+        """
+        有进行中抓取的主机数量
+        """
+        return len(self._busy)
+
+    def _schedule_locked(self, host: str):
+        """
+        主机有待爬 URL 且未达并发上限时放入就绪堆
+        """
+        if host in self._in_heap or host not in self._queues:
+            return
+        if self._busy.get(host, 0) >= self.max_per_host:
+            return
+        heapq.heappush(self._ready_heap, (self._next_allowed.get(host, 0.0), host))
+        self._in_heap.add(host)
+        self._cond.notify()
+
+    def add(self, url: str):
+        """
+        加入一个待爬 URL
+        """
+        host = get_host(url)
+        with self._cond:
+            queue = self._queues.get(host)
+            if queue is None:
+                queue = self._queues[host] = deque()
+            queue.append(url)
+            self._pending += 1
+            self._schedule_locked(host)
+
+    def pop_ready(self) -> Tuple[Optional[str], float]:
+        """
+        非阻塞地取一个已就绪主机的 URL
+
+        :return: (URL, 0) 或 (None, 距最近主机就绪还需等待的秒数；没有可调度主机时为 -1)
+        """
+        with self._cond:
+            return self._pop_ready_locked()
+
+    def _pop_ready_locked(self) -> Tuple[Optional[str], float]:
+        while self._ready_heap:
+            ready_at, host = self._ready_heap[0]
+            # release 可能推迟了主机的允许时间，堆中的旧时间需要纠正
+            next_allowed = self._next_allowed.get(host, 0.0)
+            if ready_at < next_allowed:
+                heapq.heapreplace(self._ready_heap, (next_allowed, host))
+                continue
+            wait = ready_at - self.clock()
+            if wait > 0:
+                return None, wait
+
+            heapq.heappop(self._ready_heap)
+            self._in_heap.discard(host)
+            queue = self._queues[host]
+            url = queue.popleft()
+            if not queue:
+                del self._queues[host]
+            self._pending -= 1
+            self._busy[host] = self._busy.get(host, 0) + 1
+            # 同一主机的下一次抓取至少间隔一个抓取延迟
+            self._next_allowed[host] = self.clock() + self._delays.get(host, self.default_delay)
+            self._schedule_locked(host)
+            return url, 0
+        return None, -1
+
+    def next_url(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        取下一个可抓取的 URL，所有主机都未就绪时等待
+
+        :param timeout: 最长等待秒数，None 表示一直等待
+        :return: URL；超时或没有待爬 URL（且没有进行中的抓取）时返回 None
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while True:
+                url, wait = self._pop_ready_locked()
+                if url:
+                    return url
+                if wait < 0 and not self._busy:
+                    return None
+
+                # 等到最近的主机就绪，或被 add/release 唤醒
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait < 0 else min(wait, remaining)
+                self._cond.wait(None if wait < 0 else wait)
+
+    def release(self, url: str, delay: Optional[float] = None):
+        """
+        URL 抓取结束，按延迟重新排期其主机
+
+        :param url: next_url 交出的 URL
+        :param delay: 该主机下次抓取前的间隔（秒），默认 default_delay
+        """
+        host = get_host(url)
+        delay = self.default_delay if delay is None else delay
+        with self._cond:
+            busy = self._busy.get(host, 0) - 1
+            if busy > 0:
+                self._busy[host] = busy
+            else:
+                self._busy.pop(host, None)
+            self._delays[host] = delay
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0.0), self.clock() + delay)
+            self._schedule_locked(host)
+            self._prune_locked()
+            self._cond.notify_all()
+
+    def _prune_locked(self):
+        """
+        清理已过期且空闲的主机记录，防止主机数无限增长
+        """
+        if len(self._next_allowed) <= 2 * (len(self._queues) + len(self._busy)) + 1024:
+            return
+        now = self.clock()
+        active = {
+            host for host, ready_at in self._next_allowed.items()
+            if ready_at > now or host in self._queues or host in self._busy
+        }
+        self._next_allowed = {host: self._next_allowed[host] for host in active}
+        self._delays = {host: delay for host, delay in self._delays.items() if host in active}
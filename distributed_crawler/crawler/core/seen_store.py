@@ -0,0 +1,414 @@
+# crawler/core/seen_store.py
+import base64
+import hashlib
+import inspect
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import redis
+
+# 可扩展布隆过滤器脚本：逐层检查，未命中则写入最新一层，最新一层满了就追加新层。
+# 层参数由基础容量/误判率按 growth、tightening 推导，与 BloomSeenStore._layer_params 一致。
+_BLOOM_SCRIPT = """
+local meta = KEYS[1]
+local capacity = tonumber(ARGV[1])
+local error_rate = tonumber(ARGV[2])
+local growth = tonumber(ARGV[3])
+local tightening = tonumber(ARGV[4])
+local write = ARGV[5] == '1'
+local ln2 = math.log(2)
+
+local function params(i)
+    local cap = math.floor(capacity * growth ^ i)
+    local p = error_rate * (1 - tightening) * tightening ^ i
+    local m = math.ceil(-cap * math.log(p) / (ln2 * ln2))
+    local k = math.ceil(-math.log(p) / ln2)
+    return cap, m, k
+end
+
+local layers = tonumber(redis.call('HGET', meta, 'layers') or '0')
+local result = {}
+for idx = 6, #ARGV, 2 do
+    local h1 = tonumber(ARGV[idx])
+    local h2 = tonumber(ARGV[idx + 1])
+    local seen = false
+    for i = 0, layers - 1 do
+        local _, m, k = params(i)
+        local hit = true
+        for j = 0, k - 1 do
+            if redis.call('GETBIT', meta .. ':' .. i, (h1 + j * h2) % m) == 0 then
+                hit = false
+                break
+            end
+        end
+        if hit then
+            seen = true
+            break
+        end
+    end
+
+    if seen or not write then
+        table.insert(result, seen and 0 or 1)
+    else
+        local last = layers - 1
+        if last < 0 or tonumber(redis.call('HGET', meta, 'count:' .. last) or '0') >= params(last) then
+            last = layers
+            layers = layers + 1
+            redis.call('HSET', meta, 'layers', layers)
+        end
+        local _, m, k = params(last)
+        for j = 0, k - 1 do
+            redis.call('SETBIT', meta .. ':' .. last, (h1 + j * h2) % m, 1)
+        end
+        redis.call('HINCRBY', meta, 'count:' .. last, 1)
+        table.insert(result, 1)
+    end
+end
+return result
+"""
+
+
+def url_fingerprint(url: str, bits: int = 64) -> bytes:
+    """
+    计算 URL 的定长指纹
+
+    :param url: URL
+    :param bits: 指纹位数，必须是 8 的倍数
+    :return: 指纹字节串
+    """
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=bits // 8).digest()
+
+
+class SeenStore(ABC):
+    """
+    已见 URL 集合的抽象基类
+
+    add_many 必须是原子的“检查并写入”，多个 worker 同时提交同一 URL 时只有一个返回 True。
+    """
+    @abstractmethod
+    def add_many(self, urls: List[str]) -> List[bool]:
+        """
+        批量写入 URL
+
+        :param urls: URL 列表（调用方已去重）
+        :return: 与 urls 一一对应，True 表示此前未见过
+        """
+        pass
+
+    @abstractmethod
+    def contains(self, url: str) -> bool:
+        """
+        检查 URL 是否已见过
+        """
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        已写入的 URL 数量
+        """
+        pass
+
+    @abstractmethod
+    def memory_usage(self) -> int:
+        """
+        在 Redis 中占用的内存（字节，估算值）
+        """
+        pass
+
+    @abstractmethod
+    def error_rate(self) -> float:
+        """
+        当前估计的误判率（把新 URL 判为已见过的概率）
+        """
+        pass
+
+    def iter_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        """
+        流式导出全部 URL，只有保存完整 URL 的实现才支持
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不保存原始 URL，无法导出")
+
+    def stats(self) -> Dict:
+        """
+        汇总统计信息
+        """
+        return {
+            'type': type(self).__name__,
+            'count': self.count(),
+            'memory_bytes': self.memory_usage(),
+            'error_rate': self.error_rate()
+        }
+
+    def params(self) -> Dict:
+        """
+        影响存储内容的参数，恢复快照时必须一致
+        """
+        return {}
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """
+        占用的全部 Redis 键
+        """
+        pass
+
+    @abstractmethod
+    def export_records(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        流式导出快照记录，集合只增不减，导出期间新写入的成员可能包含也可能不包含
+        """
+        pass
+
+    @abstractmethod
+    def load_record(self, record: Dict, pipe, stage: Callable[[str], str]) -> bool:
+        """
+        把一条快照记录写入流水线
+
+        :param record: export_records 产出的记录
+        :param pipe: Redis 流水线
+        :param stage: 把正式键名映射为暂存键名，恢复完成后再整体改名
+        :return: 是否是本实现的记录
+        """
+        pass
+
+
+class SetSeenStore(SeenStore):
+    """
+    以完整 URL 字符串保存的集合，精确但内存随 URL 长度增长
+    """
+    def __init__(self, redis_client: redis.Redis, key: str = 'visited_urls'):
+        self.redis_client = redis_client
+        self.key = key
+
+    def _add_members(self, members: Iterable) -> List[bool]:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for member in members:
+            pipe.sadd(self.key, member)
+        return [bool(added) for added in pipe.execute()]
+
+    def add_many(self, urls: List[str]) -> List[bool]:
+        return self._add_members(urls)
+
+    def contains(self, url: str) -> bool:
+        return bool(self.redis_client.sismember(self.key, url))
+
+    def count(self) -> int:
+        return self.redis_client.scard(self.key)
+
+    def memory_usage(self) -> int:
+        try:
+            return self.redis_client.memory_usage(self.key) or 0
+        except redis.ResponseError:
+            # 不支持 MEMORY USAGE 时按抽样的平均成员长度估算（含约 16 字节的字典项开销）
+            sample = self.redis_client.srandmember(self.key, 64) or []
+            if not sample:
+                return 0
+            avg_size = sum(len(member) for member in sample) / len(sample)
+            return int(self.count() * (avg_size + 16))
+
+    def error_rate(self) -> float:
+        return 0.0
+
+    def iter_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        for url in self.redis_client.sscan_iter(self.key, count=batch_size):
+            yield url.decode('utf-8')
+
+    def keys(self) -> List[str]:
+        return [self.key]
+
+    @staticmethod
+    def _encode_member(member: bytes) -> str:
+        return member.decode('utf-8')
+
+    @staticmethod
+    def _decode_member(item: str):
+        return item
+
+    def export_records(self, batch_size: int = 1000) -> Iterator[Dict]:
+        batch = []
+        for member in self.redis_client.sscan_iter(self.key, count=batch_size):
+            batch.append(self._encode_member(member))
+            if len(batch) >= batch_size:
+                yield {'type': 'seen', 'items': batch}
+                batch = []
+        if batch:
+            yield {'type': 'seen', 'items': batch}
+
+    def load_record(self, record: Dict, pipe, stage: Callable[[str], str]) -> bool:
+        if record['type'] != 'seen':
+            return False
+        pipe.sadd(stage(self.key), *(self._decode_member(item) for item in record['items']))
+        return True
+
+
+class FingerprintSeenStore(SetSeenStore):
+    """
+    只保存 URL 的定长指纹（默认 64 位），每个成员固定 8 字节
+    """
+    def __init__(self, redis_client: redis.Redis, key: str = 'visited_fingerprints', bits: int = 64):
+        super().__init__(redis_client, key)
+        if bits % 8 or not 32 <= bits <= 512:
+            raise ValueError("指纹位数必须是 32~512 之间 8 的倍数")
+        self.bits = bits
+
+    def add_many(self, urls: List[str]) -> List[bool]:
+        return self._add_members(url_fingerprint(url, self.bits) for url in urls)
+
+    def contains(self, url: str) -> bool:
+        return bool(self.redis_client.sismember(self.key, url_fingerprint(url, self.bits)))
+
+    def error_rate(self) -> float:
+        # 新 URL 与已有 n 个指纹之一碰撞的概率约为 n / 2^bits
+        return self.count() / float(2 ** self.bits)
+
+    def iter_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        return SeenStore.iter_urls(self, batch_size)
+
+    def params(self) -> Dict:
+        return {'bits': self.bits}
+
+    @staticmethod
+    def _encode_member(member: bytes) -> str:
+        # 指纹是二进制，快照中用 base64 保存
+        return base64.b64encode(member).decode('ascii')
+
+    @staticmethod
+    def _decode_member(item: str):
+        return base64.b64decode(item)
+
+
+class BloomSeenStore(SeenStore):
+    """
+    可扩展布隆过滤器（Scalable Bloom Filter）
+
+    每层是一个 Redis 位图，第 i 层容量为 capacity * growth^i，
+    误判率为 error_rate * (1 - tightening) * tightening^i，总误判率不超过 error_rate。
+    """
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        key: str = 'visited_bloom',
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+        growth: int = 2,
+        tightening: float = 0.5
+    ):
+        if not 0 < error_rate < 1:
+            raise ValueError("误判率必须在 (0, 1) 之间")
+        self.redis_client = redis_client
+        self.key = key
+        self.capacity = capacity
+        self.target_error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._script = self.redis_client.register_script(_BLOOM_SCRIPT)
+
+    def _layer_params(self, i: int):
+        """
+        第 i 层的 (容量, 位数, 哈希函数个数)
+        """
+        cap = math.floor(self.capacity * self.growth ** i)
+        p = self.target_error_rate * (1 - self.tightening) * self.tightening ** i
+        m = math.ceil(-cap * math.log(p) / (math.log(2) ** 2))
+        k = math.ceil(-math.log(p) / math.log(2))
+        return cap, m, k
+
+    def _run(self, urls: List[str], write: bool) -> List[bool]:
+        args = [self.capacity, self.target_error_rate, self.growth, self.tightening, 1 if write else 0]
+        for url in urls:
+            digest = url_fingerprint(url, 64)
+            # 双重哈希：h1 + j * h2，h2 取奇数保证步长有效
+            args.append(int.from_bytes(digest[:4], 'big'))
+            args.append(int.from_bytes(digest[4:], 'big') | 1)
+        return [bool(flag) for flag in self._script(keys=[self.key], args=args)]
+
+    def add_many(self, urls: List[str]) -> List[bool]:
+        if not urls:
+            return []
+        return self._run(urls, write=True)
+
+    def contains(self, url: str) -> bool:
+        return not self._run([url], write=False)[0]
+
+    def _layer_counts(self) -> List[int]:
+        meta = self.redis_client.hgetall(self.key)
+        layers = int(meta.get(b'layers', 0))
+        return [int(meta.get(f'count:{i}'.encode(), 0)) for i in range(layers)]
+
+    def count(self) -> int:
+        return sum(self._layer_counts())
+
+    def memory_usage(self) -> int:
+        return sum(self._layer_params(i)[1] // 8 + 1 for i in range(len(self._layer_counts())))
+
+    def error_rate(self) -> float:
+        # 按各层实际填充量估算：1 - Π(1 - (1 - e^(-k·n/m))^k)
+        miss = 1.0
+        for i, n in enumerate(self._layer_counts()):
+            _, m, k = self._layer_params(i)
+            miss *= 1 - (1 - math.exp(-k * n / m)) ** k
+        return 1 - miss
+
+    def params(self) -> Dict:
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.target_error_rate,
+            'growth': self.growth,
+            'tightening': self.tightening
+        }
+
+    def keys(self) -> List[str]:
+        return [self.key] + [f'{self.key}:{i}' for i in range(len(self._layer_counts()))]
+
+    def export_records(self, batch_size: int = 1000, chunk_bytes: int = 1 << 20) -> Iterator[Dict]:
+        """
+        先导出元数据，再按 chunk_bytes 分段导出各层位图，全零的分段不写入
+        """
+        meta = self.redis_client.hgetall(self.key)
+        if not meta:
+            return
+        yield {'type': 'bloom_meta', 'fields': {k.decode(): v.decode() for k, v in meta.items()}}
+        for i in range(int(meta.get(b'layers', 0))):
+            key = f'{self.key}:{i}'
+            size = self.redis_client.strlen(key)
+            for offset in range(0, size, chunk_bytes):
+                data = self.redis_client.getrange(key, offset, offset + chunk_bytes - 1)
+                if data.strip(b'\x00'):
+                    yield {
+                        'type': 'bloom_bits',
+                        'layer': i,
+                        'offset': offset,
+                        'data': base64.b64encode(data).decode('ascii')
+                    }
+
+    def load_record(self, record: Dict, pipe, stage: Callable[[str], str]) -> bool:
+        if record['type'] == 'bloom_meta':
+            pipe.hset(stage(self.key), mapping=record['fields'])
+        elif record['type'] == 'bloom_bits':
+            pipe.setrange(stage(f"{self.key}:{record['layer']}"), record['offset'], base64.b64decode(record['data']))
+        else:
+            return False
+        return True
+
+
+def create_seen_store(redis_client: redis.Redis, kind: str = 'set', key_prefix: str = '', **kwargs) -> SeenStore:
+    """
+    按名称创建已见集合
+
+    :param kind: 'set'、'fingerprint' 或 'bloom'
+    :param key_prefix: 键名前缀，未显式指定 key 时加在默认键名之前（用于分区）
+    :param kwargs: 传给具体实现的参数
+    """
+    stores = {
+        'set': SetSeenStore,
+        'fingerprint': FingerprintSeenStore,
+        'bloom': BloomSeenStore
+    }
+    if kind not in stores:
+        raise ValueError(f"未知的已见集合类型: {kind}")
+    store_class = stores[kind]
+    if key_prefix and 'key' not in kwargs:
+        kwargs['key'] = key_prefix + inspect.signature(store_class).parameters['key'].default
+    return store_class(redis_client, **kwargs)
@@ -0,0 +1,554 @@
+# crawler/core/sharding.py
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import redis
+
+from ..config.settings import REDIS_CONFIG, CRAWLER_CONFIG, SHARDING_CONFIG
+from .scheduler import get_host
+from .checkpoint import CheckpointError, CheckpointWriter, read_checkpoint
+from .frontier import Frontier
+from .seen_store import create_seen_store
+from .url_manager import URLManager
+from distributed_crawler.utils.url_canonicalizer import get_url_canonicalizer   # type: ignore
+
+# 分区认领脚本（在协调实例上执行）：登记心跳、清理失联 worker，按 ceil(分区数 / 存活 worker 数)
+# 续期自己持有的分区、释放超出份额的分区，再从空闲分区中补足份额。
+# KEYS: worker 心跳有序集合, 各分区的认领键；ARGV: worker_id, 当前时间, 有效期, 空闲分区起始偏移
+_CLAIM_SCRIPT = """
+local worker = ARGV[1]
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+redis.call('ZADD', KEYS[1], now + ttl, worker)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local partitions = #KEYS - 1
+local share = math.ceil(partitions / redis.call('ZCARD', KEYS[1]))
+
+local owned = {}
+local free = {}
+for p = 0, partitions - 1 do
+    local owner = redis.call('GET', KEYS[p + 2])
+    if owner == worker then
+        table.insert(owned, p)
+    elseif not owner then
+        table.insert(free, p)
+    end
+end
+
+local result = {}
+for _, p in ipairs(owned) do
+    if #result < share then
+        redis.call('SET', KEYS[p + 2], worker, 'EX', ttl)
+        table.insert(result, p)
+    else
+        redis.call('DEL', KEYS[p + 2])
+    end
+end
+local offset = tonumber(ARGV[4])
+for i = 1, #free do
+    if #result >= share then
+        break
+    end
+    local p = free[(i - 1 + offset) % #free + 1]
+    redis.call('SET', KEYS[p + 2], worker, 'EX', ttl)
+    table.insert(result, p)
+end
+return result
+"""
+
+# 释放认领：只删除仍属于自己的认领键
+_RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+for i = 2, #KEYS do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('DEL', KEYS[i])
+    end
+end
+return 1
+"""
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def host_partition(url: str, partitions: int) -> int:
+    """
+    URL 所属的主机分区，同一主机的 URL 总在同一分区
+    """
+    return _hash64(get_host(url)) % partitions
+
+
+def shard_name(config: Dict) -> str:
+    """
+    Redis 实例在哈希环上的名称
+    """
+    return f"{config.get('host', 'localhost')}:{config.get('port', 6379)}/{config.get('db', 0)}"
+
+
+class HashRing:
+    """
+    一致性哈希环
+
+    每个节点在环上放置 vnodes 个虚拟节点，键归属顺时针方向的第一个虚拟节点。
+    增删一个节点时，只有约 1/N 的键改变归属。
+    """
+    def __init__(self, nodes: Iterable[str], vnodes: int = 128):
+        self.vnodes = vnodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def _rebuild(self):
+        ring = sorted(
+            (_hash64(f'{node}#{i}'), node)
+            for node in self.nodes
+            for i in range(self.vnodes)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def add_node(self, node: str):
+        if node not in self.nodes:
+            self.nodes.append(node)
+            self._rebuild()
+
+    def remove_node(self, node: str):
+        if node in self.nodes:
+            self.nodes.remove(node)
+            self._rebuild()
+
+    def get_node(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("哈希环上没有节点")
+        index = bisect.bisect(self._points, _hash64(key)) % len(self._points)
+        return self._owners[index]
+
+
+class ShardedURLManager(Frontier):
+    """
+    按主机分区、分布在多个 Redis 实例上的 URL 管理器
+
+    URL 按主机哈希到固定数量的分区，每个分区是一组带 ``part:<分区号>:`` 前缀的键
+    （待爬队列、租约、重试与已见集合），由一致性哈希环决定存放在哪个实例上。
+    入队与确认按分区路由到对应实例；出队只从本 worker 认领的分区中领取，
+    同一主机的 URL 因此只会交给一个 worker，礼貌调度状态保留在本地。
+
+    分区认领、worker 心跳保存在第一个实例（协调实例）上，认领按 claim_ttl 过期，
+    get_urls 会定期续期并按存活 worker 数重新分配。增删实例后调用 rebalance，
+    只迁移归属发生变化的分区（约 1/N）。
+
+    接口与 URLManager 相同，可以直接交给 DataCrawler 使用。
+    """
+    def __init__(
+        self,
+        shards: Optional[Sequence[Dict]] = None,
+        partitions: Optional[int] = None,
+        vnodes: Optional[int] = None,
+        claim_ttl: Optional[float] = None,
+        worker_id: Optional[str] = None,
+        redis_clients: Optional[Dict[str, redis.Redis]] = None,
+        ring_shards: Optional[Iterable[str]] = None,
+        **manager_kwargs
+    ):
+        """
+        :param shards: Redis 实例连接参数列表，默认取 SHARDING_CONFIG['shards']，为空时使用 REDIS_CONFIG
+        :param partitions: 主机分区数，默认取 SHARDING_CONFIG['partitions']，所有 worker 必须一致
+        :param vnodes: 每个实例的虚拟节点数，默认取 SHARDING_CONFIG['vnodes']
+        :param claim_ttl: 分区认领有效期（秒），默认取 SHARDING_CONFIG['claim_ttl']
+        :param worker_id: worker 标识，默认由主机名、进程号和随机串组成
+        :param redis_clients: 已创建的客户端 {实例名称: 客户端}，指定时忽略 shards
+        :param ring_shards: 哈希环上的实例名称，默认为全部客户端；移除实例时先用不含它的集合调用 rebalance，
+            下线前仍需保留它的连接以读出数据
+        :param manager_kwargs: 传给每个分区 URLManager 的参数（batch_size、max_depth 等）
+        """
+        if redis_clients is None:
+            configs = list(shards or SHARDING_CONFIG.get('shards') or [REDIS_CONFIG])
+            redis_clients = {shard_name(config): redis.Redis(**config) for config in configs}
+        if not redis_clients:
+            raise ValueError("至少需要一个 Redis 实例")
+        self.clients = dict(redis_clients)
+        self.partitions = partitions or SHARDING_CONFIG.get('partitions', 64)
+        self.ring = self._build_ring(self.clients if ring_shards is None else ring_shards, vnodes or SHARDING_CONFIG.get('vnodes', 128))
+        self.claim_ttl = claim_ttl or SHARDING_CONFIG.get('claim_ttl', 60)
+        self.lease_timeout = manager_kwargs.get('lease_timeout') or CRAWLER_CONFIG.get('lease_timeout', 300)
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.manager_kwargs = manager_kwargs
+        self.max_depth = manager_kwargs.get('max_depth', CRAWLER_CONFIG.get('max_depth', 3))
+        # 路由前先规范化，同一主机的不同写法（大小写、默认端口）落在同一分区
+        self.canonicalizer = manager_kwargs.get('canonicalizer') or get_url_canonicalizer()
+        self.logger = logging.getLogger(__name__)
+
+        # 协调实例取环上的第一个实例，不会落在正在下线的实例上
+        self.coordinator = self.clients[self.ring.nodes[0]]
+        self.workers_key = 'shard_workers'
+        self._claim_keys = [f'part:{p}:claim' for p in range(self.partitions)]
+        self._claim_script = self.coordinator.register_script(_CLAIM_SCRIPT)
+        self._release_script = self.coordinator.register_script(_RELEASE_SCRIPT)
+
+        self._managers: Dict[int, URLManager] = {}
+        self._claimed: List[int] = []
+        self._claimed_at = 0.0
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _build_ring(self, shards: Iterable[str], vnodes: int) -> HashRing:
+        ring = HashRing(shards, vnodes)
+        missing = [shard for shard in ring.nodes if shard not in self.clients]
+        if missing:
+            raise ValueError(f"缺少实例 {', '.join(missing)} 的连接")
+        if not ring.nodes:
+            raise ValueError("哈希环上没有节点")
+        return ring
+
+    @staticmethod
+    def partition_prefix(partition: int) -> str:
+        return f'part:{partition}:'
+
+    def partition_of(self, url: str) -> int:
+        """
+        URL 所属的分区，按规范化后的主机计算；无效 URL 按原始主机计算，由分区的 URLManager 计为无效
+        """
+        return host_partition(self.canonicalizer.canonicalize(url) or url, self.partitions)
+
+    def shard_of(self, partition: int) -> str:
+        return self.ring.get_node(f'partition:{partition}')
+
+    def _manager(self, partition: int) -> URLManager:
+        """
+        分区对应的 URLManager，按需创建
+        """
+        manager = self._managers.get(partition)
+        if manager is None:
+            client = self.clients[self.shard_of(partition)]
+            prefix = self.partition_prefix(partition)
+            options = dict(CRAWLER_CONFIG.get('seen_store_options', {}))
+            kind = CRAWLER_CONFIG.get('seen_store', 'set')
+            if kind == 'bloom':
+                # 布隆过滤器按层扩容，每个分区只需总容量的一份
+                options['capacity'] = max(1000, options.get('capacity', 1000000) // self.partitions)
+            seen_store = create_seen_store(client, kind, key_prefix=prefix, **options)
+            # 租约以 worker 标识登记，迁移后重新创建的 URLManager 仍能确认迁移前领取的 URL
+            manager = URLManager(
+                redis_client=client, seen_store=seen_store, key_prefix=prefix,
+                lease_token=self.worker_id, **self.manager_kwargs
+            )
+            self._managers[partition] = manager
+        return manager
+
+    def _group(self, urls: Iterable[str]) -> Dict[int, List[str]]:
+        """
+        按分区分组；组内保留原始 URL，确认租约时必须与领取到的 URL 一致，入队时分区会再规范化
+        """
+        groups: Dict[int, List[str]] = {}
+        for url in urls:
+            groups.setdefault(self.partition_of(url), []).append(url)
+        return groups
+
+    # ---------- 分区认领 ----------
+
+    def refresh_claims(self) -> List[int]:
+        """
+        续期并重新分配本 worker 认领的分区
+
+        :return: 当前认领的分区号
+        """
+        claimed = self._claim_script(
+            keys=[self.workers_key] + self._claim_keys,
+            args=[self.worker_id, time.time(), int(self.claim_ttl), _hash64(self.worker_id) % self.partitions]
+        )
+        with self._lock:
+            previous = set(self._claimed)
+            self._claimed = sorted(int(p) for p in claimed)
+            self._claimed_at = time.monotonic()
+            if set(self._claimed) != previous:
+                self.logger.info(f"worker {self.worker_id} 认领 {len(self._claimed)} 个分区")
+            return list(self._claimed)
+
+    def claimed_partitions(self) -> List[int]:
+        with self._lock:
+            return list(self._claimed)
+
+    def release_claims(self):
+        """
+        退出前释放认领的分区，其他 worker 无需等到过期即可接手
+        """
+        self._release_script(keys=[self.workers_key] + self._claim_keys, args=[self.worker_id])
+        with self._lock:
+            self._claimed = []
+            self._claimed_at = 0.0
+
+    def _maybe_refresh_claims(self) -> List[int]:
+        with self._lock:
+            # 没有认领到分区时每次都重新认领，其他 worker 让出的分区能尽快接手
+            fresh = self._claimed and time.monotonic() - self._claimed_at < self.claim_ttl / 3
+            claimed = list(self._claimed)
+        return claimed if fresh else self.refresh_claims()
+
+    # ---------- URLManager 接口 ----------
+
+    def add_seed_urls(self, urls: List[str]) -> Dict[str, int]:
+        return self.add_urls(urls, depth=0)
+
+    def add_urls(self, urls: Iterable[str], depth: int = 0, priority: Optional[float] = None) -> Dict[str, int]:
+        """
+        按分区批量添加 URL，返回值同 URLManager.add_urls
+        """
+        totals = {'new': 0, 'duplicate': 0, 'too_deep': 0, 'invalid': 0}
+        for partition, group in self._group(urls).items():
+            for name, value in self._manager(partition).add_urls(group, depth, priority).items():
+                totals[name] += value
+        return totals
+
+    def get_url(self) -> Optional[str]:
+        urls = self.get_urls(1)
+        return urls[0][0] if urls else None
+
+    def get_urls(self, count: int, reap_limit: int = 100) -> List[Tuple[str, int]]:
+        """
+        从认领的分区中领取 URL
+
+        需求量平均分给仍有 URL 的分区，同一实例上的分区合并为一次流水线往返；
+        返回不足的分区视为已空，剩余需求分给其他分区，直到满足或全部分区已空。
+        """
+        claimed = self._maybe_refresh_claims()
+        if count <= 0 or not claimed:
+            return []
+        with self._lock:
+            start = self._cursor % len(claimed)
+            self._cursor += 1
+        active = claimed[start:] + claimed[:start]
+
+        leased: List[Tuple[str, int]] = []
+        while active and len(leased) < count:
+            base, extra = divmod(count - len(leased), len(active))
+            wanted = {p: base + (1 if i < extra else 0) for i, p in enumerate(active)}
+            wanted = {p: n for p, n in wanted.items() if n > 0}
+
+            pipes = {}
+            order: Dict[str, List[int]] = {}
+            for partition, n in wanted.items():
+                shard = self.shard_of(partition)
+                if shard not in pipes:
+                    pipes[shard] = self.clients[shard].pipeline(transaction=False)
+                    order[shard] = []
+                self._manager(partition)._lease(n, reap_limit, client=pipes[shard])
+                order[shard].append(partition)
+
+            exhausted = set()
+            for shard, pipe in pipes.items():
+                for partition, result in zip(order[shard], pipe.execute()):
+                    urls = URLManager._decode_leased(result)
+                    leased.extend(urls)
+                    if len(urls) < wanted[partition]:
+                        exhausted.add(partition)
+            if not exhausted:
+                break
+            active = [p for p in active if p not in exhausted]
+        return leased
+
+    def mark_url_visited(self, url: str):
+        self.mark_urls_visited([url])
+
+    def mark_urls_visited(self, urls: List[str]):
+        for partition, group in self._group(urls).items():
+            self._manager(partition).mark_urls_visited(group)
+
+    def mark_url_failed(self, url: str, retry: bool = True):
+        self.mark_urls_failed([url], retry=retry)
+
+    def mark_urls_failed(self, urls: List[str], retry: bool = True) -> int:
+        return sum(
+            self._manager(partition).mark_urls_failed(group, retry=retry)
+            for partition, group in self._group(urls).items()
+        )
+
+    def extend_leases(self, urls: List[str], timeout: Optional[float] = None):
+        """
+        续租并按需续期分区认领；调度器已满、暂不领取新 URL 时认领也不会过期
+        """
+        self._maybe_refresh_claims()
+        for partition, group in self._group(urls).items():
+            self._manager(partition).extend_leases(group, timeout)
+
+    def lease_renew_interval(self) -> float:
+        """
+        续租间隔同时保证分区认领在过期前续期
+        """
+        return min(self.lease_timeout, self.claim_ttl) / 3
+
+    def requeue_expired(self, limit: int = 1000) -> int:
+        """
+        回收所有分区（不限于本 worker 认领的）中已过期的租约
+        """
+        return sum(self._manager(p).requeue_expired(limit) for p in range(self.partitions))
+
+    def frontier_size(self) -> int:
+        return sum(self._manager(p).frontier_size() for p in range(self.partitions))
+
+    def inflight_size(self) -> int:
+        return sum(self._manager(p).inflight_size() for p in range(self.partitions))
+
+    def get_failed_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        return chain.from_iterable(self._manager(p).get_failed_urls(batch_size) for p in range(self.partitions))
+
+    def get_visited_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        return chain.from_iterable(self._manager(p).get_visited_urls(batch_size) for p in range(self.partitions))
+
+    def seen_stats(self) -> Dict:
+        """
+        汇总各分区已见集合的数量与内存占用，误判率取各分区的最大值
+        """
+        stats = {'count': 0, 'memory_bytes': 0, 'error_rate': 0.0}
+        for p in range(self.partitions):
+            part = self._manager(p).seen_stats()
+            stats['count'] += part.get('count', 0)
+            stats['memory_bytes'] += part.get('memory_bytes', 0)
+            stats['error_rate'] = max(stats['error_rate'], part.get('error_rate', 0.0))
+        stats['partitions'] = self.partitions
+        stats['shards'] = len(self.clients)
+        return stats
+
+    # ---------- 快照 ----------
+
+    def export_snapshot(self, path: str, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        逐个分区导出快照，记录带 partition 字段
+
+        URL 不会在分区之间移动，每个分区各自的一致快照合起来就是整个爬取的一致快照。
+        """
+        meta = self._manager(0).snapshot_meta()
+        meta.pop('key_prefix')
+        meta['partitions'] = self.partitions
+        writer = CheckpointWriter(path, meta)
+        try:
+            for partition in range(self.partitions):
+                for record in self._manager(partition).export_records(batch_size):
+                    record['partition'] = partition
+                    writer.write(record)
+        except BaseException:
+            writer.abort()
+            raise
+        counts = writer.close()
+        self.logger.info(f"已导出快照 {path}: {counts}")
+        return counts
+
+    def import_snapshot(self, path: str, overwrite: bool = False, pipeline_size: int = 50) -> Dict[str, int]:
+        """
+        从分片快照恢复，分区数必须一致，实例数可以不同（分区按当前哈希环写入对应实例）。
+        所有分区读完并校验通过后才逐个分区替换正式键。
+        """
+        records = read_checkpoint(path)
+        header = next(records)
+        if header.get('partitions') != self.partitions:
+            raise CheckpointError(f"快照的分区数为 {header.get('partitions')}，当前为 {self.partitions}")
+        managers = [self._manager(p) for p in range(self.partitions)]
+        for manager in managers:
+            manager.check_snapshot_header(header)
+            if not overwrite:
+                manager.ensure_empty()
+
+        loaders = [manager.snapshot_loader(pipeline_size) for manager in managers]
+        try:
+            current = None
+            for record in records:
+                partition = record['partition']
+                if partition != current:
+                    # 快照按分区顺序写入，切换分区时发出上一个分区剩余的写入
+                    if current is not None:
+                        loaders[current].flush()
+                    current = partition
+                loaders[partition].load(record)
+            for loader in loaders:
+                loader.commit()
+        except BaseException:
+            for loader in loaders:
+                loader.abort()
+            raise
+        counts: Dict[str, int] = {}
+        for loader in loaders:
+            for kind, count in loader.counts.items():
+                counts[kind] = counts.get(kind, 0) + count
+        self.logger.info(f"已从快照 {path} 恢复: {counts}")
+        return counts
+
+    # ---------- 扩缩容 ----------
+
+    def rebalance(
+        self,
+        previous_shards: Iterable[str],
+        target_shards: Optional[Iterable[str]] = None,
+        scan_count: int = 500
+    ) -> Dict[str, int]:
+        """
+        实例增删后迁移归属发生变化的分区
+
+        previous_shards 为变更前哈希环上的实例名称，target_shards 为变更后的（默认为当前哈希环），
+        两者中的实例都必须在 clients 中：被移除的实例在迁移完成前不能下线。迁移完成后当前哈希环
+        改为 target_shards。每个分区的键用 DUMP/RESTORE 原样复制（保留过期时间）后从原实例删除，
+        因此适用于任意类型的已见集合。迁移期间应暂停 worker，或至少暂停对被迁移分区的写入。
+
+        例如移除 r3：rebalance(['r1', 'r2', 'r3'], ['r1', 'r2'])，之后 worker 不再需要 r3 的连接。
+
+        :return: {'partitions': 迁移的分区数, 'keys': 迁移的键数}
+        """
+        old_ring = self._build_ring(previous_shards, self.ring.vnodes)
+        if target_shards is not None:
+            self.ring = self._build_ring(target_shards, self.ring.vnodes)
+        moved = {'partitions': 0, 'keys': 0}
+        for partition in range(self.partitions):
+            key = f'partition:{partition}'
+            src, dst = old_ring.get_node(key), self.ring.get_node(key)
+            if src == dst:
+                continue
+            moved['partitions'] += 1
+            moved['keys'] += self._move_partition(partition, self.clients[src], self.clients[dst], scan_count)
+            self._managers.pop(partition, None)
+            self.logger.info(f"分区 {partition} 已从 {src} 迁移到 {dst}")
+        return moved
+
+    def _move_partition(self, partition: int, src: redis.Redis, dst: redis.Redis, scan_count: int) -> int:
+        pattern = f'{self.partition_prefix(partition)}*'
+        moved = 0
+        batch: List[bytes] = []
+        for key in src.scan_iter(match=pattern, count=scan_count):
+            if key.endswith(b':claim'):
+                continue
+            batch.append(key)
+            if len(batch) >= scan_count:
+                moved += self._move_keys(batch, src, dst)
+                batch = []
+        if batch:
+            moved += self._move_keys(batch, src, dst)
+        return moved
+
+    @staticmethod
+    def _move_keys(keys: List[bytes], src: redis.Redis, dst: redis.Redis) -> int:
+        pipe = src.pipeline(transaction=False)
+        for key in keys:
+            pipe.dump(key)
+            pipe.pttl(key)
+        results = pipe.execute()
+
+        pipe = dst.pipeline(transaction=False)
+        copied = []
+        for i, key in enumerate(keys):
+            payload, pttl = results[2 * i], results[2 * i + 1]
+            if payload is None:
+                continue
+            pipe.restore(key, max(pttl, 0), payload, replace=True)
+            copied.append(key)
+        pipe.execute()
+        if copied:
+            src.delete(*copied)
+        return len(copied)
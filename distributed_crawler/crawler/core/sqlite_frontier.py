@@ -0,0 +1,333 @@
+# crawler/core/sqlite_frontier.py
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..config.settings import CRAWLER_CONFIG
+from .frontier import Frontier
+from distributed_crawler.utils.url_canonicalizer import URLCanonicalizer, get_url_canonicalizer   # type: ignore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY, score REAL NOT NULL, depth INTEGER NOT NULL, url TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS pending_order ON pending (score, id);
+CREATE TABLE IF NOT EXISTS inflight (url TEXT PRIMARY KEY, depth INTEGER NOT NULL, deadline REAL NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS inflight_deadline ON inflight (deadline);
+CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS retries (url TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS failed (url TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+# SQLite 单条语句的参数个数有上限（旧版本为 999）
+_SQL_CHUNK = 500
+
+# 需要 WITHOUT ROWID 表
+_MIN_SQLITE_VERSION = (3, 8, 2)
+
+
+class SQLiteFrontier(Frontier):
+    """
+    嵌入式、基于 SQLite 的待爬队列，不需要 Redis，适合单机爬取、CI 与基准测试
+
+    所有状态（待爬、租约、重试、失败与已见集合）都在 SQLite 文件中，进程崩溃后重新打开即可继续，
+    上次未确认的租约会重新入队。内存中只保留队首：按 (分数, 入队序号) 排序最靠前的最多 2 * head_size
+    个待爬 URL，它们同时也在磁盘上；队首恰好包含键不大于 _cursor 的全部待爬行，取空后再从磁盘按索引
+    顺序读取下一段。因此数百万待爬 URL 只占用有界内存，出队直接从内存弹出，入队与确认按批在一个事务内写入。
+    单个实例可以被多个线程共用，但同一文件只能由一个进程打开。
+    """
+    def __init__(
+        self,
+        path: str = 'frontier.db',
+        head_size: int = 10000,
+        max_depth: Optional[int] = None,
+        lease_timeout: Optional[float] = None,
+        max_retry: Optional[int] = None,
+        canonicalizer: Optional[URLCanonicalizer] = None,
+        cache_mb: int = 16
+    ):
+        """
+        :param path: 数据库文件路径，':memory:' 表示不落盘（测试用）
+        :param head_size: 内存队首的目标大小，超过其 2 倍时把靠后的一半留在磁盘
+        :param max_depth: 最大爬取深度，默认取 CRAWLER_CONFIG['max_depth']
+        :param lease_timeout: 租约时长（秒），默认取 CRAWLER_CONFIG['lease_timeout']
+        :param max_retry: 最大重试次数，默认取 CRAWLER_CONFIG['max_retry']
+        :param canonicalizer: URL 规范化器，默认使用进程内共享实例
+        :param cache_mb: SQLite 页缓存大小（MB）
+        """
+        if sqlite3.sqlite_version_info < _MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"SQLite {sqlite3.sqlite_version} 过旧，SQLiteFrontier 需要 {'.'.join(map(str, _MIN_SQLITE_VERSION))} 以上版本"
+            )
+        self.path = path
+        self.head_size = head_size
+        self.max_depth = CRAWLER_CONFIG.get('max_depth', 3) if max_depth is None else max_depth
+        self.lease_timeout = CRAWLER_CONFIG.get('lease_timeout', 300) if lease_timeout is None else lease_timeout
+        self.max_retry = CRAWLER_CONFIG.get('max_retry', 3) if max_retry is None else max_retry
+        self.canonicalizer = canonicalizer or get_url_canonicalizer()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        # 自动提交模式，事务由 _transaction 显式控制
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(f'PRAGMA cache_size={-cache_mb * 1024}')
+        self.conn.executescript(_SCHEMA)
+
+        # 内存队首：(分数, id, URL, 深度) 小顶堆
+        self._head: List[Tuple[float, int, str, int]] = []
+        self._cursor: Optional[Tuple[float, int]] = None
+        self._recover()
+        self._pending = self.conn.execute('SELECT COUNT(*) FROM pending').fetchone()[0]
+        self._inflight = 0
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def _recover(self):
+        """
+        上次运行留下的租约已无人处理，全部重新入队
+        """
+        rows = self.conn.execute('SELECT url, depth FROM inflight').fetchall()
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO pending (score, depth, url) VALUES (?, ?, ?)', [(depth, depth, url) for url, depth in rows])
+            conn.execute('DELETE FROM inflight')
+        self.logger.info(f"已将上次未确认的 {len(rows)} 个 URL 重新入队")
+
+    # ---------- 内存队首 ----------
+
+    def _refill_locked(self) -> bool:
+        """
+        从磁盘读取游标之后的下一段待爬 URL
+        """
+        if self._cursor is None:
+            rows = self.conn.execute(
+                'SELECT score, id, url, depth FROM pending ORDER BY score, id LIMIT ?', (self.head_size,)
+            ).fetchall()
+        else:
+            rows = self.conn.execute(
+                'SELECT score, id, url, depth FROM pending WHERE score > ? OR (score = ? AND id > ?) '
+                'ORDER BY score, id LIMIT ?',
+                (self._cursor[0], *self._cursor, self.head_size)
+            ).fetchall()
+        if not rows:
+            return False
+        # 按键顺序读出的行本身就是合法的堆
+        if self._head:
+            for row in rows:
+                heapq.heappush(self._head, row)
+        else:
+            self._head = rows
+        self._cursor = (rows[-1][0], rows[-1][1])
+        return True
+
+    def _push_locked(self, rows: List[Tuple[float, int, str, int]]):
+        """
+        新写入的待爬行中键不大于游标的必须进入队首，其余留在磁盘等待读取
+        """
+        if self._cursor is None:
+            return
+        for row in rows:
+            if (row[0], row[1]) <= self._cursor:
+                heapq.heappush(self._head, row)
+        if len(self._head) > 2 * self.head_size:
+            # 只保留最靠前的 head_size 个，游标随之前移，其余行仍在磁盘上
+            self._head.sort()
+            del self._head[self.head_size:]
+            self._cursor = (self._head[-1][0], self._head[-1][1])
+
+    def _insert_pending(self, conn, entries: List[Tuple[float, int, str]]) -> List[Tuple[float, int, str, int]]:
+        """
+        写入待爬行，返回 (分数, id, URL, 深度)
+
+        同一事务内新行的 id 依次为当前最大 id + 1、+2……（SQLite 对 INTEGER PRIMARY KEY 的分配规则），
+        调用方持有锁，不会有其他写入者插入。
+        """
+        base = conn.execute('SELECT COALESCE(MAX(id), 0) FROM pending').fetchone()[0]
+        conn.executemany('INSERT INTO pending (id, score, depth, url) VALUES (?, ?, ?, ?)', [
+            (base + i + 1, score, depth, url) for i, (score, depth, url) in enumerate(entries)
+        ])
+        return [(score, base + i + 1, url, depth) for i, (score, depth, url) in enumerate(entries)]
+
+    # ---------- 入队与出队 ----------
+
+    def add_urls(self, urls: Iterable[str], depth: int = 0, priority: Optional[float] = None) -> Dict[str, int]:
+        """
+        批量添加新的 URL：规范化、过滤深度后，在一个事务内查重并写入已见集合与待爬队列
+        """
+        urls = list(urls)
+        if depth > self.max_depth:
+            return {'new': 0, 'duplicate': 0, 'too_deep': len(urls), 'invalid': 0}
+        canonical_urls = [self.canonicalizer.canonicalize(url) for url in urls]
+        unique_urls = list(dict.fromkeys(url for url in canonical_urls if url))
+        invalid = len(urls) - sum(1 for url in canonical_urls if url)
+        if not unique_urls:
+            return {'new': 0, 'duplicate': len(urls) - invalid, 'too_deep': 0, 'invalid': invalid}
+        score = depth if priority is None else priority
+
+        with self._lock:
+            with self._transaction() as conn:
+                existing = set()
+                for start in range(0, len(unique_urls), _SQL_CHUNK):
+                    chunk = unique_urls[start:start + _SQL_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    existing.update(row[0] for row in conn.execute(f'SELECT url FROM seen WHERE url IN ({placeholders})', chunk))
+                new_urls = [url for url in unique_urls if url not in existing]
+                conn.executemany('INSERT INTO seen (url) VALUES (?)', ((url,) for url in new_urls))
+                rows = self._insert_pending(conn, [(score, depth, url) for url in new_urls]) if new_urls else []
+            self._pending += len(rows)
+            self._push_locked(rows)
+        return {'new': len(new_urls), 'duplicate': len(urls) - len(new_urls) - invalid, 'too_deep': 0, 'invalid': invalid}
+
+    def get_urls(self, count: int, reap_limit: int = 100) -> List[Tuple[str, int]]:
+        """
+        从内存队首弹出 URL 并登记租约，同时回收最多 reap_limit 个已过期的租约
+
+        :return: [(URL, 深度), ...]，分数小的在前
+        """
+        if count <= 0:
+            return []
+        with self._lock:
+            self._requeue_expired_locked(reap_limit)
+            popped = []
+            while len(popped) < count and (self._head or self._refill_locked()):
+                popped.append(heapq.heappop(self._head))
+            if not popped:
+                return []
+            deadline = time.time() + self.lease_timeout
+            try:
+                with self._transaction() as conn:
+                    conn.executemany('DELETE FROM pending WHERE id = ?', [(row[1],) for row in popped])
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO inflight (url, depth, deadline) VALUES (?, ?, ?)',
+                        [(url, depth, deadline) for _, _, url, depth in popped]
+                    )
+            except BaseException:
+                # 写入失败时放回队首，内存与磁盘保持一致
+                for row in popped:
+                    heapq.heappush(self._head, row)
+                raise
+            self._pending -= len(popped)
+            self._inflight += len(popped)
+        return [(url, depth) for _, _, url, depth in popped]
+
+    # ---------- 确认 ----------
+
+    def mark_urls_visited(self, urls: List[str]):
+        if not urls:
+            return
+        with self._lock:
+            with self._transaction() as conn:
+                before = conn.total_changes
+                conn.executemany('DELETE FROM inflight WHERE url = ?', ((url,) for url in urls))
+                released = conn.total_changes - before
+                conn.executemany('DELETE FROM retries WHERE url = ?', ((url,) for url in urls))
+            self._inflight -= released
+
+    def mark_urls_failed(self, urls: List[str], retry: bool = True) -> int:
+        if not urls:
+            return 0
+        max_retry = self.max_retry if retry else -1
+        with self._lock:
+            return self._fail_locked(urls, max_retry)
+
+    def _fail_locked(self, urls: List[str], max_retry: int) -> int:
+        """
+        释放租约并累计重试次数，未超过上限的按“深度 + 重试次数”重新入队，否则进入失败集合
+
+        只处理确实持有租约的 URL：重复确认或租约已被回收的 URL 已经回到待爬队列，再次入队会重复抓取
+        """
+        requeue = []
+        with self._transaction() as conn:
+            released = 0
+            for url in dict.fromkeys(urls):
+                row = conn.execute('SELECT depth FROM inflight WHERE url = ?', (url,)).fetchone()
+                if not row:
+                    continue
+                conn.execute('DELETE FROM inflight WHERE url = ?', (url,))
+                released += 1
+                depth = row[0]
+                # 不用 UPSERT / RETURNING，兼容较旧的 SQLite
+                row = conn.execute('SELECT count FROM retries WHERE url = ?', (url,)).fetchone()
+                retries = row[0] + 1 if row else 1
+                conn.execute('INSERT OR REPLACE INTO retries (url, count) VALUES (?, ?)', (url, retries))
+                if retries > max_retry:
+                    conn.execute('INSERT OR IGNORE INTO failed (url) VALUES (?)', (url,))
+                    conn.execute('DELETE FROM retries WHERE url = ?', (url,))
+                else:
+                    requeue.append((depth + retries, depth, url))
+            rows = self._insert_pending(conn, requeue) if requeue else []
+        if released < len(urls):
+            self.logger.debug(f"{len(urls) - released} 个 URL 未持有租约，忽略失败确认")
+        self._inflight -= released
+        self._pending += len(rows)
+        self._push_locked(rows)
+        return len(rows)
+
+    def extend_leases(self, urls: List[str], timeout: Optional[float] = None):
+        if not urls:
+            return
+        deadline = time.time() + (timeout or self.lease_timeout)
+        with self._lock:
+            with self._transaction() as conn:
+                conn.executemany('UPDATE inflight SET deadline = ? WHERE url = ?', ((deadline, url) for url in urls))
+
+    def requeue_expired(self, limit: int = 1000) -> int:
+        with self._lock:
+            return self._requeue_expired_locked(limit)
+
+    def _requeue_expired_locked(self, limit: int) -> int:
+        expired = [
+            row[0] for row in self.conn.execute(
+                'SELECT url FROM inflight WHERE deadline <= ? ORDER BY deadline LIMIT ?', (time.time(), limit)
+            )
+        ]
+        if expired:
+            self._fail_locked(expired, self.max_retry)
+        return len(expired)
+
+    # ---------- 查询 ----------
+
+    def frontier_size(self) -> int:
+        return self._pending
+
+    def inflight_size(self) -> int:
+        return self._inflight
+
+    def _iter_column(self, table: str, batch_size: int) -> Iterator[str]:
+        """
+        按主键分页读取，不会一次性加载整张表
+        """
+        last = ''
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f'SELECT url FROM {table} WHERE url > ? ORDER BY url LIMIT ?', (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+            last = rows[-1][0]
+
+    def get_failed_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        return self._iter_column('failed', batch_size)
+
+    def get_visited_urls(self, batch_size: int = 1000) -> Iterator[str]:
+        return self._iter_column('seen', batch_size)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,44 +1,539 @@
 # crawler/core/url_manager.py  
+import logging  
+import time  
+import uuid  
 import redis  
-from typing import Set, List, Optional  
-from ..config.settings import REDIS_CONFIG  # 修正导入路径  
+from typing import List, Optional, Dict, Iterable, Iterator, Set, Tuple  
+from ..config.settings import REDIS_CONFIG, CRAWLER_CONFIG  # 修正导入路径  
+from .seen_store import SeenStore, create_seen_store  
+from .checkpoint import CheckpointError, CheckpointWriter, read_checkpoint  
+from .frontier import Frontier  
+from distributed_crawler.utils.url_canonicalizer import URLCanonicalizer, get_url_canonicalizer   # type: ignore
 
-class URLManager:  
-    def __init__(self):  
-        self.redis_client = redis.Redis(**REDIS_CONFIG)  
-        self.unvisited_key = 'unvisited_urls'  
-        self.visited_key = 'visited_urls'  
+# 失败处理片段：累计重试次数，未超过上限时按“深度 + 重试次数”重新入队，否则移入失败集合
+_RETRY_LUA = """
+local function retry_or_fail(url, max_retry)
+    local retries = redis.call('HINCRBY', KEYS[4], url, 1)
+    if retries > max_retry then
+        redis.call('SADD', KEYS[5], url)
+        redis.call('HDEL', KEYS[2], url)
+        redis.call('HDEL', KEYS[4], url)
+        return 0
+    end
+    local depth = tonumber(redis.call('HGET', KEYS[2], url) or '0')
+    redis.call('ZADD', KEYS[1], 'NX', depth + retries, url)
+    return 1
+end
+"""
+
+# 租约出队脚本：先回收租约已过期的 URL，再按分数弹出 URL 并登记租约截止时间与持有者。
+# KEYS: frontier, depth, inflight, retry, failed, lease_owner；ARGV: 数量, 当前时间, 租约截止时间, 最大重试次数, 回收上限, 持有者标识
+_LEASE_SCRIPT = _RETRY_LUA + """
+local max_retry = tonumber(ARGV[4])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[2], 'LIMIT', 0, ARGV[5])
+for _, url in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], url)
+    redis.call('HDEL', KEYS[6], url)
+    retry_or_fail(url, max_retry)
+end
+
+local popped = redis.call('ZPOPMIN', KEYS[1], ARGV[1])
+local result = {}
+for i = 1, #popped, 2 do
+    local url = popped[i]
+    redis.call('ZADD', KEYS[3], ARGV[3], url)
+    redis.call('HSET', KEYS[6], url, ARGV[6])
+    table.insert(result, url)
+    table.insert(result, redis.call('HGET', KEYS[2], url) or '0')
+end
+return result
+"""
+
+# 释放租约片段：只有租约仍由本持有者持有时才释放并返回 true。
+# 租约过期被回收、又被其他 worker 领取后，迟到的确认不能动别人的租约
+_RELEASE_LUA = """
+local function release(url, owner)
+    if redis.call('HGET', KEYS[6], url) ~= owner then
+        return false
+    end
+    redis.call('HDEL', KEYS[6], url)
+    return redis.call('ZREM', KEYS[3], url) == 1
+end
+"""
+
+# 失败确认脚本：释放租约，可重试的重新入队；未持有租约的 URL 忽略
+# KEYS 同上；ARGV: 最大重试次数, 持有者标识, URL...
+_FAIL_SCRIPT = _RETRY_LUA + _RELEASE_LUA + """
+local requeued = 0
+for i = 3, #ARGV do
+    if release(ARGV[i], ARGV[2]) then
+        requeued = requeued + retry_or_fail(ARGV[i], tonumber(ARGV[1]))
+    end
+end
+return requeued
+"""
+
+# 成功确认脚本：释放租约并清理深度与重试记录；未持有租约的 URL 忽略
+# KEYS 同上；ARGV: 持有者标识, URL...
+_VISIT_SCRIPT = _RELEASE_LUA + """
+local released = 0
+for i = 2, #ARGV do
+    if release(ARGV[i], ARGV[1]) then
+        redis.call('HDEL', KEYS[2], ARGV[i])
+        redis.call('HDEL', KEYS[4], ARGV[i])
+        released = released + 1
+    end
+end
+return released
+"""
 
-    def add_seed_urls(self, urls: List[str]):  
+class URLManager(Frontier):  
+    """  
+    基于 Redis 的 URL 管理器  
+
+    出队采用租约语义：get_urls 把 URL 从待爬队列移入 inflight 有序集合（分数为租约截止时间），
+    mark_url_visited / mark_url_failed 确认后才移除。worker 崩溃时，租约过期的 URL 会在
+    任意 worker 下一次出队时被回收并重新入队，重试超过 max_retry 次的 URL 进入失败集合。  
+    """  
+    def __init__(  
+        self,  
+        redis_client: Optional[redis.Redis] = None,  
+        batch_size: int = 500,  
+        seen_store: Optional[SeenStore] = None,  
+        max_depth: Optional[int] = None,  
+        lease_timeout: Optional[float] = None,  
+        max_retry: Optional[int] = None,  
+        key_prefix: str = '',  
+        canonicalizer: Optional[URLCanonicalizer] = None,  
+        lease_token: Optional[str] = None  
+    ):  
+        """  
+        :param redis_client: 可选的 Redis 客户端，默认按 REDIS_CONFIG 创建  
+        :param batch_size: 单条 ZADD 命令携带的最大 URL 数，避免长时间阻塞 Redis  
+        :param seen_store: 已见 URL 集合，默认按 CRAWLER_CONFIG['seen_store'] 创建  
+        :param max_depth: 最大爬取深度，超过的链接在入队前丢弃，默认取 CRAWLER_CONFIG['max_depth']  
+        :param lease_timeout: 租约时长（秒），默认取 CRAWLER_CONFIG['lease_timeout']  
+        :param max_retry: 最大重试次数，默认取 CRAWLER_CONFIG['max_retry']  
+        :param key_prefix: 所有键名的前缀，分片时每个分区使用独立的前缀  
+        :param canonicalizer: URL 规范化器，默认使用进程内共享实例  
+        :param lease_token: 租约持有者标识，确认时只释放本标识持有的租约；默认每个实例随机生成  
+        """  
+        self.redis_client = redis_client or redis.Redis(**REDIS_CONFIG)  
+        self.logger = logging.getLogger(__name__)  
+        # 待爬队列：有序集合，分数越小越先出队；深度单独保存在哈希表中，直到 URL 被确认  
+        self.key_prefix = key_prefix  
+        self.frontier_key = f'{key_prefix}frontier'  
+        self.depth_key = f'{key_prefix}frontier_depth'  
+        self.inflight_key = f'{key_prefix}frontier_inflight'  
+        self.retry_key = f'{key_prefix}frontier_retries'  
+        self.failed_key = f'{key_prefix}failed_urls'  
+        self.lease_owner_key = f'{key_prefix}frontier_lease_owner'  
+        self.lease_token = lease_token or uuid.uuid4().hex  
+        self.batch_size = batch_size  
+        self.max_depth = CRAWLER_CONFIG.get('max_depth', 3) if max_depth is None else max_depth  
+        self.lease_timeout = CRAWLER_CONFIG.get('lease_timeout', 300) if lease_timeout is None else lease_timeout  
+        self.max_retry = CRAWLER_CONFIG.get('max_retry', 3) if max_retry is None else max_retry  
+        self.seen_store = seen_store or create_seen_store(  
+            self.redis_client,  
+            CRAWLER_CONFIG.get('seen_store', 'set'),  
+            key_prefix=key_prefix,  
+            **CRAWLER_CONFIG.get('seen_store_options', {})  
+        )  
+        self.canonicalizer = canonicalizer or get_url_canonicalizer()  
+        self._lease_script = self.redis_client.register_script(_LEASE_SCRIPT)  
+        self._fail_script = self.redis_client.register_script(_FAIL_SCRIPT)  
+        self._visit_script = self.redis_client.register_script(_VISIT_SCRIPT)  
+
+    @property  
+    def _queue_keys(self) -> List[str]:  
+        return [self.frontier_key, self.depth_key, self.inflight_key, self.retry_key, self.failed_key, self.lease_owner_key]  
+
+    def add_seed_urls(self, urls: List[str]) -> Dict[str, int]:  
         """  
-        添加种子 URL  
+        添加种子 URL（深度为 0）  
+
+        :return: 新增与重复的 URL 数量，见 add_urls  
         """  
-        for url in urls:  
-            self.redis_client.sadd(self.unvisited_key, url)  
+        return self.add_urls(urls, depth=0)  
 
     def get_url(self) -> Optional[str]:  
         """  
         获取一个待爬取的 URL  
         """  
-        url = self.redis_client.spop(self.unvisited_key)  
-        if url:  
-            self.redis_client.sadd(self.visited_key, url)  
-        return url.decode('utf-8') if url else None  
+        urls = self.get_urls(1)  
+        return urls[0][0] if urls else None  
+
+    def get_urls(self, count: int, reap_limit: int = 100) -> List[Tuple[str, int]]:  
+        """  
+        按优先级批量领取待爬取的 URL，一次网络往返  
+
+        领取的 URL 带有 lease_timeout 秒的租约，需要在到期前调用 mark_url_visited 或
+        mark_url_failed 确认；同一脚本内会顺带回收最多 reap_limit 个已过期的租约。
+
+        :param count: 最多获取的数量  
+        :param reap_limit: 本次最多回收的过期租约数  
+        :return: [(URL, 深度), ...]，分数小（深度浅）的在前  
+        """  
+        if count <= 0:  
+            return []  
+        return self._decode_leased(self._lease(count, reap_limit))  
+
+    def _lease(self, count: int, reap_limit: int = 100, client=None):  
+        """  
+        执行出队脚本；client 为流水线时只排入命令，结果由 _decode_leased 解码  
+        """  
+        now = time.time()  
+        return self._lease_script(  
+            keys=self._queue_keys,  
+            args=[count, now, now + self.lease_timeout, self.max_retry, reap_limit, self.lease_token],  
+            client=client  
+        )  
+
+    @staticmethod  
+    def _decode_leased(result) -> List[Tuple[str, int]]:  
+        return [  
+            (result[i].decode('utf-8'), int(result[i + 1]))  
+            for i in range(0, len(result), 2)  
+        ]  
+
+    def mark_url_visited(self, url: str):  
+        """  
+        确认 URL 已成功处理  
+        """  
+        self.mark_urls_visited([url])  
+
+    def mark_urls_visited(self, urls: List[str]):  
+        """  
+        批量确认 URL 已成功处理：释放本实例持有的租约并清理深度与重试记录  
+        """  
+        if not urls:  
+            return  
+        for start in range(0, len(urls), self.batch_size):  
+            self._visit_script(keys=self._queue_keys, args=[self.lease_token] + urls[start:start + self.batch_size])  
+
+    def mark_url_failed(self, url: str, retry: bool = True):  
+        """  
+        确认 URL 处理失败  
+
+        :param url: URL  
+        :param retry: 是否允许重试；False 时（如 robots.txt 禁止）直接进入失败集合  
+        """  
+        self.mark_urls_failed([url], retry=retry)  
+
+    def mark_urls_failed(self, urls: List[str], retry: bool = True) -> int:  
+        """  
+        批量确认 URL 处理失败，未超过重试上限的重新入队  
+
+        只处理本实例仍持有租约的 URL：租约已被回收（可能已被其他 worker 重新领取）或从未领取的 URL
+        不计重试、不入队，避免同一 URL 被并发抓取。
+
+        :return: 重新入队的数量  
+        """  
+        if not urls:  
+            return 0  
+        max_retry = self.max_retry if retry else -1  
+        requeued = 0  
+        for start in range(0, len(urls), self.batch_size):  
+            requeued += self._fail_script(  
+                keys=self._queue_keys,  
+                args=[max_retry, self.lease_token] + urls[start:start + self.batch_size]  
+            )  
+        return requeued  
+
+    def extend_leases(self, urls: List[str], timeout: Optional[float] = None):  
+        """  
+        为仍在处理中的 URL 续租，只对持有租约的 URL 生效  
+        """  
+        if not urls:  
+            return  
+        deadline = time.time() + (timeout or self.lease_timeout)  
+        self.redis_client.zadd(self.inflight_key, {url: deadline for url in urls}, xx=True)  
+
+    def requeue_expired(self, limit: int = 1000) -> int:  
+        """  
+        立即回收已过期的租约（出队时也会自动回收）  
+
+        :return: 回收的数量  
+        """  
+        now = time.time()  
+        expired = self.redis_client.zrangebyscore(self.inflight_key, '-inf', now, start=0, num=limit)  
+        if not expired:  
+            return 0  
+        # 复用出队脚本的回收逻辑，不领取新 URL  
+        self._lease_script(keys=self._queue_keys, args=[0, now, now, self.max_retry, limit, self.lease_token])  
+        return len(expired)  
+
+    def add_urls(self, urls: Iterable[str], depth: int = 0, priority: Optional[float] = None) -> Dict[str, int]:  
+        """  
+        批量添加新的 URL  
+
+        URL 先经过规范化，同一资源的不同写法合并为一个，非 http(s) 链接计为无效。
+        超过 max_depth 的 URL 直接丢弃，不访问 Redis。其余 URL 在入队时即写入已见集合：
+        先由 seen_store 原子地“检查并写入”（一次往返），只有首次出现的 URL 才会加入待爬队列
+        （第二次往返），并发提交同一链接时只会入队一次。
+
+        :param urls: 待添加的 URL  
+        :param depth: 这些 URL 的深度  
+        :param priority: 优先级分数，越小越先爬取；默认等于深度，即广度优先  
+        :return: {'new': 新入队数量, 'duplicate': 重复数量, 'too_deep': 超过最大深度被丢弃的数量, 'invalid': 无效数量}  
+        """  
+        urls = list(urls)  
+        if depth > self.max_depth:  
+            return {'new': 0, 'duplicate': 0, 'too_deep': len(urls), 'invalid': 0}  
 
-    def add_urls(self, urls: List[str]):  
+        # 先在本地规范化并去掉批内重复，减少传输量  
+        canonical_urls = [self.canonicalizer.canonicalize(url) for url in urls]  
+        unique_urls = list(dict.fromkeys(url for url in canonical_urls if url))  
+        invalid = len(urls) - sum(1 for url in canonical_urls if url)  
+        if not unique_urls:  
+            return {'new': 0, 'duplicate': len(urls) - invalid, 'too_deep': 0, 'invalid': invalid}  
+
+        flags = self.seen_store.add_many(unique_urls)  
+        new_urls = [url for url, is_new in zip(unique_urls, flags) if is_new]  
+        if new_urls:  
+            score = depth if priority is None else priority  
+            pipe = self.redis_client.pipeline(transaction=False)  
+            for start in range(0, len(new_urls), self.batch_size):  
+                chunk = new_urls[start:start + self.batch_size]  
+                pipe.hset(self.depth_key, mapping={url: depth for url in chunk})  
+                pipe.zadd(self.frontier_key, {url: score for url in chunk}, nx=True)  
+            pipe.execute()  
+        return {'new': len(new_urls), 'duplicate': len(urls) - len(new_urls) - invalid, 'too_deep': 0, 'invalid': invalid}  
+
+    def frontier_size(self) -> int:  
+        """  
+        待爬队列中的 URL 数量  
+        """  
+        return self.redis_client.zcard(self.frontier_key)  
+
+    def inflight_size(self) -> int:  
+        """  
+        已领取、尚未确认的 URL 数量  
+        """  
+        return self.redis_client.zcard(self.inflight_key)  
+
+    def get_failed_urls(self, batch_size: int = 1000) -> Iterator[str]:  
+        """  
+        流式导出超过重试上限的 URL  
+        """  
+        for url in self.redis_client.sscan_iter(self.failed_key, count=batch_size):  
+            yield url.decode('utf-8')  
+
+    def get_visited_urls(self, batch_size: int = 1000) -> Iterator[str]:  
+        """  
+        流式导出已见过的 URL（基于 SSCAN，不会一次性加载整个集合）  
+
+        仅 'set' 类型的已见集合支持导出，指纹与布隆过滤器会抛出 NotImplementedError  
+        """  
+        return self.seen_store.iter_urls(batch_size)  
+
+    def seen_stats(self) -> Dict:  
+        """  
+        已见集合的数量、内存占用与估计误判率  
+        """  
+        return self.seen_store.stats()  
+
+    def snapshot_meta(self) -> Dict:  
+        """  
+        快照 header 中的信息，恢复时校验已见集合的类型与参数  
+        """  
+        return {  
+            'key_prefix': self.key_prefix,  
+            'seen_store': type(self.seen_store).__name__,  
+            'seen_store_params': self.seen_store.params()  
+        }  
+
+    def export_snapshot(self, path: str, batch_size: int = 1000) -> Dict[str, int]:  
+        """  
+        导出爬取快照（gzip 压缩的 JSON Lines），爬取可以继续进行  
+
+        :param path: 快照文件路径  
+        :param batch_size: 每行记录的条目数，也是 SCAN 的 COUNT  
+        :return: 各类型的条目数  
+        """  
+        writer = CheckpointWriter(path, self.snapshot_meta())  
+        try:  
+            for record in self.export_records(batch_size):  
+                writer.write(record)  
+        except BaseException:  
+            writer.abort()  
+            raise  
+        counts = writer.close()  
+        self.logger.info(f"已导出快照 {path}: {counts}")  
+        return counts  
+
+    def export_records(self, batch_size: int = 1000) -> Iterator[Dict]:  
+        """  
+        流式产出快照记录  
+
+        待爬队列、深度、租约与重试次数在一个事务中 COPY 到临时键（Redis 6.2+），得到同一时刻的状态，
+        再用 SCAN 分批读取临时键；失败集合与已见集合只增不减，之后直接从原键 SCAN，
+        包含复制时刻的全部成员。租约中的 URL 按“深度 + 重试次数”作为待爬 URL 导出，恢复后重新抓取。  
+        """  
+        token = uuid.uuid4().hex[:8]  
+        copies = {name: f'{self.key_prefix}checkpoint:{token}:{name}' for name in ('frontier', 'depth', 'inflight', 'retries')}  
+        pipe = self.redis_client.pipeline(transaction=True)  
+        for name, key in zip(copies, (self.frontier_key, self.depth_key, self.inflight_key, self.retry_key)):  
+            pipe.copy(key, copies[name], replace=True)  
+            # 导出中途退出时临时键自动过期  
+            pipe.expire(copies[name], 3600)  
+        pipe.execute()  
+
+        try:  
+            yield from self._scan_hash('depth', copies['depth'], batch_size)  
+            batch = []  
+            for url, score in self.redis_client.zscan_iter(copies['frontier'], count=batch_size):  
+                batch.append([url.decode('utf-8'), score])  
+                if len(batch) >= batch_size:  
+                    yield {'type': 'frontier', 'items': batch}  
+                    batch = []  
+            if batch:  
+                yield {'type': 'frontier', 'items': batch}  
+            for urls in self._scan_batches(self.redis_client.zscan_iter(copies['inflight'], count=batch_size), batch_size):  
+                urls = [url for url, _ in urls]  
+                pipe = self.redis_client.pipeline(transaction=False)  
+                pipe.hmget(copies['depth'], urls)  
+                pipe.hmget(copies['retries'], urls)  
+                depths, retries = pipe.execute()  
+                yield {  
+                    'type': 'inflight',  
+                    'items': [  
+                        [url.decode('utf-8'), int(depth or 0) + int(retry or 0)]  
+                        for url, depth, retry in zip(urls, depths, retries)  
+                    ]  
+                }  
+            yield from self._scan_hash('retries', copies['retries'], batch_size)  
+            for urls in self._scan_batches(self.redis_client.sscan_iter(self.failed_key, count=batch_size), batch_size):  
+                yield {'type': 'failed', 'items': [url.decode('utf-8') for url in urls]}  
+            yield from self.seen_store.export_records(batch_size)  
+        finally:  
+            self.redis_client.delete(*copies.values())  
+
+    @staticmethod  
+    def _scan_batches(iterator: Iterator, batch_size: int) -> Iterator[List]:  
+        batch = []  
+        for item in iterator:  
+            batch.append(item)  
+            if len(batch) >= batch_size:  
+                yield batch  
+                batch = []  
+        if batch:  
+            yield batch  
+
+    def _scan_hash(self, kind: str, key: str, batch_size: int) -> Iterator[Dict]:  
+        for fields in self._scan_batches(self.redis_client.hscan_iter(key, count=batch_size), batch_size):  
+            yield {'type': kind, 'items': [[url.decode('utf-8'), int(value)] for url, value in fields]}  
+
+    def import_snapshot(self, path: str, overwrite: bool = False, pipeline_size: int = 50) -> Dict[str, int]:  
+        """  
+        从快照恢复  
+
+        记录先通过流水线批量写入暂存键，读完整个文件且校验通过后，才在一个事务中替换正式键；
+        文件损坏或不完整时不修改现有状态并抛出 CheckpointError。  
+
+        :param path: 快照文件路径  
+        :param overwrite: 当前已有爬取状态时是否覆盖，False 时抛出 CheckpointError  
+        :param pipeline_size: 每次往返携带的命令数（每条命令写入一行记录的全部条目）  
+        :return: 各类型的条目数  
+        """  
+        records = read_checkpoint(path)  
+        header = next(records)  
+        if header.get('partitions'):  
+            raise CheckpointError(f"{path} 是分片快照，请用 ShardedURLManager 恢复")  
+        self.check_snapshot_header(header)  
+        if not overwrite:  
+            self.ensure_empty()  
+
+        loader = self.snapshot_loader(pipeline_size)  
+        try:  
+            for record in records:  
+                loader.load(record)  
+            loader.commit()  
+        except BaseException:  
+            loader.abort()  
+            raise  
+        self.logger.info(f"已从快照 {path} 恢复: {loader.counts}")  
+        return loader.counts  
+
+    def check_snapshot_header(self, header: Dict):  
+        """  
+        校验快照的已见集合类型与参数与当前配置一致  
         """  
-        添加新的 URL  
+        meta = self.snapshot_meta()  
+        for field in ('seen_store', 'seen_store_params'):  
+            if header.get(field) != meta[field]:  
+                raise CheckpointError(f"快照的 {field} 为 {header.get(field)}，当前为 {meta[field]}")  
+
+    def ensure_empty(self):  
+        """  
+        当前有待爬、租约中或已见的 URL 时抛出 CheckpointError  
         """  
-        for url in urls:  
-            # 避免重复和已访问的 URL  
-            if not self.redis_client.sismember(self.visited_key, url):  
-                self.redis_client.sadd(self.unvisited_key, url)  
+        if self.frontier_size() or self.inflight_size() or self.seen_store.count():  
+            raise CheckpointError("当前已有爬取状态，如需覆盖请指定 overwrite=True")  
+
+    def snapshot_loader(self, pipeline_size: int = 50) -> '_SnapshotLoader':  
+        return _SnapshotLoader(self, pipeline_size)  
 
-    def get_visited_urls(self) -> Set[str]:  
+
+class _SnapshotLoader:  
+    """  
+    把快照记录写入暂存键，commit 时在一个事务中删除正式键并把暂存键改名为正式键  
+    """  
+    def __init__(self, manager: URLManager, pipeline_size: int = 50):  
+        self.manager = manager  
+        self.pipeline_size = pipeline_size  
+        self.suffix = f':restoring:{uuid.uuid4().hex[:8]}'  
+        self.counts: Dict[str, int] = {}  
+        self._staged: Set[str] = set()  
+        self._pipe = manager.redis_client.pipeline(transaction=False)  
+        self._queued = 0  
+
+    def _stage(self, key: str) -> str:  
+        self._staged.add(key)  
+        return key + self.suffix  
+
+    def load(self, record: Dict):  
+        manager = self.manager  
+        kind = record['type']  
+        items = record.get('items', [])  
+        if kind in ('frontier', 'inflight'):  
+            self._pipe.zadd(self._stage(manager.frontier_key), {url: score for url, score in items}, nx=True)  
+        elif kind == 'depth':  
+            self._pipe.hset(self._stage(manager.depth_key), mapping=dict(items))  
+        elif kind == 'retries':  
+            self._pipe.hset(self._stage(manager.retry_key), mapping=dict(items))  
+        elif kind == 'failed':  
+            self._pipe.sadd(self._stage(manager.failed_key), *items)  
+        elif not manager.seen_store.load_record(record, self._pipe, self._stage):  
+            raise CheckpointError(f"未知的快照记录类型: {kind}")  
+        self.counts[kind] = self.counts.get(kind, 0) + len(items)  
+        self._queued += 1  
+        if self._queued >= self.pipeline_size:  
+            self.flush()  
+
+    def flush(self):  
         """  
-        获取已访问的 URL  
+        发送流水线中排队的写入  
         """  
-        return {url.decode('utf-8') for url in self.redis_client.smembers(self.visited_key)}  
+        if self._queued:  
+            self._pipe.execute()  
+            self._queued = 0  
+
+    def commit(self):  
+        self.flush()  
+        manager = self.manager  
+        pipe = manager.redis_client.pipeline(transaction=True)  
+        pipe.delete(*(manager._queue_keys + manager.seen_store.keys()))  
+        for key in self._staged:  
+            pipe.rename(key + self.suffix, key)  
+        pipe.execute()  
+        self._staged.clear()  
+
+    def abort(self):  
+        self._pipe.reset()  
+        if self._staged:  
+            self.manager.redis_client.delete(*(key + self.suffix for key in self._staged))  
+            self._staged.clear()  
 
 class SeedManager:  
     def __init__(self):  
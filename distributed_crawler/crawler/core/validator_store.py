@@ -0,0 +1,71 @@
+# crawler/core/validator_store.py
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+import redis
+import requests
+
+
+def content_hash(body: bytes) -> str:
+    """
+    响应体的内容哈希
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ValidatorStore:
+    """
+    页面校验信息存储，用于条件重抓
+
+    每个 URL 在 Redis 哈希表中保存 ETag、Last-Modified、内容哈希与抓取/校验时间，
+    多个 worker 共享同一份数据。重抓时据此发送 If-None-Match / If-Modified-Since。
+    """
+    def __init__(self, redis_client: redis.Redis, key: str = 'page_validators'):
+        self.redis_client = redis_client
+        self.key = key
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        获取 URL 的校验信息
+        """
+        raw = self.redis_client.hget(self.key, url)
+        return json.loads(raw) if raw else None
+
+    def conditional_headers(self, validators: Optional[Dict]) -> Dict[str, str]:
+        """
+        根据校验信息生成条件请求头
+        """
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def record(self, url: str, response: requests.Response, digest: str):
+        """
+        保存新抓取页面的校验信息
+        """
+        now = time.time()
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': digest,
+            'fetched_at': now,
+            'checked_at': now
+        }
+        self.redis_client.hset(self.key, url, json.dumps(validators))
+
+    def touch(self, url: str, validators: Dict, response: Optional[requests.Response] = None):
+        """
+        页面未变化（304 或内容哈希相同）时只更新校验时间；304 响应可能带有新的 ETag
+        """
+        validators = dict(validators)
+        validators['checked_at'] = time.time()
+        if response is not None:
+            validators['etag'] = response.headers.get('ETag') or validators.get('etag')
+            validators['last_modified'] = response.headers.get('Last-Modified') or validators.get('last_modified')
+        self.redis_client.hset(self.key, url, json.dumps(validators))
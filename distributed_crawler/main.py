@@ -1,7 +1,10 @@
 # distributed_crawler/main.py  
 import logging  
-from crawler.core.url_manager import URLManager  
+from crawler.core.frontier import create_frontier  
+from crawler.core.sharding import ShardedURLManager  
+from crawler.config.settings import METRICS_CONFIG  
 from utils.proxy_pool import ProxyPool
+from utils.metrics import get_metrics
 from distributed_crawler.utils.robots_checker import RobotsChecker  # 修正路径  
 from crawler.core.data_crawler import DataCrawler  
 from crawler.core.data_storage import FileStorage
@@ -10,10 +13,19 @@ def main():
     logging.basicConfig(level=logging.INFO)  
 
     # 初始化组件  
-    url_manager = URLManager()  
+    # 待爬队列由 CRAWLER_CONFIG['frontier'] 决定：Redis（配置了多个实例时按主机分片）或本地 SQLite  
+    url_manager = create_frontier()  
     proxy_pool = ProxyPool()  
+    proxy_pool.start_health_checks()  
     robots_checker = RobotsChecker()  
 
+    # 指标：本机 /metrics 接口与定期日志快照  
+    metrics = get_metrics()  
+    if METRICS_CONFIG['port']:  
+        metrics.start_http_server()  
+    if METRICS_CONFIG['snapshot_interval']:  
+        metrics.start_log_snapshots()  
+
     # 添加种子 URL  
     seed_urls = [  
         'https://www.python.org',  
@@ -33,8 +45,16 @@ def main():
         storage=storage  
     )  
 
-    # 开始爬取  
-    data_crawler.crawl()  
+    # 开始爬取，结束时写出存储模块中缓冲的数据  
+    try:  
+        data_crawler.crawl()  
+    finally:  
+        storage.close()  
+        proxy_pool.stop_health_checks()  
+        metrics.stop()  
+        if isinstance(url_manager, ShardedURLManager):  
+            url_manager.release_claims()  
+        url_manager.close()  
 
 if __name__ == '__main__':  
     main()
\ No newline at end of file
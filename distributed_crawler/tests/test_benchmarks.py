@@ -0,0 +1,51 @@
+# tests/test_benchmarks.py
+import urllib.request
+
+import pytest
+
+pytest.importorskip('fakeredis')
+
+from ..benchmarks import CountingRedis, SyntheticSite, compare_results, run_crawl_benchmark
+
+
+def test_synthetic_site():
+    """合成站点按参数生成确定的页面，所有页面都可从 0 号页面到达"""
+    site = SyntheticSite(hosts=2, pages_per_host=20, fanout=5, page_bytes=2000, latency=0)
+    assert site.links(1, 3) == SyntheticSite(hosts=2, pages_per_host=20, fanout=5).links(1, 3)
+    assert site.links(0, 0)[:2] == [(0, 1), (0, 2)]
+    with site:
+        with urllib.request.urlopen(site.seed_urls()[1], timeout=5) as response:
+            html = response.read().decode('utf-8')
+        assert 'Host 1 page 0' in html
+        assert len(html) >= 2000
+        assert site.request_count == 1
+
+
+def test_counting_redis():
+    """单条命令与脚本各计一次往返，流水线整体计一次往返"""
+    redis_client = CountingRedis()
+    redis_client.set('a', 1)
+    pipe = redis_client.pipeline()
+    pipe.sadd('s', 'x')
+    pipe.sadd('s', 'y')
+    pipe.execute()
+    stats = redis_client.op_stats()
+    assert stats['round_trips'] == 2
+    assert stats['commands'] == 3
+    assert stats['by_command'] == {'SET': 1, 'SADD': 2}
+
+
+def test_crawl_benchmark_and_compare():
+    """离线完整爬取抓到全部页面，并能与基线比较找出回归"""
+    result = run_crawl_benchmark(hosts=2, pages_per_host=15, fanout=4, page_bytes=1000, latency=0, mode='serial')
+    assert result['pages'] == 30
+    assert result['failed_urls'] == 0
+    assert result['redis']['commands_per_page'] > 0
+    for stage in ('robots', 'proxy', 'fetch', 'parse', 'store', 'enqueue'):
+        assert result['stages'][stage]['count'] == 30
+
+    current = {'crawl': result}
+    assert compare_results(current, current) == []
+    slower = {'crawl': dict(result, pages_per_sec=result['pages_per_sec'] / 2)}
+    regressions = compare_results(current, slower)
+    assert len(regressions) == 1 and regressions[0].startswith('crawl.pages_per_sec')
@@ -0,0 +1,76 @@
+# tests/test_checkpoint.py
+import gzip
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from ..crawler.core.checkpoint import CheckpointError
+from ..crawler.core.seen_store import create_seen_store
+from ..crawler.core.url_manager import URLManager
+
+
+def _manager(kind: str = 'set') -> URLManager:
+    redis_client = fakeredis.FakeRedis()
+    options = {'capacity': 1000} if kind == 'bloom' else {}
+    seen_store = create_seen_store(redis_client, kind, **options)
+    return URLManager(redis_client=redis_client, seen_store=seen_store, max_retry=1)
+
+
+@pytest.mark.parametrize('kind', ['set', 'fingerprint', 'bloom'])
+def test_snapshot_round_trip(tmp_path, kind):
+    """导出后恢复到空实例：待爬队列、深度、优先级、租约、重试与失败状态以及已见集合都保留"""
+    source = _manager(kind)
+    source.add_urls([f"https://a.com/{i}" for i in range(2500)], depth=1)
+    source.add_urls(["https://b.com/"], depth=0, priority=-5)
+    leased = [url for url, _ in source.get_urls(3)]
+    source.mark_url_failed(leased[1])
+    source.mark_url_failed(leased[2], retry=False)
+
+    path = str(tmp_path / 'crawl.jsonl.gz')
+    counts = source.export_snapshot(path, batch_size=500)
+    assert counts['inflight'] == 1
+    # 导出用的临时键已删除
+    assert not source.redis_client.keys('*checkpoint*')
+
+    target = _manager(kind)
+    assert target.import_snapshot(path) == counts
+    assert not target.redis_client.keys('*restoring*')
+    # 租约中的 URL 回到待爬队列
+    assert target.frontier_size() == source.frontier_size() + source.inflight_size()
+    assert target.inflight_size() == 0
+    assert target.seen_store.count() == source.seen_store.count()
+    assert target.seen_store.contains("https://a.com/2499")
+    assert list(target.get_failed_urls()) == [leased[2]]
+    assert target.redis_client.hgetall(target.retry_key) == {leased[1].encode(): b'1'}
+    assert target.get_urls(2) == [("https://b.com/", 0), ("https://a.com/10", 1)]
+    # 已见过的 URL 不会重复入队
+    assert target.add_urls(["https://a.com/7"], depth=1)['duplicate'] == 1
+
+
+def test_import_is_all_or_nothing(tmp_path):
+    """已有状态时默认拒绝覆盖；快照截断时不修改现有状态"""
+    source = _manager()
+    source.add_urls([f"https://a.com/{i}" for i in range(3000)])
+    path = str(tmp_path / 'crawl.jsonl.gz')
+    source.export_snapshot(path, batch_size=100)
+
+    target = _manager()
+    target.add_urls(["https://old.com/"])
+    with pytest.raises(CheckpointError):
+        target.import_snapshot(path)
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        lines = f.readlines()
+    truncated = str(tmp_path / 'truncated.jsonl.gz')
+    with gzip.open(truncated, 'wt', encoding='utf-8') as f:
+        f.writelines(lines[:-3])
+    with pytest.raises(CheckpointError):
+        target.import_snapshot(truncated, overwrite=True, pipeline_size=2)
+    assert target.get_urls(10) == [("https://old.com/", 0)]
+    assert not target.redis_client.keys('*restoring*')
+
+    target.mark_url_visited("https://old.com/")
+    assert target.import_snapshot(path, overwrite=True)['seen'] == 3000
+    assert target.frontier_size() == 3000
+    assert not target.seen_store.contains("https://old.com/")
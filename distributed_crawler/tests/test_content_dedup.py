@@ -0,0 +1,61 @@
+# tests/test_content_dedup.py  
+import pytest  
+
+from ..crawler.core import content_dedup  
+from ..crawler.core.content_dedup import ContentDeduplicator, LocalFingerprintIndex, RedisFingerprintIndex, simhash, hamming_distance  
+
+ARTICLE = " ".join(f"word{i}" for i in range(300))  
+
+
+def test_simhash_near_duplicate():  
+    """少量改动的文本指纹距离很小"""  
+    changed = ARTICLE.replace("word10 ", "other ")  
+    assert hamming_distance(simhash(ARTICLE), simhash(changed)) <= 3  
+    assert hamming_distance(simhash(ARTICLE), simhash(" ".join(f"x{i}" for i in range(300)))) > 3  
+
+
+def test_deduplicator_records_alias():  
+    """精确与近似重复的页面都被识别并记录别名"""  
+    index = LocalFingerprintIndex(capacity=10)  
+    dedup = ContentDeduplicator(index)  
+    html = f"<html><body><p>{ARTICLE}</p><script>var t = 1;</script></body></html>"  
+
+    assert dedup.check("http://a.com/page", html) is None  
+    assert dedup.check("http://a.com/page?print=1", html.replace("var t = 1", "var t = 2")) == "http://a.com/page"  
+    assert dedup.check("http://mirror.com/page", html.replace("word10 ", "other ")) == "http://a.com/page"  
+    assert index.aliases == {"http://a.com/page?print=1": "http://a.com/page", "http://mirror.com/page": "http://a.com/page"}  
+
+
+def test_index_capacity():  
+    """索引按 LRU 淘汰，内存有界"""  
+    index = LocalFingerprintIndex(capacity=2)  
+    for i in range(5):  
+        index.find_or_add(f"http://a.com/{i}", f"d{i}", simhash(f"page {i} " * 5 + str(i * 7919)))  
+    assert len(index) == 2  
+
+
+def test_redis_index_expires_old_fingerprints(monkeypatch):  
+    """共享索引中的旧指纹与别名按 ttl 过期，持续写入的块也不会无限增长"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    now = [1000.0]  
+    monkeypatch.setattr(content_dedup.time, 'time', lambda: now[0])  
+    redis_client = fakeredis.FakeRedis()  
+    index = RedisFingerprintIndex(redis_client, ttl=100, bucket_capacity=3)  
+    dedup = ContentDeduplicator(index)  
+    html = f"<html><body><p>{ARTICLE}</p></body></html>"  
+
+    assert dedup.check("http://a.com/page", html) is None  
+    assert dedup.check("http://mirror.com/page", html.replace("word10 ", "other ")) == "http://a.com/page"  
+    assert index.get_alias("http://mirror.com/page") == "http://a.com/page"  
+    assert 0 < redis_client.ttl("content:alias:http://mirror.com/page") <= 100  
+
+    # ttl 之后旧指纹不再命中，同一块写入新成员时被删除  
+    now[0] += 150  
+    assert dedup.check("http://b.com/page", html.replace("word20 ", "other ")) is None  
+    buckets = redis_client.keys("content:band:*")  
+    assert buckets and all(redis_client.zcard(key) == 1 for key in buckets)  
+
+    # 每个块最多保留 bucket_capacity 个指纹：低 16 位相同、其余位各不相同的指纹落在同一块  
+    for i in range(10):  
+        assert index.find_or_add(f"http://c.com/{i}", f"d{i}", simhash(f"page {i} " * 5) & ~0xFFFF) is None  
+    assert redis_client.zcard("content:band:0:0") == 3  
@@ -0,0 +1,188 @@
+# tests/test_crawl_modes.py
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from ..benchmarks import SyntheticSite
+from ..crawler.core.async_engine import AsyncCrawlEngine
+from ..crawler.core.data_crawler import DataCrawler
+from ..crawler.core.data_storage import DataStorage
+from ..crawler.core.url_manager import URLManager
+from ..utils.http_client import HttpClient
+from ..utils.metrics import Metrics
+
+
+class _NoProxyPool:
+    def get_proxy(self):
+        return None
+
+
+class _AllowAllRobots:
+    def can_fetch(self, url):
+        return True
+
+    def get_crawl_delay(self, url):
+        return 0
+
+
+class _RecordingStorage(DataStorage):
+    """
+    记录每个 URL 被保存的次数
+    """
+    def __init__(self):
+        self.saved = Counter()
+        self._lock = threading.Lock()
+
+    def save(self, data):
+        with self._lock:
+            self.saved[data['url']] += 1
+
+
+class _HostConcurrencyClient(HttpClient):
+    """
+    统计每个主机同时进行的请求数的峰值
+    """
+    def __init__(self):
+        super().__init__()
+        self.peak = Counter()
+        self._active = Counter()
+        self._lock = threading.Lock()
+
+    def fetch(self, url, **kwargs):
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._active[host] += 1
+            self.peak[host] = max(self.peak[host], self._active[host])
+        try:
+            return super().fetch(url, **kwargs)
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+
+
+def _site_crawler(site, max_per_host=1, storage=None, **manager_kwargs):
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis(), max_depth=50, **manager_kwargs)
+    storage = storage or _RecordingStorage()
+    http_client = _HostConcurrencyClient()
+    crawler = DataCrawler(
+        url_manager=url_manager, proxy_pool=_NoProxyPool(), robots_checker=_AllowAllRobots(),
+        storage=storage, http_client=http_client, max_depth=50, crawl_interval=0,
+        max_per_host=max_per_host, idle_interval=0.05, metrics=Metrics()
+    )
+    url_manager.add_seed_urls(site.seed_urls())
+    return crawler, storage, http_client
+
+
+class _StatusHttpClient:
+    """
+    按路径返回固定状态码
+    """
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, url, **kwargs):
+        self.requests.append(url)
+        response = requests.Response()
+        response.url = url
+        response.status_code = int(url.rsplit('/', 1)[-1])
+        response._content = b''
+        return response
+
+
+def test_client_errors_are_not_retried():
+    """404、410 直接进入失败集合；5xx 与 429 按重试次数重新抓取"""
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis(), max_retry=2)
+    client = _StatusHttpClient()
+    crawler = DataCrawler(
+        url_manager=url_manager, proxy_pool=_NoProxyPool(), robots_checker=_AllowAllRobots(),
+        storage=None, http_client=client, crawl_interval=0, metrics=Metrics()
+    )
+    urls = [f"https://a.com/{status}" for status in (404, 410, 429, 503)]
+    url_manager.add_seed_urls(urls)
+    while True:
+        leased = url_manager.get_urls(10)
+        if not leased:
+            break
+        for url, depth in leased:
+            crawler.handle_crawl(url, depth)
+
+    assert sorted(client.requests) == sorted(urls[:2] + urls[2:] * 3)
+    assert sorted(url_manager.get_failed_urls()) == sorted(urls)
+    assert url_manager.inflight_size() == 0
+
+
+def test_crawl_async_stores_each_page_once():
+    """异步引擎抓完合成站点的全部页面，每页只保存一次，主机并发不超过 max_per_host"""
+    with SyntheticSite(hosts=3, pages_per_host=20, fanout=4, page_bytes=500, latency=0.01) as site:
+        crawler, storage, http_client = _site_crawler(site, max_per_host=2)
+        crawler.crawl_async(concurrency=8)
+
+        assert len(storage.saved) == site.total_pages
+        assert set(storage.saved.values()) == {1}
+        assert site.request_count == site.total_pages
+        assert max(http_client.peak.values()) <= 2
+        assert crawler.url_manager.is_exhausted()
+
+
+def test_crawl_async_stop():
+    """stop() 让引擎在抓完前退出：线程池关闭，已保存的页面不重复"""
+    with SyntheticSite(hosts=2, pages_per_host=200, fanout=4, page_bytes=500, latency=0.02) as site:
+        crawler, storage, _ = _site_crawler(site)
+        engine = AsyncCrawlEngine(crawler, concurrency=4)
+        runner = threading.Thread(target=engine.run_forever)
+        runner.start()
+        deadline = time.monotonic() + 10
+        while len(storage.saved) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.stop()
+        runner.join(timeout=5)
+
+        assert not runner.is_alive()
+        assert engine._executor is None
+        assert 5 <= len(storage.saved) < site.total_pages
+        assert set(storage.saved.values()) == {1}
+
+
+class _FailingStorage(_RecordingStorage):
+    """
+    保存指定 URL 时总是抛出异常
+    """
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = set(failing)
+
+    def save(self, data):
+        if data['url'] in self.failing:
+            raise IOError("写入失败")
+        super().save(data)
+
+
+def test_crawl_pipelined_stats_consistent():
+    """流水线抓完全部页面，每页只保存一次；抓取或存储失败的页面进入失败集合，结束时各计数一致"""
+    with SyntheticSite(hosts=2, pages_per_host=20, fanout=4, page_bytes=500, latency=0) as site:
+        # 叶子页面存储失败不影响其他页面的可达性；不存在的页面返回 404
+        leaf = f"{site.base_urls[0]}/p/{site.pages_per_host - 1}"
+        missing = f"{site.base_urls[1]}/p/9999"
+        crawler, storage, _ = _site_crawler(site, max_per_host=2, storage=_FailingStorage([leaf]), max_retry=2)
+        crawler.url_manager.add_urls([missing])
+
+        stats = crawler.crawl_pipelined(fetch_workers=4, parse_workers=2)
+
+        assert len(storage.saved) == site.total_pages - 1
+        assert set(storage.saved.values()) == {1}
+        assert sorted(crawler.url_manager.get_failed_urls()) == sorted([leaf, missing])
+        assert crawler.url_manager.is_exhausted()
+
+        assert stats['fetch_failed'] == 1
+        assert stats['failed'] == 3
+        assert stats['stored'] == len(storage.saved)
+        assert stats['fetched'] == stats['parsed'] == stats['stored'] + stats['failed']
+        assert stats['finished'] == stats['fetched'] + stats['fetch_failed'] == site.request_count
+        for name in ('outstanding', 'parse_in_flight', 'fetch_queue', 'result_queue', 'scheduler_pending'):
+            assert stats[name] == 0
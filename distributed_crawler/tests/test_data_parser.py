@@ -0,0 +1,23 @@
+# tests/test_data_parser.py  
+from ..crawler.core.data_parser import DataParser  
+
+HTML = """  
+<html><head><title> 测试页面 </title><meta name="description" content="desc"></head>  
+<body><a href="/a">A</a><a href="http://other.com/b#x">B</a><img src="img.png"></body></html>  
+"""  
+
+
+def test_parse_single_pass():  
+    """一次解析返回标题、元数据、图片与绝对链接"""  
+    parsed = DataParser().parse(HTML, "http://example.com/dir/page")  
+    assert parsed['title'] == '测试页面'  
+    assert parsed['meta'] == {'description': 'desc'}  
+    assert parsed['images'] == ['http://example.com/dir/img.png']  
+    assert parsed['links'] == ['http://example.com/a', 'http://other.com/b']  
+
+
+def test_unknown_features_fallback():  
+    """不可用的树构建器回退到 html.parser"""  
+    parser = DataParser(features='no-such-builder')  
+    assert parser.features == 'html.parser'  
+    assert parser.extract_links(HTML, "http://example.com/") == ['http://example.com/a', 'http://other.com/b']  
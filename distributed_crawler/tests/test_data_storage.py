@@ -0,0 +1,97 @@
+# tests/test_data_storage.py  
+import gzip  
+import json  
+
+from ..crawler.core.data_storage import FileStorage  
+
+
+def test_file_storage_flush_on_close(tmp_path):  
+    """未达到写出阈值的记录在 close 时写入文件"""  
+    path = tmp_path / 'data.json'  
+    storage = FileStorage(str(path), flush_records=100)  
+    for i in range(5):  
+        storage.save({'url': f'http://example.com/{i}'})  
+    storage.close()  
+
+    lines = path.read_text(encoding='utf-8').splitlines()  
+    assert [json.loads(line)['url'] for line in lines] == [f'http://example.com/{i}' for i in range(5)]  
+
+
+def test_file_storage_rotate_gzip(tmp_path):  
+    """按大小轮转并以 gzip 压缩"""  
+    storage = FileStorage(str(tmp_path / 'data.json'), flush_records=10, rotate_bytes=1, compression='gzip')  
+    for i in range(30):  
+        storage.save({'i': i})  
+    storage.close()  
+
+    files = sorted(tmp_path.glob('data-*.json.gz'))  
+    assert len(files) == 3  
+    records = [json.loads(line) for f in files for line in gzip.open(f).read().splitlines()]  
+    assert sorted(r['i'] for r in records) == list(range(30))  
+
+
+def test_batch_storage_retries_per_record():  
+    """整批失败时逐条重试，坏记录不影响其他记录"""  
+    from ..crawler.core.data_storage import BatchStorage  
+
+    class MemoryStorage(BatchStorage):  
+        def __init__(self):  
+            self.batches, self.rows = [], []  
+            super().__init__(batch_size=3, flush_interval=60)  
+
+        def _write_batch(self, records):  
+            self.batches.append(len(records))  
+            if any(r.get('bad') for r in records):  
+                raise ValueError('bad record')  
+            self.rows.extend(records)  
+            return len(records)  
+
+        def _write_one(self, record):  
+            if record.get('bad'):  
+                raise ValueError('bad record')  
+            self.rows.append(record)  
+
+    storage = MemoryStorage()  
+    for record in [{'url': 'a'}, {'url': 'b'}, {'url': 'c'}, {'url': 'd', 'bad': True}, {'url': 'e'}]:  
+        storage.save(record)  
+    assert storage.batches == [3]  
+    storage.close()  
+    assert storage.batches == [3, 2]  
+    assert [r['url'] for r in storage.rows] == ['a', 'b', 'c', 'e']  
+
+
+def test_warc_storage_index_lookup(tmp_path):  
+    """WARC 记录逐条 gzip 追加，索引扩容后仍能按 URL 直接读取响应"""  
+    import requests  
+    from ..crawler.core.data_storage import WarcStorage  
+
+    def response(url, body):  
+        resp = requests.Response()  
+        resp.status_code = 200  
+        resp.reason = 'OK'  
+        resp.url = url  
+        resp.headers['Content-Type'] = 'text/html'  
+        resp.headers['Content-Encoding'] = 'gzip'  
+        resp._content = body  
+        resp.request = requests.Request('GET', url, headers={'User-Agent': 'test'}).prepare()  
+        return resp  
+
+    storage = WarcStorage(str(tmp_path), segment_bytes=4096, index_capacity=8)  
+    for i in range(50):  
+        url = f"https://example.com/page?id={i}"  
+        storage.save_page(url, response(url, f"<html>{i}</html>".encode()))  
+        storage.save({'url': url, 'title': str(i)})  
+    page = storage.get_page("https://example.com/page?id=7")  
+    assert page['status'] == 200 and page['content'] == b"<html>7</html>"  
+    assert 'Content-Encoding' not in page['headers']  
+    assert storage.get_page("https://example.com/missing") is None  
+    storage.close()  
+
+    reopened = WarcStorage(str(tmp_path))  
+    assert reopened.index.count == 50 and reopened.index.capacity > 8  
+    assert reopened.get_page("https://example.com/page?id=49")['content'] == b"<html>49</html>"  
+    segments = sorted(tmp_path.glob('warc-*.warc.gz'))  
+    assert len(segments) > 1  
+    with gzip.open(segments[0], 'rb') as f:  
+        assert f.read(8) == b'WARC/1.1'  
+    reopened.close()  
@@ -0,0 +1,94 @@
+# tests/test_http_client.py  
+import threading  
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  
+
+import pytest  
+from ..utils.http_client import HttpClient, ContentRejected, detect_encoding  
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):  
+    protocol_version = 'HTTP/1.1'  
+
+    def do_GET(self):  
+        if self.path == '/gbk':  
+            self._send('text/html', '<html><head><meta charset="gbk"></head><body>中文页面</body></html>'.encode('gbk'))  
+        elif self.path == '/pdf':  
+            self._send('application/pdf', b'%PDF-1.4' * 1000)  
+        elif self.path == '/big':  
+            self._send('text/html', b'x' * 100000)  
+        elif self.path == '/stream':  
+            # 不声明长度，只能边读边检查  
+            self.send_response(200)  
+            self.send_header('Content-Type', 'text/html')  
+            self.send_header('Connection', 'close')  
+            self.end_headers()  
+            self.wfile.write(b'x' * 100000)  
+        else:  
+            self._send(None, b'ok')  
+
+    def _send(self, content_type, body):  
+        self.send_response(200)  
+        if content_type:  
+            self.send_header('Content-Type', content_type)  
+        self.send_header('Content-Length', str(len(body)))  
+        self.end_headers()  
+        self.wfile.write(body)  
+
+    def log_message(self, *args):  
+        pass  
+
+
+@pytest.fixture  
+def local_server():  
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)  
+    thread = threading.Thread(target=server.serve_forever, daemon=True)  
+    thread.start()  
+    yield f"http://127.0.0.1:{server.server_address[1]}"  
+    server.shutdown()  
+    server.server_close()  
+
+
+def test_connection_reuse(local_server):  
+    """同一主机的多次请求复用同一个连接"""  
+    client = HttpClient(idle_timeout=60)  
+    for i in range(5):  
+        assert client.get(f"{local_server}/page/{i}", timeout=5).text == 'ok'  
+
+    stats = client.stats()  
+    assert stats['requests'] == 5  
+    assert stats['new_connections'] == 1  
+    assert stats['reused_connections'] == 4  
+    client.close()  
+    assert client.stats()['sessions'] == 0  
+
+
+def test_idle_session_eviction(local_server):  
+    """空闲超时的会话会被关闭"""  
+    client = HttpClient(idle_timeout=0)  
+    client.get(local_server, timeout=5)  
+    client.evict_idle()  
+    assert client.stats()['sessions'] == 0  
+
+
+
+def test_streaming_fetch_limits(local_server):  
+    """按内容类型与大小拒绝响应，声明了 meta 编码的页面按该编码解码"""  
+    client = HttpClient()  
+    html_types = ['text/html']  
+    response = client.fetch(f"{local_server}/gbk", max_bytes=1000, allowed_types=html_types, timeout=5)  
+    assert response.encoding == 'gbk'  
+    assert '中文页面' in response.text  
+
+    for path in ('/pdf', '/big', '/stream'):  
+        with pytest.raises(ContentRejected):  
+            client.fetch(f"{local_server}{path}", max_bytes=1000, allowed_types=html_types, timeout=5)  
+    client.close()  
+
+
+def test_detect_encoding():  
+    """编码判断顺序：响应头 → BOM → meta → UTF-8 → 备选编码"""  
+    assert detect_encoding('text/html; charset="UTF-8"', b'') == 'utf-8'  
+    assert detect_encoding('text/html; charset=bogus', '页面'.encode('utf-8')) == 'utf-8'  
+    assert detect_encoding(None, b'\xef\xbb\xbf<html>') == 'utf-8-sig'  
+    assert detect_encoding('text/html', b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">') == 'shift_jis'  
+    assert detect_encoding('text/html', '中文'.encode('gb18030')) == 'gb18030'  
@@ -0,0 +1,65 @@
+# tests/test_metrics.py
+import threading
+import urllib.request
+
+from ..utils.metrics import Metrics
+
+
+def test_counters_and_histograms_across_threads():
+    """各线程分片在导出时汇总，已结束线程的数据不会丢失"""
+    metrics = Metrics(buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            metrics.inc('crawler_http_responses_total', status=200)
+        metrics.inc('crawler_downloaded_bytes_total', 512)
+        metrics.observe('crawler_stage_seconds', 0.05, stage='fetch')
+        metrics.observe('crawler_stage_seconds', 0.5, stage='fetch')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with metrics.time_stage('parse'):
+        pass
+    try:
+        with metrics.time_stage('store'):
+            raise ValueError("写入失败")
+    except ValueError:
+        pass
+    metrics.set_gauge_function('crawler_frontier_size', lambda: 42)
+
+    text = metrics.render()
+    assert 'crawler_http_responses_total{status="200"} 4000' in text
+    assert 'crawler_downloaded_bytes_total 2048' in text
+    assert '# TYPE crawler_stage_seconds histogram' in text
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="0.1"} 4' in text
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="1"} 8' in text
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="+Inf"} 8' in text
+    assert 'crawler_stage_seconds_count{stage="fetch"} 8' in text
+    assert 'crawler_stage_errors_total{stage="store"} 1' in text
+    assert 'crawler_frontier_size 42' in text
+
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['fetch']['count'] == 8
+    # p95 在 (0.1, 1] 桶内线性插值：0.1 + 0.9 * 3.6 / 4
+    assert snapshot['stages']['fetch']['p95_ms'] == 910
+    assert snapshot['stages']['parse']['count'] == 1
+    assert snapshot['gauges'] == {'crawler_frontier_size': 42}
+    # 再次导出结果不变（已结束线程的分片只合并一次）
+    assert metrics.render() == text
+
+
+def test_http_endpoint():
+    """本机 /metrics 接口返回 Prometheus 文本格式"""
+    metrics = Metrics()
+    metrics.inc('crawler_fetch_errors_total', reason='network')
+    host, port = metrics.start_http_server('127.0.0.1', 0)
+    try:
+        with urllib.request.urlopen(f'http://{host}:{port}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            body = response.read().decode('utf-8')
+        assert 'crawler_fetch_errors_total{reason="network"} 1' in body
+    finally:
+        metrics.stop()
@@ -0,0 +1,68 @@
+# tests/test_page_archive.py
+import pytest
+import requests
+
+from ..crawler.core.data_parser import DataParser
+from ..crawler.core.page_archive import PageArchive, reparse_archive
+
+
+def _response(html: str, encoding: str = 'utf-8') -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = f'text/html; charset={encoding}'
+    response.encoding = encoding
+    response._content = html.encode(encoding)
+    return response
+
+
+def _page(i: int) -> str:
+    return (f"<html><head><title>商品 {i}</title></head><body><div class='nav'>首页 分类 购物车</div>"
+            f"<h1>商品 {i}</h1><p>价格 {i * 7 % 100} 元，库存 {i * 13 % 50} 件。</p>"
+            f"<a href='/item/{i + 1}'>下一个</a></body></html>")
+
+
+class _ListStorage:
+    def __init__(self):
+        self.records = []
+
+    def save(self, data):
+        self.records.append(data)
+
+    def flush(self):
+        pass
+
+
+def test_archive_round_trip_and_reparse(tmp_path):
+    """归档页面可按批读回，编码保持不变，并能离线重新解析"""
+    pytest.importorskip('zstandard')
+    archive = PageArchive(str(tmp_path), segment_bytes=2000)
+    archive.save_page("https://shop.com/item/1", _response(_page(1), 'gbk'))
+    for i in range(2, 30):
+        archive.save_page(f"https://shop.com/item/{i}", _response(_page(i)))
+    archive.close()
+
+    reader = PageArchive(str(tmp_path))
+    batches = list(reader.iter_batches(batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 9]
+    first = batches[0][0]
+    assert first['url'] == "https://shop.com/item/1" and first['encoding'] == 'gbk'
+    assert '商品 1' in first['html']
+    assert len(reader._segments()) > 1
+
+    storage = _ListStorage()
+    assert reparse_archive(reader, DataParser(), storage) == 29
+    assert storage.records[0]['url'] == "https://shop.com/item/1"
+
+
+def test_trained_dictionary(tmp_path):
+    """训练字典后页面用字典压缩，新实例读取时自动加载字典"""
+    pytest.importorskip('zstandard')
+    archive = PageArchive(str(tmp_path), train_samples=200, dict_size=4096)
+    for i in range(300):
+        archive.save_page(f"https://shop.com/item/{i}", _response(_page(i)))
+    archive.close()
+
+    assert (tmp_path / 'pages.dict').exists()
+    pages = list(PageArchive(str(tmp_path)).iter_pages())
+    assert len(pages) == 300
+    assert pages[250]['html'] == _page(250)
@@ -0,0 +1,156 @@
+# tests/test_proxy_pool.py
+import threading
+import time
+from collections import Counter
+
+from ..crawler.config.settings import PROXY_CONFIG
+from ..utils.proxy_pool import ProxyPool
+
+
+def test_add_remove_and_url():
+    """按地址去重，移除后空位可复用，返回可直接使用的代理 URL"""
+    pool = ProxyPool(max_proxies=2)
+    pool.add_proxies(["1.1.1.1:80", "1.1.1.1:80", "2.2.2.2:80", "3.3.3.3:80"])
+    assert sorted(p.address for p in pool.proxies) == ["1.1.1.1:80", "2.2.2.2:80"]
+
+    proxy = pool.get_proxy()
+    assert proxy.url == f"http://{proxy.address}"
+    pool.release_proxy(proxy)
+
+    pool.remove_proxy(pool.proxies[0])
+    pool.add_proxies(["3.3.3.3:80"])
+    assert len(pool.proxies) == 2
+
+
+def test_weighted_selection_spreads_load():
+    """按分数与响应时间加权：快代理被选得多，但慢代理也会被选到，零分代理不会被选"""
+    pool = ProxyPool(max_proxies=10, max_in_flight=1000)
+    pool.add_proxies(["fast:1", "slow:1", "dead:1"])
+    proxies = {p.address: p for p in pool.proxies}
+    proxies["fast:1"].response_time = 0.1
+    proxies["slow:1"].response_time = 1.0
+    proxies["dead:1"].score = 20
+    for proxy in proxies.values():
+        pool.update_proxy_score(proxy, proxy.address != "dead:1")
+
+    counts = Counter()
+    for _ in range(2000):
+        proxy = pool.get_proxy()
+        counts[proxy.address] += 1
+        pool.release_proxy(proxy)
+    assert counts["dead:1"] == 0
+    assert counts["fast:1"] > counts["slow:1"] * 5
+    assert counts["slow:1"] > 0
+
+
+def test_in_flight_cap_thread_safe():
+    """每个代理的并发数不超过上限，名额用尽时返回 None"""
+    pool = ProxyPool(max_proxies=10, max_in_flight=2)
+    pool.add_proxies(["a:1", "b:1"])
+    acquired = []
+    lock = threading.Lock()
+
+    def take():
+        proxy = pool.get_proxy()
+        with lock:
+            acquired.append(proxy)
+
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    taken = [p for p in acquired if p]
+    assert len(taken) == 4
+    assert all(p.in_flight == 2 for p in pool.proxies)
+
+    pool.release_proxy(taken[0])
+    assert pool.get_proxy() is taken[0]
+
+
+def test_ewma_and_circuit_breaker():
+    """响应时间按 EWMA 平滑；连续失败熔断，冷却后半开只放行一个探测请求"""
+    now = [0.0]
+    pool = ProxyPool(max_proxies=10, ewma_alpha=0.5, failure_threshold=2, cooldown=10, clock=lambda: now[0])
+    pool.add_proxies(["a:1"])
+    proxy = pool.proxies[0]
+
+    pool.report(proxy, True, 1.0)
+    pool.report(proxy, True, 3.0)
+    assert proxy.response_time == 2.0
+
+    pool.report(proxy, False)
+    pool.report(proxy, False)
+    assert proxy.state == 'open'
+    assert pool.get_proxy() is None
+
+    now[0] = 11
+    probe = pool.get_proxy()
+    assert probe is proxy and proxy.state == 'half_open'
+    assert pool.get_proxy() is None
+    pool.report(probe, False)
+    pool.release_proxy(probe)
+    assert proxy.state == 'open' and pool.get_proxy() is None
+
+    now[0] = 22
+    probe = pool.get_proxy()
+    pool.report(probe, True, 2.0)
+    pool.release_proxy(probe)
+    assert proxy.state == 'closed' and proxy.failures == 0
+
+
+def test_tripped_proxy_probed_with_default_settings():
+    """默认阈值下熔断时分数已降为 0，冷却结束后仍会被选中探测，探测成功后恢复使用"""
+    now = [0.0]
+    pool = ProxyPool(max_proxies=10, clock=lambda: now[0])
+    pool.add_proxies(["a:1"])
+    proxy = pool.proxies[0]
+
+    for _ in range(PROXY_CONFIG['failure_threshold']):
+        pool.report(proxy, False)
+    assert proxy.state == 'open' and proxy.score == 0
+    assert pool.get_proxy() is None
+
+    now[0] = PROXY_CONFIG['cooldown'] + 1
+    probe = pool.get_proxy()
+    assert probe is proxy and proxy.state == 'half_open'
+    assert pool.get_proxy() is None
+    pool.report(probe, True, 0.5)
+    pool.release_proxy(probe)
+    assert proxy.state == 'closed' and proxy.score > 0
+    assert pool.get_proxy() is proxy
+
+
+def test_background_health_checks():
+    """后台健康检查使用配置的地址，并把结果反馈给熔断器"""
+    class _StubClient:
+        def __init__(self):
+            self.urls = []
+
+        def get(self, url, **kwargs):
+            self.urls.append(url)
+            raise ConnectionError("refused")
+
+    client = _StubClient()
+    pool = ProxyPool(max_proxies=10, http_client=client, health_check_url="http://127.0.0.1:9/health",
+                     failure_threshold=1, cooldown=60)
+    pool.add_proxies(["a:1"])
+    pool.start_health_checks(interval=0.01)
+    deadline = time.monotonic() + 2
+    while pool.proxies[0].state != 'open' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pool.stop_health_checks()
+    assert pool.proxies[0].state == 'open'
+    assert client.urls[0] == "http://127.0.0.1:9/health"
+
+
+def test_health_checks_skipped_without_url(monkeypatch):
+    """未配置健康检查地址时不启动后台检查，代理不会被误判熔断"""
+    monkeypatch.setitem(PROXY_CONFIG, 'health_check_url', None)
+    pool = ProxyPool(max_proxies=10)
+    pool.add_proxies(["a:1"])
+    pool.start_health_checks(interval=0.01)
+    assert pool._health_thread is None
+    pool.periodic_proxy_check()
+    assert pool.proxies[0].state == 'closed' and pool.proxies[0].score > 0
+    pool.stop_health_checks()
@@ -0,0 +1,73 @@
+# tests/test_robots_checker.py
+import threading
+import time
+
+import pytest
+import requests
+
+from ..utils.robots_checker import RobotsChecker
+
+
+class _StubResponse:
+    def __init__(self, status_code: int, text: str = ''):
+        self.status_code = status_code
+        self.text = text
+
+
+class _StubClient:
+    """按预设响应返回并统计请求次数，可选地模拟慢速请求"""
+    def __init__(self, response=None, delay: float = 0):
+        self.response = response
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.response is None:
+            raise requests.ConnectionError("connection refused")
+        return self.response
+
+
+def test_rules_and_crawl_delay_share_lookup():
+    """规则与爬行延迟来自同一次获取"""
+    client = _StubClient(_StubResponse(200, "User-agent: *\nDisallow: /private\nCrawl-delay: 3\n"))
+    checker = RobotsChecker(http_client=client)
+    assert checker.can_fetch("https://a.com/public")
+    assert not checker.can_fetch("https://a.com/private/x")
+    assert checker.get_crawl_delay("https://a.com/") == 3
+    assert client.calls == 1
+
+
+def test_negative_cache_and_single_flight():
+    """获取失败被缓存；并发查询只发出一次请求"""
+    client = _StubClient(None, delay=0.1)
+    checker = RobotsChecker(http_client=client, negative_ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(checker.can_fetch("https://b.com/x"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 8
+    assert checker.can_fetch("https://b.com/y")
+    assert client.calls == 1
+    assert checker.robots_cache["https://b.com"]['status'] == 'error'
+
+
+def test_lru_limit_and_shared_tier():
+    """本地缓存有上限；共享缓存命中时其他 worker 不再请求"""
+    fakeredis = pytest.importorskip('fakeredis')
+    redis_client = fakeredis.FakeRedis()
+    first = RobotsChecker(http_client=_StubClient(_StubResponse(200, "User-agent: *\nDisallow: /\n")),
+                          redis_client=redis_client, max_entries=2)
+    for host in ('c', 'd', 'e'):
+        assert not first.can_fetch(f"https://{host}.com/")
+    assert list(first.robots_cache) == ["https://d.com", "https://e.com"]
+
+    other_client = _StubClient(_StubResponse(200, ""))
+    second = RobotsChecker(http_client=other_client, redis_client=redis_client)
+    assert not second.can_fetch("https://c.com/page")
+    assert other_client.calls == 0
@@ -0,0 +1,69 @@
+# tests/test_scheduler.py  
+import time  
+
+from ..crawler.core.data_crawler import DataCrawler  
+from ..crawler.core.scheduler import PolitenessScheduler  
+from ..crawler.core.sqlite_frontier import SQLiteFrontier  
+from ..utils.metrics import Metrics  
+
+
+class FakeClock:  
+    def __init__(self):  
+        self.now = 0.0  
+
+    def __call__(self):  
+        return self.now  
+
+
+def test_politeness_scheduler():  
+    """同一主机受抓取间隔限制，其他主机不受影响"""  
+    clock = FakeClock()  
+    scheduler = PolitenessScheduler(default_delay=2.0, clock=clock)  
+    for url in ["http://a.com/1", "http://a.com/2", "http://b.com/1"]:  
+        scheduler.add(url)  
+    assert len(scheduler) == 3  
+
+    first, _ = scheduler.pop_ready()  
+    second, _ = scheduler.pop_ready()  
+    assert {first, second} == {"http://a.com/1", "http://b.com/1"}  
+
+    # a.com 仍被占用，b.com 没有待爬 URL  
+    assert scheduler.pop_ready() == (None, -1)  
+
+    scheduler.release("http://a.com/1")  
+    url, wait = scheduler.pop_ready()  
+    assert url is None and wait == 2.0  
+
+    clock.now = 2.0  
+    assert scheduler.pop_ready() == ("http://a.com/2", 0)  
+    assert len(scheduler) == 0  
+
+
+def test_next_url_returns_none_when_empty():  
+    """没有待爬 URL 时立即返回"""  
+    scheduler = PolitenessScheduler()  
+    assert scheduler.next_url() is None  
+    scheduler.add("http://a.com/")  
+    assert scheduler.next_url() == "http://a.com/"  
+    scheduler.release("http://a.com/", delay=0)  
+    assert scheduler.next_url(timeout=0.1) is None  
+
+
+def test_prefetched_urls_keep_their_leases(tmp_path):  
+    """在调度器中等待的 URL 定期续租，不会因租约过期被重新入队"""  
+    frontier = SQLiteFrontier(path=str(tmp_path / 'frontier.db'), lease_timeout=0.3)  
+    frontier.add_urls([f"http://a.com/{i}" for i in range(5)])  
+    crawler = DataCrawler(  
+        url_manager=frontier, proxy_pool=None, robots_checker=None, storage=None,  
+        prefetch=5, metrics=Metrics()  
+    )  
+    crawler._fill_scheduler()  
+    assert len(crawler.scheduler) == 5  
+    for _ in range(4):  
+        time.sleep(0.15)  
+        # 调度器已满，不再领取新 URL，但到期时仍会续租  
+        assert crawler._leases_due()  
+        crawler._fill_scheduler()  
+    assert frontier.requeue_expired() == 0  
+    assert frontier.inflight_size() == 5  
+    frontier.close()  
@@ -0,0 +1,166 @@
+# tests/test_sharding.py
+import pytest
+
+from ..crawler.core.sharding import HashRing, ShardedURLManager
+
+
+def test_hash_ring_bounded_movement():
+    """增加一个节点时只有约 1/N 的分区改变归属，且都迁往新节点"""
+    ring = HashRing(['r1', 'r2', 'r3'])
+    before = {p: ring.get_node(f'partition:{p}') for p in range(1024)}
+    ring.add_node('r4')
+    moved = [p for p in range(1024) if ring.get_node(f'partition:{p}') != before[p]]
+    assert 0 < len(moved) < 1024 * 0.4
+    assert all(ring.get_node(f'partition:{p}') == 'r4' for p in moved)
+
+
+def test_sharded_claims_and_rebalance():
+    """worker 只领取自己认领分区的主机；扩容与缩容后迁移分区，队列与去重状态不丢失"""
+    fakeredis = pytest.importorskip('fakeredis')
+    clients = {name: fakeredis.FakeRedis(server=fakeredis.FakeServer()) for name in ('r1', 'r2')}
+    urls = [f"https://host{i}.com/page" for i in range(40)]
+
+    worker_a = ShardedURLManager(redis_clients=clients, partitions=8, worker_id='a')
+    worker_b = ShardedURLManager(redis_clients=clients, partitions=8, worker_id='b')
+    assert worker_a.add_seed_urls(urls)['new'] == 40
+    assert all(client.dbsize() > 0 for client in clients.values())
+
+    # a 先认领全部分区；b 加入后 a 续期时让出多余份额，b 下次续期时接手
+    assert len(worker_a.refresh_claims()) == 8
+    assert worker_b.refresh_claims() == []
+    claims_a = set(worker_a.refresh_claims())
+    claims_b = set(worker_b.refresh_claims())
+    assert len(claims_a) == 4 and claims_a | claims_b == set(range(8)) and not claims_a & claims_b
+
+    leased = worker_a.get_urls(100)
+    assert leased and all(worker_a.partition_of(url) in claims_a for url, _ in leased)
+    worker_a.mark_urls_visited([url for url, _ in leased])
+    remaining = worker_a.frontier_size()
+    assert remaining == 40 - len(leased)
+
+    clients['r3'] = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    grown = ShardedURLManager(redis_clients=clients, partitions=8, worker_id='c')
+    moved = grown.rebalance(['r1', 'r2'])
+    assert 0 < moved['partitions'] < 8
+    assert grown.frontier_size() == remaining
+    assert grown.add_urls(urls) == {'new': 0, 'duplicate': 40, 'too_deep': 0, 'invalid': 0}
+
+    # 缩容：r3 仍保留连接以读出数据，迁移完成后不再持有任何分区
+    shrunk = ShardedURLManager(redis_clients=clients, partitions=8, worker_id='d', ring_shards=['r1', 'r2', 'r3'])
+    moved = shrunk.rebalance(['r1', 'r2', 'r3'], target_shards=['r1', 'r2'])
+    assert moved['partitions'] > 0
+    assert shrunk.ring.nodes == ['r1', 'r2']
+    assert not clients['r3'].keys('part:*')
+    assert shrunk.frontier_size() == remaining
+    assert shrunk.add_urls(urls) == {'new': 0, 'duplicate': 40, 'too_deep': 0, 'invalid': 0}
+
+    # 之后的 worker 只需要剩余实例的连接
+    del clients['r3']
+    survivor = ShardedURLManager(redis_clients=clients, partitions=8, worker_id='e')
+    assert survivor.frontier_size() == remaining
+    with pytest.raises(ValueError):
+        survivor.rebalance(['r1', 'r2', 'r3'])
+
+
+def test_sharded_snapshot_to_different_cluster(tmp_path):
+    """分片快照可以恢复到实例数不同、分区数相同的集群"""
+    fakeredis = pytest.importorskip('fakeredis')
+    source_clients = {name: fakeredis.FakeRedis(server=fakeredis.FakeServer()) for name in ('r1', 'r2')}
+    source = ShardedURLManager(redis_clients=source_clients, partitions=8, worker_id='a')
+    source.add_seed_urls([f"https://host{i}.com/page" for i in range(40)])
+    source.refresh_claims()
+    assert len(source.get_urls(5)) == 5
+
+    path = str(tmp_path / 'sharded.jsonl.gz')
+    assert source.export_snapshot(path) == {'depth': 40, 'frontier': 35, 'inflight': 5, 'seen': 40}
+
+    target = ShardedURLManager(redis_clients={'r3': fakeredis.FakeRedis(server=fakeredis.FakeServer())}, partitions=8)
+    target.import_snapshot(path)
+    assert target.frontier_size() == 40
+    assert target.add_urls(["https://host3.com/page"])['duplicate'] == 1
+
+
+def test_sharded_routes_by_canonical_host():
+    """同一主机的大小写与默认端口写法路由到同一分区，只入队、只领取一次"""
+    fakeredis = pytest.importorskip('fakeredis')
+    clients = {'r1': fakeredis.FakeRedis(server=fakeredis.FakeServer())}
+    manager = ShardedURLManager(redis_clients=clients, partitions=64, worker_id='a')
+    variants = ["http://Example.com:80/a", "http://example.com/a", "HTTP://EXAMPLE.COM/a#top"]
+    assert len({manager.partition_of(url) for url in variants}) == 1
+    assert manager.add_urls(variants[:1])['new'] == 1
+    assert manager.add_urls(variants[1:]) == {'new': 0, 'duplicate': 2, 'too_deep': 0, 'invalid': 0}
+    assert manager.add_urls(["https://Example.com:443/b", "https://example.com/b"])['new'] == 1
+
+    manager.refresh_claims()
+    leased = manager.get_urls(10)
+    assert sorted(url for url, _ in leased) == ["http://example.com/a", "https://example.com/b"]
+    # 每个 URL 只有一个租约，确认后没有遗留
+    manager.mark_urls_visited([url for url, _ in leased])
+    assert manager.inflight_size() == 0
+
+
+def test_late_worker_waits_for_partitions():
+    """后加入的 worker 暂时没有分区时不会退出，等先加入的 worker 让出分区后接手，整个队列为空才结束"""
+    fakeredis = pytest.importorskip('fakeredis')
+    import threading
+    import requests
+    from ..crawler.core.data_crawler import DataCrawler
+    from ..utils.metrics import Metrics
+
+    class _Robots:
+        def can_fetch(self, url):
+            return True
+
+        def get_crawl_delay(self, url):
+            return 0
+
+    class _Proxies:
+        def get_proxy(self):
+            return None
+
+    class _Client:
+        def fetch(self, url, **kwargs):
+            response = requests.Response()
+            response.url = url
+            response.status_code = 200
+            response.encoding = 'utf-8'
+            response._content = b"<html><head><title>t</title></head><body>page</body></html>"
+            return response
+
+    class _Storage:
+        def __init__(self):
+            self.urls = []
+
+        def save(self, data):
+            self.urls.append(data['url'])
+
+        def save_page(self, url, response):
+            pass
+
+    clients = {'r1': fakeredis.FakeRedis(server=fakeredis.FakeServer())}
+    urls = [f"https://host{i}.com/page{j}" for i in range(16) for j in range(8)]
+    managers = {
+        name: ShardedURLManager(redis_clients=clients, partitions=8, claim_ttl=1.5, worker_id=name)
+        for name in ('a', 'b')
+    }
+    managers['a'].add_seed_urls(urls)
+    assert len(managers['a'].refresh_claims()) == 8
+
+    storages = {name: _Storage() for name in managers}
+    crawlers = {
+        name: DataCrawler(
+            url_manager=manager, proxy_pool=_Proxies(), robots_checker=_Robots(), storage=storages[name],
+            crawl_interval=0.2, prefetch=16, http_client=_Client(), metrics=Metrics(), idle_interval=0.05
+        )
+        for name, manager in managers.items()
+    }
+    threads = [threading.Thread(target=crawler.crawl, daemon=True) for crawler in crawlers.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+
+    assert sorted(storages['a'].urls + storages['b'].urls) == sorted(urls)
+    assert storages['b'].urls
+    assert managers['a'].is_exhausted()
@@ -0,0 +1,141 @@
+# tests/test_sqlite_frontier.py
+import time
+
+import pytest
+
+from ..crawler.core.frontier import Frontier, create_frontier
+from ..crawler.core.sqlite_frontier import SQLiteFrontier
+
+
+def _frontier(tmp_path, **kwargs) -> SQLiteFrontier:
+    kwargs.setdefault('max_depth', 3)
+    kwargs.setdefault('max_retry', 1)
+    return SQLiteFrontier(path=str(tmp_path / 'frontier.db'), **kwargs)
+
+
+def test_add_and_get_in_priority_order(tmp_path):
+    """按分数出队，同分按入队顺序；返回值与 URLManager 一致"""
+    frontier = _frontier(tmp_path)
+    assert isinstance(frontier, Frontier)
+    assert frontier.add_urls(["https://a.com/2", "https://a.com/3"], depth=2) == {'new': 2, 'duplicate': 0, 'too_deep': 0, 'invalid': 0}
+    frontier.add_urls(["https://a.com/1"], depth=1)
+    frontier.add_urls(["https://a.com/top"], depth=1, priority=-1)
+    result = frontier.add_urls(["https://a.com/1#x", "mailto:a@b.com", "https://a.com/new"], depth=1)
+    assert result == {'new': 1, 'duplicate': 1, 'too_deep': 0, 'invalid': 1}
+    assert frontier.add_urls(["https://a.com/deep"], depth=4)['too_deep'] == 1
+
+    assert frontier.frontier_size() == 5
+    assert frontier.get_urls(10) == [
+        ("https://a.com/top", 1), ("https://a.com/1", 1), ("https://a.com/new", 1),
+        ("https://a.com/2", 2), ("https://a.com/3", 2)
+    ]
+    assert frontier.frontier_size() == 0
+    assert frontier.inflight_size() == 5
+    frontier.mark_urls_visited(["https://a.com/top", "https://a.com/1"])
+    assert frontier.inflight_size() == 3
+    # 已爬过的 URL 不会再次入队
+    assert frontier.add_urls(["https://a.com/top"])['duplicate'] == 1
+    frontier.close()
+
+
+def test_spill_beyond_head(tmp_path):
+    """待爬数量远超 head_size 时内存队首有界，出队顺序仍然正确"""
+    frontier = _frontier(tmp_path, head_size=10)
+    for start in range(0, 300, 30):
+        frontier.add_urls([f"https://a.com/d2/{i}" for i in range(start, start + 30)], depth=2)
+    # 后加入的更小分数的 URL 必须先出队
+    frontier.add_urls([f"https://a.com/d1/{i}" for i in range(25)], depth=1)
+    assert len(frontier._head) <= 2 * frontier.head_size
+
+    order = []
+    while True:
+        leased = frontier.get_urls(7)
+        if not leased:
+            break
+        assert len(frontier._head) <= 2 * frontier.head_size
+        order.extend(leased)
+        # 出队过程中继续加入新的 URL
+        if len(order) == 14:
+            frontier.add_urls(["https://a.com/d0/late"], depth=0)
+    urls = [url for url, _ in order]
+    assert len(urls) == len(set(urls)) == 326
+    assert urls[14] == "https://a.com/d0/late"
+    depths = [depth for _, depth in order[:14] + order[15:]]
+    assert depths == sorted(depths)
+    assert urls[-1] == "https://a.com/d2/299"
+    frontier.close()
+
+
+def test_retry_and_fail(tmp_path):
+    """失败的 URL 按“深度 + 重试次数”重新入队，超过上限后进入失败集合"""
+    frontier = _frontier(tmp_path)
+    frontier.add_urls(["https://a.com/x", "https://a.com/y"], depth=1)
+    frontier.add_urls(["https://a.com/z"], depth=2)
+    assert frontier.get_url() == "https://a.com/x"
+    assert frontier.mark_urls_failed(["https://a.com/x"]) == 1
+    # x 的分数变为 2，排在 y 之后、z 之后（同分按入队顺序）
+    assert frontier.get_urls(3) == [("https://a.com/y", 1), ("https://a.com/z", 2), ("https://a.com/x", 1)]
+    assert frontier.mark_urls_failed(["https://a.com/x"]) == 0
+    frontier.mark_url_failed("https://a.com/y", retry=False)
+    assert sorted(frontier.get_failed_urls()) == ["https://a.com/x", "https://a.com/y"]
+    assert frontier.inflight_size() == 1
+    frontier.close()
+
+
+def test_expired_leases_requeued(tmp_path):
+    """租约过期后在下一次出队时被回收，续租的 URL 不受影响"""
+    frontier = _frontier(tmp_path, lease_timeout=0.05)
+    frontier.add_urls(["https://a.com/1", "https://a.com/2"])
+    frontier.get_urls(2)
+    frontier.extend_leases(["https://a.com/2"], timeout=60)
+    time.sleep(0.1)
+    assert frontier.get_urls(5) == [("https://a.com/1", 0)]
+    assert frontier.inflight_size() == 2
+    frontier.close()
+
+
+def test_restart_recovers_state(tmp_path):
+    """关闭后重新打开：待爬、已见与失败状态保留，未确认的租约重新入队"""
+    frontier = _frontier(tmp_path, head_size=5)
+    frontier.add_urls([f"https://a.com/{i}" for i in range(20)], depth=1)
+    leased = [url for url, _ in frontier.get_urls(3)]
+    frontier.mark_url_visited(leased[0])
+    frontier.mark_url_failed(leased[1], retry=False)
+    frontier.close()
+
+    reopened = _frontier(tmp_path, head_size=5)
+    assert reopened.frontier_size() == 18
+    assert reopened.inflight_size() == 0
+    assert list(reopened.get_failed_urls()) == [leased[1]]
+    assert reopened.add_urls(leased)['duplicate'] == 3
+    urls = [url for url, _ in reopened.get_urls(100)]
+    assert sorted(urls) == sorted({f"https://a.com/{i}" for i in range(20)} - set(leased[:2]))
+    assert sum(1 for _ in reopened.get_visited_urls(batch_size=7)) == 20
+    reopened.close()
+
+
+def test_create_frontier(tmp_path):
+    """create_frontier 按名称创建实现，未知名称抛出 ValueError"""
+    frontier = create_frontier('sqlite', path=str(tmp_path / 'f.db'))
+    assert isinstance(frontier, SQLiteFrontier)
+    frontier.close()
+    with pytest.raises(ValueError):
+        create_frontier('memcached')
+
+
+def test_fail_without_lease_does_not_requeue_twice(tmp_path):
+    """重复确认失败、或租约已被回收后再确认失败，都不会让同一 URL 重复入队"""
+    frontier = _frontier(tmp_path, lease_timeout=0.05, max_retry=5)
+    frontier.add_urls(["https://a.com/x"], depth=1)
+    frontier.get_urls(1)
+    assert frontier.mark_urls_failed(["https://a.com/x", "https://a.com/x"]) == 1
+    assert frontier.mark_urls_failed(["https://a.com/x"]) == 0
+    assert frontier.frontier_size() == 1
+
+    frontier.get_urls(1)
+    time.sleep(0.1)
+    assert frontier.requeue_expired() == 1
+    assert frontier.mark_urls_failed(["https://a.com/x"]) == 0
+    assert frontier.get_urls(10) == [("https://a.com/x", 1)]
+    assert frontier.get_urls(10) == []
+    frontier.close()
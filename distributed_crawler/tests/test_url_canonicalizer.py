@@ -0,0 +1,34 @@
+# tests/test_url_canonicalizer.py
+from ..utils.url_canonicalizer import URLCanonicalizer
+
+
+def test_canonicalize():
+    """协议与主机小写、去掉默认端口与片段、解析点路径段、参数排序并去掉跟踪参数"""
+    canonicalizer = URLCanonicalizer(tracking_params=['utm_*', 'gclid'])
+    assert canonicalizer.canonicalize("HTTP://Host.COM:80/a/b/../c/./d#frag") == "http://host.com/a/c/d"
+    assert canonicalizer.canonicalize("https://host.com:443") == "https://host.com/"
+    assert canonicalizer.canonicalize("https://host.com:8443/x") == "https://host.com:8443/x"
+    assert canonicalizer.canonicalize("http://host.com/p?b=2&utm_source=x&a=1&gclid=9") == "http://host.com/p?a=1&b=2"
+    assert canonicalizer.canonicalize("http://host.com/中文 页") == "http://host.com/%E4%B8%AD%E6%96%87%20%E9%A1%B5"
+    assert canonicalizer.canonicalize("javascript:void(0)") is None
+    assert canonicalizer.canonicalize("ftp://host.com/file") is None
+
+
+def test_canonicalize_many_with_base():
+    """批量解析相对链接，结果去重并保持顺序"""
+    canonicalizer = URLCanonicalizer(tracking_params=[])
+    base = "http://host.com/dir/page.html?q=1"
+    links = ["next.html", "../up", "/root", "//cdn.com/x", "?q=2", "#top", "NEXT.html", "next.html#again", "mailto:a@b.c"]
+    assert canonicalizer.canonicalize_many(links, base) == [
+        "http://host.com/dir/next.html",
+        "http://host.com/up",
+        "http://host.com/root",
+        "http://cdn.com/x",
+        "http://host.com/dir/page.html?q=2",
+        "http://host.com/dir/page.html?q=1",
+        "http://host.com/dir/NEXT.html",
+    ]
+    # 规范化结果被缓存，幂等
+    for url in canonicalizer.canonicalize_many(links, base):
+        assert canonicalizer.canonicalize(url) == url
+    assert canonicalizer.cache_info().hits > 0
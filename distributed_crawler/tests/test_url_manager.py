@@ -29,4 +29,135 @@ def test_seed_manager():
     seed_manager.add_seed("https://test1.com")  
     seed_manager.add_seed("https://test2.com")  
     seed_manager.clear_seeds()  
-    assert seed_manager.is_empty() == True
\ No newline at end of file
+    assert seed_manager.is_empty() == True
+
+def test_add_urls_batch():  
+    """批量入队：统计新增与重复数量"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis(), batch_size=2)  
+    result = url_manager.add_seed_urls(["https://a.com", "https://b.com", "https://a.com"])  
+    assert result == {'new': 2, 'duplicate': 1, 'too_deep': 0, 'invalid': 0}  
+
+    result = url_manager.add_urls(["https://a.com", "https://c.com", "https://d.com"])  
+    assert result == {'new': 2, 'duplicate': 1, 'too_deep': 0, 'invalid': 0}  
+
+
+def test_compact_seen_stores():  
+    """指纹与布隆过滤器已见集合：去重、统计与导出限制"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+    from ..crawler.core.seen_store import FingerprintSeenStore, BloomSeenStore  
+
+    redis_client = fakeredis.FakeRedis()  
+    urls = [f"https://example.com/{i}" for i in range(500)]  
+    for seen_store in (FingerprintSeenStore(redis_client), BloomSeenStore(redis_client, capacity=100, error_rate=0.01)):  
+        url_manager = URLManager(redis_client=redis_client, seen_store=seen_store)  
+        first = url_manager.add_urls(urls)  
+        assert first['new'] >= 490  
+        assert url_manager.add_urls(urls[:10]) == {'new': 0, 'duplicate': 10, 'too_deep': 0, 'invalid': 0}  
+
+        stats = url_manager.seen_stats()  
+        assert stats['memory_bytes'] > 0  
+        assert stats['error_rate'] < 0.01  
+        with pytest.raises(NotImplementedError):  
+            list(url_manager.get_visited_urls())  
+
+
+def test_depth_priority_frontier():  
+    """按深度广度优先出队，超过最大深度的链接不入队"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis(), max_depth=2)  
+    url_manager.add_urls(["https://a.com/deep"], depth=2)  
+    url_manager.add_seed_urls(["https://a.com/"])  
+    url_manager.add_urls(["https://a.com/child"], depth=1)  
+    assert url_manager.add_urls(["https://a.com/too-deep"], depth=3) == {'new': 0, 'duplicate': 0, 'too_deep': 1, 'invalid': 0}  
+    assert url_manager.frontier_size() == 3  
+
+    assert url_manager.get_urls(2) == [("https://a.com/", 0), ("https://a.com/child", 1)]  
+    assert url_manager.get_url() == "https://a.com/deep"  
+    assert url_manager.get_urls(5) == []  
+
+
+def test_lease_ack_and_retry():  
+    """租约：确认后移除，失败按重试次数重新入队，过期租约被回收"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis(), lease_timeout=60, max_retry=1)  
+    url_manager.add_seed_urls(["https://a.com/", "https://b.com/", "https://c.com/"])  
+    leased = url_manager.get_urls(3)  
+    assert len(leased) == 3  
+    assert url_manager.frontier_size() == 0  
+    assert url_manager.inflight_size() == 3  
+
+    url_manager.mark_url_visited("https://a.com/")  
+    assert url_manager.mark_urls_failed(["https://b.com/"]) == 1  
+    url_manager.mark_url_failed("https://c.com/", retry=False)  
+    assert url_manager.inflight_size() == 0  
+    assert list(url_manager.get_failed_urls()) == ["https://c.com/"]  
+
+    # 第二次失败超过 max_retry，进入失败集合  
+    assert url_manager.get_urls(5) == [("https://b.com/", 0)]  
+    assert url_manager.mark_urls_failed(["https://b.com/"]) == 0  
+    assert sorted(url_manager.get_failed_urls()) == ["https://b.com/", "https://c.com/"]  
+
+    # worker 崩溃：租约过期后重新入队，深度保留  
+    url_manager.add_urls(["https://d.com/"], depth=2)  
+    assert url_manager.get_urls(1) == [("https://d.com/", 2)]  
+    url_manager.redis_client.zadd(url_manager.inflight_key, {"https://d.com/": 0})  
+    assert url_manager.requeue_expired() == 1  
+    assert url_manager.inflight_size() == 0  
+    assert url_manager.get_urls(1) == [("https://d.com/", 2)]  
+
+
+def test_add_urls_canonicalizes():  
+    """入队前规范化：同一资源的不同写法只入队一次，非 http(s) 链接计为无效"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+
+    url_manager = URLManager(redis_client=fakeredis.FakeRedis())  
+    result = url_manager.add_urls([  
+        "HTTP://Example.com:80/a/./b/../c#top",  
+        "http://example.com/a/c?utm_source=feed",  
+        "mailto:someone@example.com",  
+    ])  
+    assert result == {'new': 1, 'duplicate': 1, 'too_deep': 0, 'invalid': 1}  
+    assert url_manager.get_urls(5) == [("http://example.com/a/c", 0)]  
+
+
+def test_fail_without_lease_does_not_requeue_twice():  
+    """租约被回收并由其他 worker 重新领取后，迟到的确认不影响新租约；未领取的 URL 不会被确认入队"""  
+    fakeredis = pytest.importorskip('fakeredis')  
+    from ..crawler.core.url_manager import URLManager  
+
+    redis_client = fakeredis.FakeRedis()  
+    worker_a = URLManager(redis_client=redis_client, lease_timeout=60, max_retry=5)  
+    worker_b = URLManager(redis_client=redis_client, lease_timeout=60, max_retry=5)  
+    worker_a.add_seed_urls(["https://a.com/x"])  
+    assert worker_a.get_urls(1) == [("https://a.com/x", 0)]  
+
+    # a 的租约过期被回收，b 重新领取  
+    redis_client.zadd(worker_a.inflight_key, {"https://a.com/x": 0})  
+    assert worker_b.requeue_expired() == 1  
+    assert worker_b.get_urls(1) == [("https://a.com/x", 0)]  
+
+    # a 迟到的确认既不释放 b 的租约，也不重新入队、不累计重试  
+    assert worker_a.mark_urls_failed(["https://a.com/x"]) == 0  
+    worker_a.mark_url_visited("https://a.com/x")  
+    assert worker_b.inflight_size() == 1  
+    assert worker_b.frontier_size() == 0  
+    assert int(redis_client.hget(worker_b.retry_key, "https://a.com/x")) == 1  
+
+    # 从未领取的 URL  
+    worker_a.add_seed_urls(["https://a.com/y"])  
+    assert worker_a.mark_urls_failed(["https://a.com/never", "https://a.com/y"]) == 0  
+    assert worker_a.frontier_size() == 1  
+
+    # b 的确认正常生效  
+    assert worker_b.mark_urls_failed(["https://a.com/x"]) == 1  
+    assert worker_b.frontier_size() == 2  
+    assert worker_b.inflight_size() == 0  
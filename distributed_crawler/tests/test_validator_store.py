@@ -0,0 +1,89 @@
+# tests/test_validator_store.py
+import pytest
+import requests
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from ..crawler.core.data_crawler import DataCrawler
+from ..crawler.core.url_manager import URLManager
+from ..crawler.core.validator_store import ValidatorStore
+from ..utils.metrics import Metrics
+
+
+class _NoProxyPool:
+    def get_proxy(self):
+        return None
+
+
+class _AllowAllRobots:
+    def can_fetch(self, url):
+        return True
+
+    def get_crawl_delay(self, url):
+        return 0
+
+
+class _StaticHttpClient:
+    """
+    总是返回同一页面；带条件请求头时返回 304
+    """
+    def fetch(self, url, headers=None, **kwargs):
+        response = requests.Response()
+        response.url = url
+        if headers and 'If-None-Match' in headers:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = '"v1"'
+            response.headers['Content-Type'] = 'text/html; charset=utf-8'
+            response.encoding = 'utf-8'
+            response._content = b"<html><head><title>t</title></head><body>hello</body></html>"
+        return response
+
+
+class _FlakyStorage:
+    """
+    第一次 save 抛出异常
+    """
+    def __init__(self):
+        self.records = []
+        self.calls = 0
+
+    def save(self, data):
+        self.calls += 1
+        if self.calls == 1:
+            raise IOError("磁盘已满")
+        self.records.append(data)
+
+    def save_page(self, url, response):
+        pass
+
+
+def test_validators_recorded_only_after_store():
+    """保存失败时不记录校验信息，重试时重新下载并保存，而不是按未变化跳过"""
+    redis_client = fakeredis.FakeRedis()
+    url_manager = URLManager(redis_client=redis_client)
+    validator_store = ValidatorStore(redis_client)
+    storage = _FlakyStorage()
+    crawler = DataCrawler(
+        url_manager=url_manager,
+        proxy_pool=_NoProxyPool(),
+        robots_checker=_AllowAllRobots(),
+        storage=storage,
+        http_client=_StaticHttpClient(),
+        validator_store=validator_store,
+        metrics=Metrics()
+    )
+    url = "https://a.com/page"
+    url_manager.add_seed_urls([url])
+
+    crawler.handle_crawl(*url_manager.get_urls(1)[0])
+    assert validator_store.get(url) is None
+    assert not crawler._pending_validators
+
+    # 重试：没有条件请求头，页面被保存，随后记录校验信息
+    crawler.handle_crawl(*url_manager.get_urls(1)[0])
+    assert len(storage.records) == 1
+    assert validator_store.get(url)['etag'] == '"v1"'
+    assert url_manager.inflight_size() == 0
@@ -0,0 +1,328 @@
+# distributed_crawler/utils/http_client.py
+import codecs
+import http.cookiejar
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from distributed_crawler.crawler.config.settings import HTTP_CONFIG   # type: ignore
+
+
+# <meta charset="..."> 或 <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.\-]+)', re.IGNORECASE)
+# 只在页面开头查找 meta 声明
+_META_SCAN_BYTES = 4096
+# 既无声明也不是合法 UTF-8 时依次尝试的编码，最后退回 windows-1252（任意字节都可解码）
+_FALLBACK_ENCODINGS = ('gb18030',)
+
+
+class ContentRejected(requests.RequestException):
+    """
+    响应类型或大小不符合要求，响应体未读取或未读完
+    """
+
+
+def _codec_name(name: str) -> Optional[str]:
+    try:
+        return codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(content_type: Optional[str], body: bytes) -> str:
+    """
+    确定响应体编码：Content-Type 中的 charset → BOM → 页面开头的 <meta> 声明 → UTF-8 校验 → 备选编码
+
+    不做字符频率统计，对大页面也只是一次 C 层面的解码校验
+    """
+    if content_type:
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'charset':
+                codec = _codec_name(value)
+                if codec:
+                    return codec
+
+    if body.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    match = _META_CHARSET_RE.search(body[:_META_SCAN_BYTES])
+    if match:
+        codec = _codec_name(match.group(1).decode('ascii'))
+        if codec:
+            return codec
+
+    for encoding in ('utf-8',) + _FALLBACK_ENCODINGS:
+        try:
+            body.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'windows-1252'
+
+
+class _Counters:
+    """
+    线程安全的计数器
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+
+def _counting_pool(base, counters: _Counters):
+    """
+    生成新建连接时计数的连接池类
+    """
+    class CountingPool(base):
+        def _new_conn(self):
+            counters.incr('new_connections')
+            return super()._new_conn()
+
+    CountingPool.__name__ = f'Counting{base.__name__}'
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    统计请求数与新建连接数的适配器，直连与代理连接池都会被统计
+    """
+    def __init__(self, counters: _Counters, **kwargs):
+        self._counters = counters
+        self._pool_classes = {
+            'http': _counting_pool(HTTPConnectionPool, counters),
+            'https': _counting_pool(HTTPSConnectionPool, counters)
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+    def send(self, request, **kwargs):
+        self._counters.incr('requests')
+        return super().send(request, **kwargs)
+
+
+class _PooledSession:
+    """
+    一个代理（或直连）对应的会话及其使用状态
+    """
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.last_used = time.monotonic()
+        self.active = 0
+
+
+class HttpClient:
+    """
+    共享的 HTTP 客户端
+
+    按代理划分会话（直连为一个会话），每个会话内部由 urllib3 按主机维护连接池并复用 keep-alive 连接。
+    会话数量有上限，空闲超时的会话会被关闭；stats() 给出请求数与新建连接数，用于观察连接复用率。
+    """
+    def __init__(
+        self,
+        pool_connections: int = HTTP_CONFIG['pool_connections'],
+        pool_maxsize: int = HTTP_CONFIG['pool_maxsize'],
+        max_sessions: int = HTTP_CONFIG['max_sessions'],
+        idle_timeout: float = HTTP_CONFIG['idle_timeout']
+    ):
+        """
+        :param pool_connections: 每个会话缓存的主机连接池数量
+        :param pool_maxsize: 每个主机连接池保留的最大连接数
+        :param max_sessions: 同时保留的会话（代理）数量上限
+        :param idle_timeout: 会话空闲多少秒后关闭
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.logger = logging.getLogger(__name__)
+        self._sessions: 'OrderedDict[Optional[Tuple], _PooledSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+        self._last_eviction = time.monotonic()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        # 与原先的 requests.get 行为一致：不在请求之间保留 Cookie
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _CountingAdapter(
+            self._counters,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def _proxy_key(proxies: Optional[Dict[str, str]]) -> Optional[Tuple]:
+        return tuple(sorted(proxies.items())) if proxies else None
+
+    def _acquire(self, proxies: Optional[Dict[str, str]]) -> _PooledSession:
+        key = self._proxy_key(proxies)
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is None:
+                pooled = self._sessions[key] = _PooledSession(self._new_session())
+                self._counters.incr('sessions_created')
+            else:
+                self._sessions.move_to_end(key)
+            pooled.active += 1
+            pooled.last_used = time.monotonic()
+            self._evict_locked()
+        return pooled
+
+    def _release(self, pooled: _PooledSession):
+        with self._lock:
+            pooled.active -= 1
+            pooled.last_used = time.monotonic()
+
+    def _evict_locked(self, force: bool = False):
+        """
+        关闭空闲超时的会话，并在超过上限时按 LRU 淘汰空闲会话
+        """
+        now = time.monotonic()
+        if not force and len(self._sessions) <= self.max_sessions and now - self._last_eviction < self.idle_timeout:
+            return
+        self._last_eviction = now
+        for key, pooled in list(self._sessions.items()):
+            if pooled.active:
+                continue
+            if len(self._sessions) > self.max_sessions or now - pooled.last_used > self.idle_timeout:
+                del self._sessions[key]
+                pooled.session.close()
+                self._counters.incr('sessions_evicted')
+
+    def evict_idle(self):
+        """
+        立即关闭空闲超时的会话
+        """
+        with self._lock:
+            self._evict_locked(force=True)
+
+    def request(self, method: str, url: str, proxies: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """
+        发送请求，参数与 requests.request 相同
+        """
+        pooled = self._acquire(proxies)
+        try:
+            return pooled.session.request(method, url, proxies=proxies, **kwargs)
+        finally:
+            self._release(pooled)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def fetch(
+        self,
+        url: str,
+        max_bytes: Optional[int] = None,
+        allowed_types: Optional[Iterable[str]] = None,
+        chunk_size: int = 64 * 1024,
+        **kwargs
+    ) -> requests.Response:
+        """
+        流式 GET：先检查响应头，再分块读取不超过 max_bytes 的响应体
+
+        2xx 响应的 Content-Type 不在 allowed_types 中、或 Content-Length 超过 max_bytes 时不读取响应体，
+        读取过程中超过 max_bytes 时立即中止，两种情况都关闭连接并抛出 ContentRejected。
+        返回的响应体已完整读入，编码由 detect_encoding 确定，访问 response.text 不会再触发字符集探测。
+
+        :param url: URL
+        :param max_bytes: 响应体（解压后）的字节上限，None 表示不限制
+        :param allowed_types: 允许的 MIME 类型，None 表示不限制；缺少 Content-Type 的响应总是允许
+        :param chunk_size: 每次读取的字节数
+        :param kwargs: 其余参数与 requests.get 相同
+        """
+        response = self.get(url, stream=True, **kwargs)
+        try:
+            if 200 <= response.status_code < 300:
+                self._check_headers(response, max_bytes, allowed_types)
+            chunks = []
+            total = 0
+            for chunk in response.iter_content(chunk_size):
+                total += len(chunk)
+                if max_bytes is not None and total > max_bytes:
+                    raise ContentRejected(f"{url} 响应体超过 {max_bytes} 字节", response=response)
+                chunks.append(chunk)
+        except BaseException:
+            response.close()
+            raise
+
+        body = b''.join(chunks)
+        response._content = body
+        response._content_consumed = True
+        response.encoding = detect_encoding(response.headers.get('Content-Type'), body)
+        return response
+
+    @staticmethod
+    def _check_headers(response: requests.Response, max_bytes: Optional[int], allowed_types: Optional[Iterable[str]]):
+        content_type = response.headers.get('Content-Type')
+        if allowed_types is not None and content_type:
+            media_type = content_type.split(';', 1)[0].strip().lower()
+            if media_type not in allowed_types:
+                raise ContentRejected(f"{response.url} 的内容类型 {media_type} 不在允许范围内", response=response)
+        length = response.headers.get('Content-Length')
+        if max_bytes is not None and length and length.isdigit() and int(length) > max_bytes:
+            raise ContentRejected(f"{response.url} 的 Content-Length {length} 超过 {max_bytes} 字节", response=response)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        连接复用统计：requests 为发出的请求数，new_connections 为新建的 TCP 连接数
+        """
+        stats = self._counters.snapshot()
+        stats.setdefault('requests', 0)
+        stats.setdefault('new_connections', 0)
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        with self._lock:
+            stats['sessions'] = len(self._sessions)
+        return stats
+
+    def close(self):
+        """
+        关闭全部会话与连接
+        """
+        with self._lock:
+            for pooled in self._sessions.values():
+                pooled.session.close()
+            self._sessions.clear()
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    获取进程内共享的 HttpClient
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,339 @@
+# distributed_crawler/utils/metrics.py
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from distributed_crawler.crawler.config.settings import METRICS_CONFIG   # type: ignore
+
+# 阶段耗时的默认分桶上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 爬虫使用的指标说明，未列出的指标只输出 TYPE
+_HELP = {
+    'crawler_stage_seconds': '各阶段耗时（秒）：robots、proxy、politeness、fetch、parse、store、enqueue',
+    'crawler_stage_errors_total': '各阶段抛出异常的次数',
+    'crawler_http_responses_total': '按状态码统计的响应数',
+    'crawler_downloaded_bytes_total': '下载的响应体字节数（解压后）',
+    'crawler_fetch_errors_total': '未得到可用响应的下载次数，按原因统计',
+    'crawler_frontier_size': '待爬队列中的 URL 数',
+    'crawler_scheduler_pending': '调度器中尚未交出的 URL 数',
+}
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Shard:
+    """
+    单个线程的指标分片，只有所属线程写入，读取时汇总所有分片
+    """
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters: Dict[_Key, float] = {}
+        # 每个直方图为 [各桶计数..., +Inf 桶计数, 总和, 次数]
+        self.histograms: Dict[_Key, List[float]] = {}
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe('crawler_stage_seconds', time.perf_counter() - self.start, stage=self.stage)
+        if exc_type is not None:
+            self.metrics.inc('crawler_stage_errors_total', stage=self.stage)
+        return False
+
+
+class Metrics:
+    """
+    计数器、直方图与函数型仪表
+
+    每个线程写入自己的分片（threading.local），记录时不加锁，也不和其他线程争用；
+    导出时汇总所有分片，已结束线程的分片合并到一个保留分片中后释放。
+    汇总时读到的可能是其他线程正在更新的旧值，对监控来说可以接受。
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets: 直方图分桶上界（秒），升序
+        """
+        self.buckets = tuple(buckets)
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, _Shard]] = []
+        self._retired = _Shard()
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # 每个线程只在第一次记录时加锁登记
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        计数器加 value
+
+        :param name: 指标名
+        :param value: 增量
+        :param labels: 标签，同一指标各调用处的标签顺序应一致
+        """
+        counters = self._shard().counters
+        key = (name, tuple((k, str(v)) for k, v in labels.items()))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        直方图记录一次观测值
+        """
+        histograms = self._shard().histograms
+        key = (name, tuple((k, str(v)) for k, v in labels.items()))
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = [0] * (len(self.buckets) + 3)
+        hist[bisect_left(self.buckets, value)] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+    def time_stage(self, stage: str) -> _StageTimer:
+        """
+        记录一个阶段耗时的上下文管理器，阶段抛出异常时同时计入 crawler_stage_errors_total
+        """
+        return _StageTimer(self, stage)
+
+    def set_gauge_function(self, name: str, func: Callable[[], float]):
+        """
+        注册仪表，导出时调用 func 取当前值（如待爬队列长度）
+        """
+        with self._lock:
+            self._gauges[name] = func
+
+    def _collect(self) -> Tuple[Dict[_Key, float], Dict[_Key, List[float]]]:
+        """
+        汇总所有分片
+        """
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # 线程已结束，分片不会再被写入，合并后丢弃
+                    self._merge(self._retired, shard)
+            self._shards = alive
+            shards = [self._retired] + [shard for _, shard in alive]
+            total = _Shard()
+            for shard in shards:
+                self._merge(total, shard)
+        return total.counters, total.histograms
+
+    @staticmethod
+    def _merge(target: _Shard, source: _Shard):
+        for key, value in list(source.counters.items()):
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, hist in list(source.histograms.items()):
+            merged = target.histograms.get(key)
+            if merged is None:
+                target.histograms[key] = list(hist)
+            else:
+                for i, value in enumerate(hist):
+                    merged[i] += value
+
+    def _gauge_values(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = float(func())
+            except Exception as e:
+                self.logger.warning(f"读取指标 {name} 失败: {e}")
+        return values
+
+    @staticmethod
+    def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ''
+        escaped = (
+            (k, v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')) for k, v in pairs
+        )
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+    def render(self) -> str:
+        """
+        Prometheus 文本格式（0.0.4）
+        """
+        counters, histograms = self._collect()
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str, kind: str):
+            if name in described:
+                return
+            described.add(name)
+            if name in _HELP:
+                lines.append(f'# HELP {name} {_HELP[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, 'counter')
+            lines.append(f'{name}{self._format_labels(labels)} {value:g}')
+
+        for (name, labels), hist in sorted(histograms.items()):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist):
+                cumulative += count
+                lines.append(f'{name}_bucket{self._format_labels(labels, (("le", f"{bound:g}"),))} {cumulative:g}')
+            lines.append(f'{name}_bucket{self._format_labels(labels, (("le", "+Inf"),))} {hist[-1]:g}')
+            lines.append(f'{name}_sum{self._format_labels(labels)} {hist[-2]:.6f}')
+            lines.append(f'{name}_count{self._format_labels(labels)} {hist[-1]:g}')
+
+        for name, value in sorted(self._gauge_values().items()):
+            describe(name, 'gauge')
+            lines.append(f'{name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def _quantile(self, hist: List[float], q: float) -> float:
+        """
+        按分桶估算分位数，在所在桶内线性插值（与 Prometheus 的 histogram_quantile 相同）；
+        落在最后一个桶之外时取最大上界
+        """
+        target = q * hist[-1]
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, hist):
+            if count and cumulative + count >= target:
+                return lower + (bound - lower) * (target - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict:
+        """
+        当前指标的摘要：计数器、各阶段次数与平均 / p50 / p95 / p99 耗时（毫秒）、仪表
+
+        :return: {'counters': {...}, 'stages': {stage: {...}}, 'gauges': {...}}
+        """
+        counters, histograms = self._collect()
+        result: Dict[str, Dict] = {'counters': {}, 'stages': {}, 'gauges': self._gauge_values()}
+        for (name, labels), value in sorted(counters.items()):
+            result['counters'][name + self._format_labels(labels)] = value
+        for (name, labels), hist in sorted(histograms.items()):
+            if not hist[-1]:
+                continue
+            label = dict(labels).get('stage') if name == 'crawler_stage_seconds' else name + self._format_labels(labels)
+            result['stages'][label] = {
+                'count': int(hist[-1]),
+                'avg_ms': round(hist[-2] / hist[-1] * 1000, 3),
+                'p50_ms': round(self._quantile(hist, 0.5) * 1000, 3),
+                'p95_ms': round(self._quantile(hist, 0.95) * 1000, 3),
+                'p99_ms': round(self._quantile(hist, 0.99) * 1000, 3),
+            }
+        return result
+
+    def start_http_server(self, host: Optional[str] = None, port: Optional[int] = None) -> Tuple[str, int]:
+        """
+        在后台线程中提供 /metrics 文本接口
+
+        :param host: 监听地址，默认取 METRICS_CONFIG['host']（本机）
+        :param port: 监听端口，默认取 METRICS_CONFIG['port']，0 表示随机端口
+        :return: 实际监听的 (地址, 端口)
+        """
+        if self._server:
+            return self._server.server_address[:2]
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 抓取请求很频繁，不写访问日志
+                pass
+
+        host = METRICS_CONFIG['host'] if host is None else host
+        port = METRICS_CONFIG['port'] if port is None else port
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        address = self._server.server_address[:2]
+        self.logger.info(f"指标接口已启动: http://{address[0]}:{address[1]}/metrics")
+        return address
+
+    def start_log_snapshots(self, interval: Optional[float] = None):
+        """
+        在后台线程中定期把指标摘要写入日志
+
+        :param interval: 间隔秒数，默认取 METRICS_CONFIG['snapshot_interval']
+        """
+        interval = METRICS_CONFIG['snapshot_interval'] if interval is None else interval
+        if self._snapshot_thread and self._snapshot_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.log_snapshot()
+
+        self._snapshot_thread = threading.Thread(target=run, name='metrics-snapshot', daemon=True)
+        self._snapshot_thread.start()
+
+    def log_snapshot(self):
+        self.logger.info(f"指标快照: {json.dumps(self.snapshot(), ensure_ascii=False)}")
+
+    def stop(self):
+        """
+        停止指标接口与定期快照，并输出最后一次快照
+        """
+        self._stop_event.set()
+        if self._snapshot_thread:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+            self.log_snapshot()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    获取进程内共享的 Metrics
+    """
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
@@ -1,11 +1,20 @@
 # distributed_crawler/utils/proxy_pool.py  
 import requests  
+import heapq  
 import random  
 import logging  
 import re  
+import threading  
 import time  
-from typing import List, Optional, Dict  
+from typing import Callable, List, Optional, Dict, Tuple  
 from concurrent.futures import ThreadPoolExecutor, as_completed  
+from distributed_crawler.utils.http_client import HttpClient, get_http_client  
+from distributed_crawler.crawler.config.settings import PROXY_CONFIG   # type: ignore  
+
+# 熔断器状态：closed 正常使用；open 已熔断，冷却期内不参与选择；half_open 冷却结束，只放行一个探测请求  
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'  
+# 半开代理的探测权重按该分数计算：熔断时分数通常已降到 0，否则永远不会被选中探测  
+PROBE_SCORE = 10  
 
 class Proxy:  
     def __init__(self, address: str, protocol: str = 'http'):  
@@ -13,20 +22,156 @@ class Proxy:
         self.protocol = protocol  
         self.score = 100  # 初始分数  
         self.last_check_time = 0  
-        self.response_time = float('inf')  
+        self.response_time = float('inf')  # 响应时间的指数加权移动平均（秒）  
+        self.in_flight = 0  # 正在使用该代理的请求数  
+        self.failures = 0  # 连续失败次数  
+        self.state = CLOSED  
+        self.opened_at = 0.0  
+        self.slot = -1  # 在权重树中的位置  
+
+    @property  
+    def url(self) -> str:  
+        """  
+        可直接用于 requests proxies 参数的代理 URL  
+        """  
+        return f'{self.protocol}://{self.address}'  
+
+class _FenwickTree:  
+    """  
+    树状数组：O(log n) 修改单个权重，O(log n) 按前缀和抽样  
+    """  
+    def __init__(self, size: int):  
+        self.size = size  
+        self._tree = [0.0] * (size + 1)  
+        self._values = [0.0] * size  
+        self._top = 1 << max(size.bit_length() - 1, 0)  
+
+    def set(self, index: int, value: float):  
+        delta = value - self._values[index]  
+        self._values[index] = value  
+        i = index + 1  
+        while i <= self.size:  
+            self._tree[i] += delta  
+            i += i & -i  
+
+    def get(self, index: int) -> float:  
+        return self._values[index]  
+
+    def total(self) -> float:  
+        result, i = 0.0, self.size  
+        while i > 0:  
+            result += self._tree[i]  
+            i -= i & -i  
+        return result  
+
+    def find(self, target: float) -> int:  
+        """  
+        前缀和首次超过 target 的位置  
+        """  
+        pos, step = 0, self._top  
+        while step:  
+            nxt = pos + step  
+            if nxt <= self.size and self._tree[nxt] <= target:  
+                pos = nxt  
+                target -= self._tree[nxt]  
+            step >>= 1  
+        return min(pos, self.size - 1)  
+
+    def rebuild(self):  
+        """  
+        重新累加，消除浮点误差  
+        """  
+        values = self._values  
+        self._tree = [0.0] * (self.size + 1)  
+        self._values = [0.0] * self.size  
+        for index, value in enumerate(values):  
+            if value:  
+                self.set(index, value)  
 
 class ProxyPool:  
+    """  
+    代理池  
+
+    代理按地址索引，可选代理的权重（分数 / 响应时间）保存在树状数组中，按权重随机抽样，
+    负载分散到各个优质代理而不是总落在第一名。每个代理同时使用的请求数不超过 max_in_flight，
+    达到上限时权重暂时置 0。所有方法都由一把锁保护且不阻塞（代理池为空时的抓取除外），
+    可以在线程池和事件循环中直接调用；get_proxy 取得的代理用完后须调用 release_proxy 归还。  
+
+    每次请求的结果通过 report 反馈：响应时间按 EWMA 平滑，连续失败 failure_threshold 次后熔断，
+    cooldown 秒后进入半开状态，只放行一个探测请求，成功则恢复、失败则重新熔断。
+    start_health_checks 在后台按 check_interval 用 health_check_url 检查全部代理，结果同样经过熔断器；
+    该地址经代理访问，必须能从代理所在网络访问，未配置时不启动后台检查。  
+    """  
     def __init__(  
         self,   
         max_proxies: int = 100,   
         check_interval: int = 1800,  # 30分钟检查一次  
-        validate_timeout: int = 5  
+        validate_timeout: int = 5,  
+        http_client: Optional[HttpClient] = None,  
+        max_in_flight: int = 4,  
+        default_latency: float = 1.0,  
+        health_check_url: Optional[str] = None,  
+        ewma_alpha: Optional[float] = None,  
+        failure_threshold: Optional[int] = None,  
+        cooldown: Optional[float] = None,  
+        clock: Callable[[], float] = time.monotonic  
     ):  
-        self.proxies: List[Proxy] = []  
+        """  
+        :param max_proxies: 代理数量上限  
+        :param check_interval: 定期检查间隔（秒）  
+        :param validate_timeout: 验证代理的超时（秒）  
+        :param http_client: 共享的 HTTP 客户端  
+        :param max_in_flight: 每个代理同时进行的请求数上限  
+        :param default_latency: 未测量过响应时间的代理按该延迟（秒）计算权重  
+        :param health_check_url: 健康检查地址，经代理访问，默认取 PROXY_CONFIG['health_check_url']  
+        :param ewma_alpha: 响应时间 EWMA 的平滑系数，默认取 PROXY_CONFIG['ewma_alpha']  
+        :param failure_threshold: 连续失败多少次后熔断，默认取 PROXY_CONFIG['failure_threshold']  
+        :param cooldown: 熔断后多少秒进入半开状态，默认取 PROXY_CONFIG['cooldown']  
+        :param clock: 单调时钟，便于测试替换  
+        """  
         self.max_proxies = max_proxies  
         self.check_interval = check_interval  
         self.validate_timeout = validate_timeout  
+        self.http_client = http_client or get_http_client()  
+        self.max_in_flight = max_in_flight  
+        self.default_latency = default_latency  
+        self.health_check_url = health_check_url or PROXY_CONFIG.get('health_check_url')  
+        self.ewma_alpha = ewma_alpha or PROXY_CONFIG['ewma_alpha']  
+        self.failure_threshold = failure_threshold or PROXY_CONFIG['failure_threshold']  
+        self.cooldown = PROXY_CONFIG['cooldown'] if cooldown is None else cooldown  
+        self.clock = clock  
         self.logger = logging.getLogger(__name__)  
+        # 已熔断代理的 (可探测时间, 地址)，选择前把到期的转为半开  
+        self._cooling: List[Tuple[float, str]] = []  
+        self._health_thread: Optional[threading.Thread] = None  
+        self._health_stop = threading.Event()  
+        self._proxies: Dict[str, Proxy] = {}  
+        self._slots: List[Optional[Proxy]] = [None] * max_proxies  
+        self._free_slots = list(range(max_proxies - 1, -1, -1))  
+        self._weights = _FenwickTree(max_proxies)  
+        self._random = random.Random()  
+        self._lock = threading.Lock()  
+
+    @property  
+    def proxies(self) -> List[Proxy]:  
+        """  
+        当前全部代理的快照  
+        """  
+        with self._lock:  
+            return list(self._proxies.values())  
+
+    def _weight(self, proxy: Proxy) -> float:  
+        limit = 1 if proxy.state == HALF_OPEN else self.max_in_flight  
+        score = max(proxy.score, PROBE_SCORE) if proxy.state == HALF_OPEN else proxy.score  
+        if proxy.state == OPEN or score <= 0 or proxy.in_flight >= limit:  
+            return 0.0  
+        latency = self.default_latency if proxy.response_time == float('inf') else proxy.response_time  
+        return score / max(latency, 0.05)  
+
+    def _reweight(self, proxy: Proxy):  
+        # 调用方持有锁；已移除的代理不再参与抽样  
+        if self._proxies.get(proxy.address) is proxy:  
+            self._weights.set(proxy.slot, self._weight(proxy))  
 
     def fetch_free_proxies(self):  
         """  
@@ -54,7 +199,7 @@ class ProxyPool:
         从单个源获取代理  
         """  
         try:  
-            response = requests.get(source, timeout=10)  
+            response = self.http_client.get(source, timeout=10)  
             return self._parse_proxies(response.text)  
         except Exception as e:  
             self.logger.warning(f"获取代理源 {source} 失败: {e}")  
@@ -80,13 +225,18 @@ class ProxyPool:
         """  
         添加代理到代理池  
         """  
-        for proxy_str in proxies:  
-            if len(self.proxies) >= self.max_proxies:  
-                break  
-            
-            # 去重  
-            if not any(p.address == proxy_str for p in self.proxies):  
-                self.proxies.append(Proxy(proxy_str))  
+        with self._lock:  
+            for proxy_str in proxies:  
+                if not self._free_slots:  
+                    break  
+
+                # 去重  
+                if proxy_str not in self._proxies:  
+                    proxy = Proxy(proxy_str)  
+                    proxy.slot = self._free_slots.pop()  
+                    self._slots[proxy.slot] = proxy  
+                    self._proxies[proxy_str] = proxy  
+                    self._reweight(proxy)  
 
     def validate_proxy(self, proxy: Proxy) -> bool:  
         """  
@@ -94,73 +244,176 @@ class ProxyPool:
         """  
         try:  
             start_time = time.time()  
-            response = requests.get(  
-                'http://httpbin.org/ip',   
-                proxies={proxy.protocol: f'{proxy.protocol}://{proxy.address}'},  
+            response = self.http_client.get(  
+                self.health_check_url,   
+                proxies={'http': proxy.url, 'https': proxy.url},  
                 timeout=self.validate_timeout  
             )  
             
             # 计算响应时间  
-            proxy.response_time = time.time() - start_time  
-            
-            return response.status_code == 200  
+            is_valid = response.status_code == 200  
+            self.report(proxy, is_valid, time.time() - start_time)  
+            return is_valid  
         except Exception as e:  
             self.logger.debug(f"代理 {proxy.address} 验证失败: {e}")  
+            self.report(proxy, False)  
             return False  
 
     def get_proxy(self) -> Optional[Proxy]:  
         """  
         获取可用代理  
-        优先选择高分数和响应快的代理  
+        按分数与响应时间加权随机选择，并占用该代理的一个并发名额  
+
+        :return: 代理，全部代理都不可用或已达并发上限时返回 None  
         """  
         # 如果代理池为空，获取新代理  
-        if not self.proxies:  
+        if not self._proxies:  
             self.fetch_free_proxies()  
 
-        # 过滤和排序代理  
-        valid_proxies = [  
-            p for p in self.proxies   
-            if time.time() - p.last_check_time > self.check_interval  
-        ]  
+        with self._lock:  
+            self._half_open_cooled()  
+            proxy = self._sample()  
+            if proxy:  
+                proxy.in_flight += 1  
+                self._reweight(proxy)  
+            return proxy  
+
+    def _sample(self) -> Optional[Proxy]:  
+        total = self._weights.total()  
+        for _ in range(2):  
+            if total <= 0:  
+                return None  
+            slot = self._weights.find(self._random.random() * total)  
+            if self._weights.get(slot) > 0:  
+                return self._slots[slot]  
+            # 浮点误差落到权重为 0 的位置，重建后再抽一次  
+            self._weights.rebuild()  
+            total = self._weights.total()  
+        return None  
+
+    def _half_open_cooled(self):  
+        # 调用方持有锁：冷却期已过的熔断代理转为半开，允许一个探测请求  
+        now = self.clock()  
+        while self._cooling and self._cooling[0][0] <= now:  
+            _, address = heapq.heappop(self._cooling)  
+            proxy = self._proxies.get(address)  
+            if proxy and proxy.state == OPEN and proxy.opened_at + self.cooldown <= now:  
+                proxy.state = HALF_OPEN  
+                self._reweight(proxy)  
+
+    def _trip(self, proxy: Proxy):  
+        # 调用方持有锁  
+        proxy.state = OPEN  
+        proxy.opened_at = self.clock()  
+        heapq.heappush(self._cooling, (proxy.opened_at + self.cooldown, proxy.address))  
+        self.logger.warning(f"代理 {proxy.address} 连续失败 {proxy.failures} 次，熔断 {self.cooldown} 秒")  
 
-        # 按分数和响应时间排序  
-        valid_proxies.sort(key=lambda x: (x.score, x.response_time), reverse=True)  
+    def report(self, proxy: Proxy, success: bool, latency: Optional[float] = None):  
+        """  
+        反馈一次请求的结果  
+
+        :param proxy: 使用的代理  
+        :param success: 代理是否正常工作（目标站点返回的 HTTP 错误不算代理失败）  
+        :param latency: 请求耗时（秒），成功时用于更新 EWMA 响应时间  
+        """  
+        with self._lock:  
+            if success:  
+                proxy.score = min(100, proxy.score + 10)  
+                proxy.failures = 0  
+                if latency is not None:  
+                    if proxy.response_time == float('inf'):  
+                        proxy.response_time = latency  
+                    else:  
+                        proxy.response_time += self.ewma_alpha * (latency - proxy.response_time)  
+                if proxy.state != CLOSED:  
+                    proxy.state = CLOSED  
+                    self.logger.info(f"代理 {proxy.address} 探测成功，恢复使用")  
+            else:  
+                proxy.score = max(0, proxy.score - 20)  
+                proxy.failures += 1  
+                if proxy.state == HALF_OPEN or (proxy.state == CLOSED and proxy.failures >= self.failure_threshold):  
+                    self._trip(proxy)  
 
-        return valid_proxies[0] if valid_proxies else None  
+            proxy.last_check_time = time.time()  
+            self._reweight(proxy)  
+
+    def release_proxy(self, proxy: Proxy):  
+        """  
+        归还 get_proxy 占用的并发名额  
+        """  
+        with self._lock:  
+            proxy.in_flight = max(0, proxy.in_flight - 1)  
+            self._reweight(proxy)  
 
     def update_proxy_score(self, proxy: Proxy, success: bool):  
         """  
-        根据使用情况更新代理评分  
+        根据使用情况更新代理评分（不带耗时的 report）  
         """  
-        if success:  
-            proxy.score = min(100, proxy.score + 10)  
-        else:  
-            proxy.score = max(0, proxy.score - 20)  
-        
-        proxy.last_check_time = time.time()  
+        self.report(proxy, success)  
 
     def periodic_proxy_check(self):  
         """  
-        定期检查代理可用性  
+        检查全部代理的可用性，结果经熔断器反馈；评分降到 0 且检查失败的代理被移除  
         """  
+        proxies = self.proxies  
+        if not proxies or not self.health_check_url:  
+            return  
         with ThreadPoolExecutor(max_workers=10) as executor:  
             futures = {  
                 executor.submit(self.validate_proxy, proxy): proxy   
-                for proxy in self.proxies  
+                for proxy in proxies  
             }  
 
             for future in as_completed(futures):  
                 proxy = futures[future]  
                 try:  
                     is_valid = future.result()  
-                    if not is_valid:  
+                    if not is_valid and proxy.score <= 0:  
                         self.remove_proxy(proxy)  
                 except Exception as e:  
                     self.logger.error(f"代理检查错误: {e}")  
 
+    def start_health_checks(self, interval: Optional[float] = None):  
+        """  
+        启动后台健康检查线程  
+
+        :param interval: 检查间隔（秒），默认为 check_interval  
+        """  
+        if self._health_thread and self._health_thread.is_alive():  
+            return  
+        if not self.health_check_url:  
+            # 没有可经代理访问的检查地址时，每次检查都会失败，健康的代理也会被熔断并移除  
+            self.logger.info("未配置 health_check_url，不启动代理健康检查")  
+            return  
+        interval = interval or self.check_interval  
+        self._health_stop.clear()  
+
+        def loop():  
+            while not self._health_stop.wait(interval):  
+                try:  
+                    self.periodic_proxy_check()  
+                except Exception as e:  
+                    self.logger.error(f"代理健康检查出错: {e}")  
+
+        self._health_thread = threading.Thread(target=loop, name='proxy-health', daemon=True)  
+        self._health_thread.start()  
+
+    def stop_health_checks(self):  
+        """  
+        停止后台健康检查线程  
+        """  
+        self._health_stop.set()  
+        if self._health_thread:  
+            self._health_thread.join()  
+            self._health_thread = None  
+
     def remove_proxy(self, proxy: Proxy):  
         """  
         移除无效代理  
         """  
-        if proxy in self.proxies:  
-            self.proxies.remove(proxy)
\ No newline at end of file
+        with self._lock:  
+            if self._proxies.get(proxy.address) is proxy:  
+                del self._proxies[proxy.address]  
+                self._weights.set(proxy.slot, 0.0)  
+                self._slots[proxy.slot] = None  
+                self._free_slots.append(proxy.slot)  
@@ -1,94 +1,182 @@
-# distributed_crawler/utils/robots_checker.py  
-import urllib.robotparser  
-from urllib.parse import urlparse  
-import requests  
-import logging  
-import time  
-from typing import Optional, Dict, Any  
-
-class RobotsChecker:  
-    def __init__(  
-        self,   
-        user_agent: str = 'DistributedCrawler/1.0',   
-        cache_expire: int = 3600  # 缓存过期时间，默认1小时  
-    ):  
-        self.user_agent = user_agent  
-        self.robots_cache: Dict[str, Dict[str, Any]] = {}  
-        self.logger = logging.getLogger(__name__)  
-        self.cache_expire = cache_expire  
-
-    def _is_cache_valid(self, domain: str) -> bool:  
-        """  
-        检查缓存是否有效  
-        """  
-        if domain not in self.robots_cache:  
-            return False  
-        
-        current_time = time.time()  
-        cache_time = self.robots_cache[domain].get('timestamp', 0)  
-        return current_time - cache_time < self.cache_expire  
-
-    def can_fetch(self, url: str) -> bool:  
-        """  
-        检查是否可以抓取指定 URL，增加了缓存和日志机制  
-        """  
-        try:  
-            parsed_url = urlparse(url)  
-            domain = f"{parsed_url.scheme}://{parsed_url.netloc}"  
-
-            # 检查缓存  
-            if not self._is_cache_valid(domain):  
-                robots_url = f"{domain}/robots.txt"  
-                
-                try:  
-                    response = requests.get(robots_url, timeout=5)  
-                    
-                    if response.status_code == 200:  
-                        rp = urllib.robotparser.RobotFileParser()  
-                        rp.parse(response.text.splitlines())  
-                        
-                        self.robots_cache[domain] = {  
-                            'parser': rp,  
-                            'timestamp': time.time()  
-                        }  
-                    else:  
-                        # 如果无法获取 robots.txt，默认允许  
-                        self.logger.warning(f"无法获取 {robots_url}，状态码：{response.status_code}")  
-                        return True  
-
-                except requests.RequestException as e:  
-                    self.logger.warning(f"获取 robots.txt 失败: {e}")  
-                    return True  
-
-            # 检查是否允许爬取  
-            rp = self.robots_cache[domain]['parser']  
-            is_allowed = rp.can_fetch(self.user_agent, url)  
-            
-            self.logger.info(f"URL: {url}, 是否允许爬取: {is_allowed}")  
-            return is_allowed  
-
-        except Exception as e:  
-            self.logger.error(f"检查 robots 协议时发生错误: {e}")  
-            return False  
-
-    def get_crawl_delay(self, url: str) -> float:  
-        """  
-        获取网站建议的爬行延迟，增加了缓存和异常处理  
-        """  
-        try:  
-            parsed_url = urlparse(url)  
-            domain = f"{parsed_url.scheme}://{parsed_url.netloc}"  
-
-            # 确保已解析 robots.txt  
-            if not self._is_cache_valid(domain):  
-                self.can_fetch(url)  
-
-            rp = self.robots_cache[domain]['parser']  
-            delay = rp.crawl_delay(self.user_agent) or 1.0  
-            
-            self.logger.info(f"URL: {url}, 建议延迟: {delay} 秒")  
-            return delay  
-
-        except Exception as e:  
-            self.logger.error(f"获取爬行延迟时发生错误: {e}")  
-            return 1.0
\ No newline at end of file
+# distributed_crawler/utils/robots_checker.py
+import json
+import threading
+import urllib.robotparser
+from collections import OrderedDict
+from urllib.parse import urlparse
+import requests
+import logging
+import time
+from typing import Optional, Dict, Any
+import redis
+from distributed_crawler.utils.http_client import HttpClient, get_http_client
+
+class RobotsChecker:
+    """
+    robots.txt 检查器
+
+    解析结果按主机缓存在进程内的 LRU 中，可选地通过 Redis 在 worker 间共享 robots.txt 原文与过期时间。
+    获取失败（5xx、429 或网络错误）按 negative_ttl 缓存为“全部允许”，不会对同一主机反复请求；
+    同一主机的并发查询只发出一次请求，其余线程等待其结果。
+    """
+    def __init__(
+        self,
+        user_agent: str = 'DistributedCrawler/1.0',
+        cache_expire: int = 3600,  # 缓存过期时间，默认1小时
+        http_client: Optional[HttpClient] = None,
+        redis_client: Optional[redis.Redis] = None,
+        max_entries: int = 10000,
+        negative_ttl: int = 300,
+        fetch_timeout: float = 5,
+        key_prefix: str = 'robots:',
+        default_crawl_delay: float = 1.0
+    ):
+        """
+        :param user_agent: 匹配 robots.txt 规则时使用的 User-Agent
+        :param cache_expire: 成功获取（或确认不存在）的 robots.txt 缓存时长（秒）
+        :param http_client: 共享的 HTTP 客户端
+        :param redis_client: 可选的 Redis 客户端，指定时启用共享缓存
+        :param max_entries: 进程内缓存的主机数上限
+        :param negative_ttl: 获取失败时的缓存时长（秒）
+        :param fetch_timeout: 获取 robots.txt 的超时（秒）
+        :param key_prefix: 共享缓存的键名前缀
+        :param default_crawl_delay: robots.txt 未指定 Crawl-delay 时的爬行延迟（秒）
+        """
+        self.user_agent = user_agent
+        self.robots_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+        self.cache_expire = cache_expire
+        self.http_client = http_client or get_http_client()
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.fetch_timeout = fetch_timeout
+        self.key_prefix = key_prefix
+        self.default_crawl_delay = default_crawl_delay
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    def _build_entry(self, status: str, body: str, expires_at: float) -> Dict[str, Any]:
+        """
+        构建缓存项；失败与不存在时 body 为空，解析器允许全部 URL
+        """
+        rp = urllib.robotparser.RobotFileParser()
+        rp.parse(body.splitlines())
+        return {'parser': rp, 'status': status, 'expires_at': expires_at}
+
+    def _lookup(self, url: str) -> Dict[str, Any]:
+        """
+        获取 URL 所在主机的缓存项：本地 LRU → Redis 共享缓存 → 下载 robots.txt
+        """
+        domain = self._domain(url)
+        while True:
+            with self._lock:
+                entry = self.robots_cache.get(domain)
+                if entry and entry['expires_at'] > time.time():
+                    self.robots_cache.move_to_end(domain)
+                    return entry
+                event = self._inflight.get(domain)
+                if event is None:
+                    event = self._inflight[domain] = threading.Event()
+                    break
+            # 其他线程正在获取同一主机的 robots.txt，等待后重新读取缓存
+            event.wait()
+
+        try:
+            entry = self._load_shared(domain) or self._fetch(domain)
+            with self._lock:
+                self.robots_cache[domain] = entry
+                self.robots_cache.move_to_end(domain)
+                while len(self.robots_cache) > self.max_entries:
+                    self.robots_cache.popitem(last=False)
+            return entry
+        finally:
+            with self._lock:
+                self._inflight.pop(domain, None)
+            event.set()
+
+    def _load_shared(self, domain: str) -> Optional[Dict[str, Any]]:
+        if not self.redis_client:
+            return None
+        try:
+            raw = self.redis_client.get(self.key_prefix + domain)
+        except redis.RedisError as e:
+            self.logger.warning(f"读取 robots.txt 共享缓存失败: {e}")
+            return None
+        if not raw:
+            return None
+        data = json.loads(raw)
+        if data['expires_at'] <= time.time():
+            return None
+        return self._build_entry(data['status'], data['body'], data['expires_at'])
+
+    def _store_shared(self, domain: str, status: str, body: str, ttl: int, expires_at: float):
+        if not self.redis_client:
+            return
+        payload = json.dumps({'status': status, 'body': body, 'expires_at': expires_at})
+        try:
+            self.redis_client.set(self.key_prefix + domain, payload, ex=ttl)
+        except redis.RedisError as e:
+            self.logger.warning(f"写入 robots.txt 共享缓存失败: {e}")
+
+    def _fetch(self, domain: str) -> Dict[str, Any]:
+        """
+        下载并缓存 robots.txt
+
+        200 缓存规则；其他 4xx 视为没有 robots.txt，全部允许，按 cache_expire 缓存；
+        5xx、429 与网络错误同样全部允许，但只按 negative_ttl 缓存，稍后重试。
+        """
+        robots_url = f"{domain}/robots.txt"
+        body = ''
+        try:
+            response = self.http_client.get(robots_url, timeout=self.fetch_timeout)
+            if response.status_code == 200:
+                status, body, ttl = 'ok', response.text, self.cache_expire
+            elif 400 <= response.status_code < 500 and response.status_code != 429:
+                status, ttl = 'missing', self.cache_expire
+            else:
+                # 如果无法获取 robots.txt，默认允许
+                self.logger.warning(f"无法获取 {robots_url}，状态码：{response.status_code}")
+                status, ttl = 'error', self.negative_ttl
+        except requests.RequestException as e:
+            self.logger.warning(f"获取 robots.txt 失败: {e}")
+            status, ttl = 'error', self.negative_ttl
+
+        expires_at = time.time() + ttl
+        self._store_shared(domain, status, body, ttl, expires_at)
+        return self._build_entry(status, body, expires_at)
+
+    def can_fetch(self, url: str) -> bool:
+        """
+        检查是否可以抓取指定 URL，增加了缓存和日志机制
+        """
+        try:
+            rp = self._lookup(url)['parser']
+            is_allowed = rp.can_fetch(self.user_agent, url)
+
+            self.logger.info(f"URL: {url}, 是否允许爬取: {is_allowed}")
+            return is_allowed
+
+        except Exception as e:
+            self.logger.error(f"检查 robots 协议时发生错误: {e}")
+            return False
+
+    def get_crawl_delay(self, url: str) -> float:
+        """
+        获取网站建议的爬行延迟，与 can_fetch 共用同一缓存项
+        """
+        try:
+            rp = self._lookup(url)['parser']
+            delay = rp.crawl_delay(self.user_agent) or self.default_crawl_delay
+
+            self.logger.info(f"URL: {url}, 建议延迟: {delay} 秒")
+            return delay
+
+        except Exception as e:
+            self.logger.error(f"获取爬行延迟时发生错误: {e}")
+            return self.default_crawl_delay
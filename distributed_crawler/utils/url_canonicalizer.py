@@ -0,0 +1,164 @@
+# distributed_crawler/utils/url_canonicalizer.py
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+from urllib.parse import SplitResult, quote, unquote_plus, urlsplit
+
+from distributed_crawler.crawler.config.settings import CRAWLER_CONFIG   # type: ignore
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 路径中保留原样的字符（已有的百分号编码不会被重复编码）
+_PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+
+
+def remove_dot_segments(path: str) -> str:
+    """
+    按 RFC 3986 5.2.4 去掉路径中的 . 与 ..
+    """
+    if '.' not in path:
+        return path
+    output: List[str] = []
+    segments = path.split('/')
+    for segment in segments:
+        if segment == '..':
+            if len(output) > 1:
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    # 以 . 或 .. 结尾时保留末尾的斜杠
+    if segments[-1] in ('.', '..'):
+        output.append('')
+    return '/'.join(output)
+
+
+class URLCanonicalizer:
+    """
+    URL 规范化
+
+    小写协议与主机、去掉默认端口与片段、解析 . 和 .. 路径段、查询参数排序并去掉跟踪参数，
+    使同一资源的不同写法在入队前就合并为一个 URL。非 http(s) 链接（mailto:、javascript: 等）返回 None。
+    基准 URL 的解析结果与规范化结果都用有界 LRU 缓存，同一页面的大量相对链接只解析一次基准 URL。
+    """
+    def __init__(self, tracking_params: Optional[Sequence[str]] = None, cache_size: int = 10000):
+        """
+        :param tracking_params: 要去掉的查询参数名，以 * 结尾表示前缀匹配；默认取 CRAWLER_CONFIG['tracking_params']
+        :param cache_size: LRU 缓存的条目数
+        """
+        if tracking_params is None:
+            tracking_params = CRAWLER_CONFIG.get('tracking_params', [])
+        self.tracking_exact = frozenset(p.lower() for p in tracking_params if not p.endswith('*'))
+        self.tracking_prefixes = tuple(p[:-1].lower() for p in tracking_params if p.endswith('*'))
+        self._split_base = lru_cache(maxsize=cache_size)(urlsplit)
+        self._canonical = lru_cache(maxsize=cache_size)(self._canonicalize_absolute)
+
+    def canonicalize(self, url: str, base: Optional[str] = None) -> Optional[str]:
+        """
+        规范化单个 URL
+
+        :param url: URL，可以是相对链接
+        :param base: 相对链接的基准 URL
+        :return: 规范化后的绝对 URL，无效或非 http(s) 时返回 None
+        """
+        url = url.strip()
+        if base is not None:
+            url = self._join(self._split_base(base), url)
+            if url is None:
+                return None
+        return self._canonical(url)
+
+    def canonicalize_many(self, urls: Iterable[str], base: Optional[str] = None) -> List[str]:
+        """
+        批量规范化，去掉无效 URL 与规范化后的重复项，保持首次出现的顺序
+        """
+        base_parts = self._split_base(base) if base is not None else None
+        seen = set()
+        result = []
+        for url in urls:
+            url = url.strip()
+            if base_parts is not None:
+                url = self._join(base_parts, url)
+                if url is None:
+                    continue
+            canonical = self._canonical(url)
+            if canonical and canonical not in seen:
+                seen.add(canonical)
+                result.append(canonical)
+        return result
+
+    def cache_info(self):
+        return self._canonical.cache_info()
+
+    @staticmethod
+    def _join(base: SplitResult, href: str) -> Optional[str]:
+        """
+        按 RFC 3986 5.2.2 把相对链接解析为绝对 URL，基准 URL 已预先解析
+        """
+        try:
+            ref = urlsplit(href)
+        except ValueError:
+            return None
+        if ref.scheme:
+            return href
+        if ref.netloc:
+            return f'{base.scheme}:{href}'
+        if not ref.path:
+            path = base.path
+            query = ref.query if ref.query else base.query
+        else:
+            if ref.path.startswith('/'):
+                path = ref.path
+            elif base.netloc and not base.path:
+                path = '/' + ref.path
+            else:
+                path = base.path[:base.path.rfind('/') + 1] + ref.path
+            query = ref.query
+        result = f'{base.scheme}://{base.netloc}{path}'
+        return f'{result}?{query}' if query else result
+
+    def _is_tracking(self, name: str) -> bool:
+        name = unquote_plus(name).lower()
+        return name in self.tracking_exact or name.startswith(self.tracking_prefixes)
+
+    def _canonicalize_absolute(self, url: str) -> Optional[str]:
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError:
+            return None
+        scheme = parts.scheme.lower()
+        if scheme not in _DEFAULT_PORTS or not parts.hostname:
+            return None
+
+        host = parts.hostname.rstrip('.')
+        if ':' in host:
+            host = f'[{host}]'  # IPv6
+        netloc = host if port in (None, _DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+        if parts.username is not None:
+            userinfo = parts.netloc.rpartition('@')[0]
+            netloc = f'{userinfo}@{netloc}'
+
+        path = quote(remove_dot_segments(parts.path), safe=_PATH_SAFE) or '/'
+
+        query = ''
+        if parts.query:
+            pairs = [pair for pair in parts.query.split('&') if pair]
+            pairs = [pair for pair in pairs if not self._is_tracking(pair.partition('=')[0])]
+            query = '&'.join(sorted(pairs))
+
+        result = f'{scheme}://{netloc}{path}'
+        return f'{result}?{query}' if query else result
+
+
+_default_canonicalizer: Optional[URLCanonicalizer] = None
+_default_lock = threading.Lock()
+
+
+def get_url_canonicalizer() -> URLCanonicalizer:
+    """
+    获取进程内共享的 URLCanonicalizer
+    """
+    global _default_canonicalizer
+    with _default_lock:
+        if _default_canonicalizer is None:
+            _default_canonicalizer = URLCanonicalizer()
+        return _default_canonicalizer